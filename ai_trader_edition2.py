@@ -12,7 +12,7 @@ import time
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from config import DASHSCOPE_API_KEY, DASHSCOPE_DEEPSEEK_API_KEY
+from config import DASHSCOPE_API_KEY, DASHSCOPE_DEEPSEEK_API_KEY, CRYPTO_SYMBOLS
 from crypto_news import CryptoNewsAPI
 
 # 直接继承Edition 1的AITraderV2类
@@ -100,7 +100,7 @@ class AITraderEdition2(AITraderV2):
                 
                 # 添加相关币种标签
                 categories = item.get('categories', [])
-                crypto_tags = [c for c in categories if c in ['BTC', 'ETH', 'SOL', 'BNB', 'DOGE', 'XRP']]
+                crypto_tags = [c for c in categories if c in CRYPTO_SYMBOLS]
                 if crypto_tags:
                     summary += f" | Related: {', '.join(crypto_tags)}"
                 summary += "\n"
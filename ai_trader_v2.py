@@ -4,9 +4,11 @@ AI交易代理 V2 - 支持杠杆交易和技术指标
 
 import requests
 import json
+import math
 import random
 import time
-from config import OPENROUTER_API_KEY, DASHSCOPE_API_KEY, DASHSCOPE_DEEPSEEK_API_KEY
+from config import OPENROUTER_API_KEY, DASHSCOPE_API_KEY, DASHSCOPE_DEEPSEEK_API_KEY, CRYPTO_SYMBOLS
+from http_client import get_http_client
 
 class AITraderV2:
     """AI交易代理 - 杠杆版本"""
@@ -117,14 +119,19 @@ CURRENT MARKET STATE FOR ALL COINS
 """
         
         # 技术指标（逐币种）
-        import pandas as pd
-        from market_data import MarketData
-        mkt = MarketData()
+        from derivatives_cache import derivatives_cache
+        mkt = self.kline_data.market_data
         
         for symbol, ind in indicators.items():
             if not ind:
                 continue
             
+            # 日内序列用 3m 聚合K线（与上方时间框架说明一致）；聚合历史不足时退回 1m
+            intraday = self.kline_data.get_timeframe_indicators(symbol, '3m')
+            if intraday is not None:
+                ind = intraday
+            interval_note = "3‑minute intervals" if intraday is not None else "by minute"
+
             # 扩展序列长度（从10条增加到30条，提供更多历史上下文）
             price_series = ind.get('price_series', [])
             ema20_series = ind.get('ema_20_series', []) if ind.get('ema_20') is not None else []
@@ -138,94 +145,77 @@ CURRENT MARKET STATE FOR ALL COINS
             macd_series_fmt = [round(m, 3) for m in macd_series[-30:]]
             rsi7_series_fmt = [round(r, 3) for r in rsi7_series[-30:]]
             rsi14_series_fmt = [round(r, 3) for r in rsi14_series[-30:]]
+            # 注册表中带 prompt 模板的附加指标（布林带、VWAP、OBV、随机指标等）的当前值
+            extra = "".join(f"\n{line}\n" for line in self.kline_data.indicators.describe(ind))
 
-            # 4小时聚合（完全对齐官方格式）
-            df = self.kline_data.get_dataframe(symbol, 1500)
+            # 4小时背景（由 1m K线增量聚合，指标随K线递推；历史不足 60 根时省略）
             long_ctx = ""
-            if df is not None and len(df) > 0:
-                try:
-                    df4 = df.resample('240min').agg({'open':'first','high':'max','low':'min','close':'last','volume':'sum'}).dropna()
-                    if len(df4) >= 60:
-                        # 计算指标（纯 pandas 实现）
-                        df4['EMA_20'] = df4['close'].ewm(span=20, adjust=False).mean()
-                        df4['EMA_50'] = df4['close'].ewm(span=50, adjust=False).mean()
-                        
-                        # ATR
-                        high_low = df4['high'] - df4['low']
-                        high_close = abs(df4['high'] - df4['close'].shift())
-                        low_close = abs(df4['low'] - df4['close'].shift())
-                        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-                        df4['ATR_3'] = tr.rolling(window=3).mean()
-                        df4['ATR_14'] = tr.rolling(window=14).mean()
-                        
-                        # MACD
-                        ema12 = df4['close'].ewm(span=12, adjust=False).mean()
-                        ema26 = df4['close'].ewm(span=26, adjust=False).mean()
-                        macd4 = pd.DataFrame()
-                        macd4['MACD_12_26_9'] = ema12 - ema26
-                        
-                        # RSI
-                        delta = df4['close'].diff()
-                        gain14 = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                        loss14 = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                        rs14 = gain14 / loss14
-                        rsi4 = 100 - (100 / (1 + rs14))
-                        
-                        ema20_4 = float(df4.iloc[-1].get('EMA_20', 0)) if 'EMA_20' in df4.columns else 0.0
-                        ema50_4 = float(df4.iloc[-1].get('EMA_50', 0)) if 'EMA_50' in df4.columns else 0.0
-                        atr3_4 = float(df4.iloc[-1].get('ATR_3', 0)) if 'ATR_3' in df4.columns else 0.0
-                        atr14_4 = float(df4.iloc[-1].get('ATR_14', 0)) if 'ATR_14' in df4.columns else 0.0
-                        vol_cur = float(df4.iloc[-1]['volume']) if 'volume' in df4.columns else 0.0
-                        vol_avg = float(df4['volume'].tail(20).mean()) if 'volume' in df4.columns else 0.0
-                        
-                        # 扩展4小时序列（从10个增加到20个，覆盖80小时约3.3天）
-                        macd4_series = [round(x, 3) for x in macd4['MACD_12_26_9'].dropna().tail(20).tolist()] if macd4 is not None and 'MACD_12_26_9' in macd4.columns else []
-                        rsi4_series = [round(x, 3) for x in rsi4.dropna().tail(20).tolist()] if rsi4 is not None else []
-                        
-                        long_ctx = f"""
+            ind4 = self.kline_data.get_timeframe_indicators(symbol, '4h')
+            if ind4 is not None:
+                # 扩展4小时序列（从10个增加到20个，覆盖80小时约3.3天）
+                macd4_series = [round(x, 3) for x in ind4['macd_series'] if not math.isnan(x)][-20:]
+                rsi4_series = [round(x, 3) for x in ind4['rsi_14_series'] if not math.isnan(x)][-20:]
+                extra4 = "".join(f"\n{line}\n" for line in self.kline_data.indicators.describe(ind4))
+                long_ctx = f"""
 Longer‑term context (4‑hour timeframe):
 
-20‑Period EMA: {ema20_4:.3f} vs. 50‑Period EMA: {ema50_4:.3f}
+20‑Period EMA: {ind4['ema_20']:.3f} vs. 50‑Period EMA: {ind4['ema_50']:.3f}
 
-3‑Period ATR: {atr3_4:.3f} vs. 14‑Period ATR: {atr14_4:.3f}
+3‑Period ATR: {ind4['atr_3']:.3f} vs. 14‑Period ATR: {ind4['atr_14']:.3f}
 
-Current Volume: {vol_cur:.3f} vs. Average Volume: {vol_avg:.3f}
+Current Volume: {ind4['volume']:.3f} vs. Average Volume: {ind4['volume_avg_20']:.3f}
 
 MACD indicators: {macd4_series}
 
 RSI indicators (14‑Period): {rsi4_series}
-"""
-                except Exception as e:
-                    print(f"  ⚠ {symbol} 4小时数据生成失败: {e}", flush=True)
-                    long_ctx = ""
+{extra4}"""
 
             # 期货指标：OI、Funding Rate
             oi_latest = 0.0
             oi_avg = 0.0
             funding = 0.0
-            try:
-                oi_latest = mkt.get_open_interest(symbol)
-                oi_avg = mkt.get_open_interest_avg(symbol, period='5m', limit=30)
-                funding = mkt.get_funding_rate(symbol)
-            except Exception:
-                pass
+            # 过期的缓存值附上距上次成功刷新的秒数，从未取到的值显示 N/A，避免把旧值当作最新值
+            oi_note = oi_avg_note = funding_note = ''
+            # 优先读进程内合约指标缓存（后台刷新）；缓存未启动时才直接请求
+            cached = derivatives_cache.get(symbol)
+            if cached is not None:
+                oi_latest = cached['open_interest']
+                oi_avg = cached['open_interest_avg']
+                funding = cached['funding_rate']
+                oi_note, oi_avg_note, funding_note = (
+                    self._staleness_note(cached['staleness'][key]) if cached['stale'][key] else ''
+                    for key in ('open_interest', 'open_interest_avg', 'funding_rate'))
+            else:
+                try:
+                    oi_latest = mkt.get_open_interest(symbol)
+                    oi_avg = mkt.get_open_interest_avg(symbol, period='5m', limit=30)
+                    funding = mkt.get_funding_rate(symbol)
+                except Exception:
+                    pass
+
+            # 盘口中间价/价差序列（订阅了盘口时）；否则如实标注为K线收盘价
+            book = getattr(mkt, 'order_book', None)
+            mid_series, spread_series = book.series(symbol, 30) if book is not None else ([], [])
+            if mid_series:
+                spread_fmt = [round(x, 2) for x in spread_series]
+                price_block = f"""Mid prices (best bid/ask, sampled every {int(book.sample_seconds)}s): {[round(p, 2) for p in mid_series]}
+
+Bid‑ask spread (bps): {spread_fmt}"""
+            else:
+                price_block = f"Close prices: {price_series_fmt}"
 
-            # 时间框架说明（BTC用1分钟，其他3分钟，或统一用3分钟）
-            interval_note = "by minute" if symbol == 'BTC' else "3‑minute intervals"
-            
-            # 如果是BTC且用1分钟，需要特别说明
             symbol_section = f"""ALL {symbol} DATA
 current_price = {ind['current_price']:.3f}, current_ema20 = {ind.get('ema_20', 0):.3f}, current_macd = {ind.get('macd', 0):.3f}, current_rsi (7 period) = {ind.get('rsi_7', 0):.3f}
 
 In addition, here is the latest {symbol} open interest and funding rate for perps (the instrument you are trading):
 
-Open Interest: Latest: {oi_latest:.2f} Average: {oi_avg:.2f}
+Open Interest: Latest: {oi_latest:.2f}{oi_note} Average: {oi_avg:.2f}{oi_avg_note}
 
-Funding Rate: {funding}
+Funding Rate: {funding}{funding_note}
 
 Intraday series ({interval_note}, oldest → latest):
 
-Mid prices: {price_series_fmt}
+{price_block}
 
 EMA indicators (20‑period): {ema20_series_fmt}
 
@@ -234,7 +224,7 @@ MACD indicators: {macd_series_fmt}
 RSI indicators (7‑Period): {rsi7_series_fmt}
 
 RSI indicators (14‑Period): {rsi14_series_fmt}
-{long_ctx}"""
+{extra}{long_ctx}"""
             
             prompt += symbol_section
 
@@ -360,6 +350,13 @@ Win Rate: {win_rate:.1f}%
         
         return prompt
     
+    @staticmethod
+    def _staleness_note(age):
+        """合约指标过期标注：从未取到时为 unavailable，否则给出距上次成功刷新的秒数"""
+        if age is None:
+            return " (unavailable)"
+        return f" (stale, last updated {int(age)}s ago)"
+    
     def _call_ai(self, prompt):
         """调用AI API（Qwen用DashScope，DeepSeek用OpenRouter）- 支持重试机制"""
         # 根据模型选择API
@@ -374,7 +371,7 @@ Win Rate: {win_rate:.1f}%
                 if use_dashscope:
                     # Qwen使用阿里云百炼 DashScope API（直接使用requests）
                     print(f"  → {self.name} 使用DashScope API (尝试 {attempt + 1}/{max_retries})", flush=True)
-                    r = requests.post(
+                    r = get_http_client().post(
                         "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
                         headers={
                             "Authorization": f"Bearer {DASHSCOPE_API_KEY}",
@@ -383,20 +380,19 @@ Win Rate: {win_rate:.1f}%
                         json={
                             "model": "qwen3-max",
                             "messages": [
-                                {"role": "system", "content": f"You are {self.name}, a professional crypto trader. Analyze market data and return your decisions in this exact JSON format: {{\"analysis\": \"your 200-400 word market analysis\", \"decisions\": {{\"BTC\": {{\"signal\": \"hold/long/short\", \"leverage\": 10, \"percentage\": 20, \"confidence\": 0.75, \"stop_loss\": 0, \"profit_target\": 0, \"invalidation_condition\": \"\", \"risk_usd\": 0}}, \"ETH\": {{...}}}}}}. Include ALL coins (BTC, ETH, SOL, BNB, DOGE, XRP) in your response. Use 'hold' for no action."},
+                                {"role": "system", "content": f"You are {self.name}, a professional crypto trader. Analyze market data and return your decisions in this exact JSON format: {{\"analysis\": \"your 200-400 word market analysis\", \"decisions\": {{\"BTC\": {{\"signal\": \"hold/long/short\", \"leverage\": 10, \"percentage\": 20, \"confidence\": 0.75, \"stop_loss\": 0, \"profit_target\": 0, \"invalidation_condition\": \"\", \"risk_usd\": 0}}, \"ETH\": {{...}}}}}}. Include ALL coins ({', '.join(CRYPTO_SYMBOLS.keys())}) in your response. Use 'hold' for no action."},
                                 {"role": "user", "content": prompt}
                             ],
                             "temperature": self.temperature,
                             "max_tokens": 2000
-                        },
-                        timeout=120  # 增加到120秒，降低超时概率
+                        }
                     )
                     response = type('obj', (object,), {'status_code': r.status_code})()
                     response_json = r.json() if r.status_code == 200 else {}
                 else:
                     # DeepSeek使用阿里云百炼API（思考模式需要更长时间）
                     print(f"  → {self.name} 使用阿里云百炼 DeepSeek API（思考模式，尝试 {attempt + 1}/{max_retries}）", flush=True)
-                    r = requests.post(
+                    r = get_http_client().post(
                         "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
                         headers={
                             "Authorization": f"Bearer {DASHSCOPE_DEEPSEEK_API_KEY}",
@@ -405,14 +401,13 @@ Win Rate: {win_rate:.1f}%
                         json={
                             "model": "deepseek-v3.2-exp",
                             "messages": [
-                                {"role": "system", "content": f"You are {self.name}, a professional crypto trader. Analyze market data and return your decisions in this exact JSON format: {{\"analysis\": \"your 200-400 word market analysis\", \"decisions\": {{\"BTC\": {{\"signal\": \"hold/long/short\", \"leverage\": 10, \"percentage\": 20, \"confidence\": 0.75, \"stop_loss\": 0, \"profit_target\": 0, \"invalidation_condition\": \"\", \"risk_usd\": 0}}, \"ETH\": {{...}}}}}}. Include ALL coins (BTC, ETH, SOL, BNB, DOGE, XRP) in your response. Use 'hold' for no action."},
+                                {"role": "system", "content": f"You are {self.name}, a professional crypto trader. Analyze market data and return your decisions in this exact JSON format: {{\"analysis\": \"your 200-400 word market analysis\", \"decisions\": {{\"BTC\": {{\"signal\": \"hold/long/short\", \"leverage\": 10, \"percentage\": 20, \"confidence\": 0.75, \"stop_loss\": 0, \"profit_target\": 0, \"invalidation_condition\": \"\", \"risk_usd\": 0}}, \"ETH\": {{...}}}}}}. Include ALL coins ({', '.join(CRYPTO_SYMBOLS.keys())}) in your response. Use 'hold' for no action."},
                                 {"role": "user", "content": prompt}
                             ],
                             "temperature": self.temperature,
                             "max_tokens": 2000,
                             "extra_body": {"enable_thinking": True}
-                        },
-                        timeout=120  # 增加到120秒，因为思考模式需要更长时间
+                        }
                     )
                     response = type('obj', (object,), {'status_code': r.status_code})()
                     response_json = r.json() if r.status_code == 200 else {}
@@ -818,7 +813,7 @@ Win Rate: {win_rate:.1f}%
                 
                 # 添加相关币种标签
                 categories = item.get('categories', [])
-                crypto_tags = [c for c in categories if c in ['BTC', 'ETH', 'SOL', 'BNB', 'DOGE', 'XRP']]
+                crypto_tags = [c for c in categories if c in CRYPTO_SYMBOLS]
                 if crypto_tags:
                     summary += f" | Related: {', '.join(crypto_tags)}"
                 summary += "\n"
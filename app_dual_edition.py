@@ -12,6 +12,12 @@ import os
 
 # 导入模块
 from market_data import MarketData
+from binance_stream import BinanceStream
+from async_market_data import AsyncMarketData
+from derivatives_cache import derivatives_cache
+from price_board import PriceBoard
+from symbol_universe import symbol_universe
+from order_book import OrderBook
 from kline_data import KLineData
 from leverage_engine import LeverageEngine
 from order_manager import OrderManager
@@ -23,7 +29,10 @@ if 'ai_trader_edition2' in sys.modules:
     
 from ai_trader_edition2 import AITraderEdition2
 from crypto_news import CryptoNewsAPI
-from config import INITIAL_BALANCE, TRADING_INTERVAL, AI_MODELS
+from config import (
+    INITIAL_BALANCE, TRADING_INTERVAL, AI_MODELS, MARKET_DATA_STREAMING, SYMBOL_UNIVERSE_TOP_N,
+    ORDER_BOOK_ENABLED, CRYPTO_SYMBOLS,
+)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'trigo-nexus-edition1'
@@ -34,6 +43,8 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 # Edition 1 系统实例
 # ========================================
 market_data = MarketData()
+async_market_data = AsyncMarketData(market_data)
+price_board = PriceBoard(market_data)
 kline_data = KLineData(market_data)
 leverage_engine = LeverageEngine(INITIAL_BALANCE)
 order_manager = OrderManager(leverage_engine)
@@ -110,19 +121,31 @@ def trading_loop():
             print(f"\n⏰ 交易周期 #{competition_stats['invocations']}", flush=True)
             competition_stats['invocations'] += 1
             
-            kline_data.update_klines()
-            current_prices = market_data.get_all_prices()
-            leverage_engine.update_positions(current_prices)
-            triggered = order_manager.check_orders(current_prices)
-            
             # 检查是否需要进行AI决策
             current_time = time.time()
             should_make_decision = (current_time - last_ai_decision_time) >= AI_DECISION_INTERVAL
             
+            # 并发刷新所有币种的行情与K线，回填同步缓存（合约指标由 derivatives_cache 后台刷新）
+            snapshot = None
+            try:
+                snapshot = async_market_data.refresh_snapshot_sync(include_futures=False)
+            except Exception as e:
+                print(f"⚠️ 异步行情快照失败，回退同步拉取: {e}", flush=True)
+            kline_data.update_klines(recent_klines=snapshot['klines'] if snapshot else None,
+                                     prices=snapshot['prices'] if snapshot else None)
+            # 读取价格看板快照（后台线程刷新），交易循环不再同步请求行情
+            current_prices = price_board.get_prices()
+            leverage_engine.update_positions(current_prices)
+            triggered = order_manager.check_orders(current_prices)
+            
             if not should_make_decision:
                 print(f"  ⏳ 跳过AI决策（距上次{int(current_time - last_ai_decision_time)}秒）", flush=True)
                 time.sleep(TRADING_INTERVAL)
                 continue
+            if not kline_data.is_ready():
+                print(f"  ⏳ 历史K线补齐中，暂缓AI决策", flush=True)
+                time.sleep(TRADING_INTERVAL)
+                continue
             
             last_ai_decision_time = current_time
             print(f"🤖 开始AI决策（含新闻）...", flush=True)
@@ -266,15 +289,13 @@ def home_page():
 
 @app.route('/api/edition2/prices')
 def api_prices():
-    prices = market_data.get_all_prices()
-    changes = {sym: market_data.get_price_change(sym) for sym in prices.keys()}
-    return jsonify({'prices': prices, 'changes': changes})
+    # 只读价格看板快照，不触发上游请求；附 as_of / stale 供前端提示
+    return jsonify(price_board.snapshot())
 
 @app.route('/api/edition2/leaderboard')
 def api_leaderboard():
     try:
-        current_prices = market_data.get_all_prices()
-        leverage_engine.update_positions(current_prices)
+        leverage_engine.update_positions(price_board.get_prices())
     except Exception as e:
         print(f"⚠️ leaderboard价格更新失败: {e}, 使用缓存数据", flush=True)
     return jsonify(leverage_engine.get_leaderboard())
@@ -343,13 +364,26 @@ def api_market_sentiment():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/system/market-data')
+def api_market_data_stats():
+    """行情数据源健康指标（端点延迟、熔断、对冲胜出统计、限流配额、K线热启动耗时、指标缓存命中、多周期聚合根数、价格看板新鲜度、币种池、盘口）"""
+    stats = market_data.get_source_stats()
+    stats['derivatives'] = derivatives_cache.snapshot()
+    stats['startup'] = kline_data.get_startup_metrics()
+    stats['indicator_cache'] = dict(kline_data.indicator_cache_stats)
+    stats['timeframes'] = kline_data.timeframes.stats()
+    stats['price_board'] = price_board.stats()
+    stats['universe'] = symbol_universe.snapshot()
+    if market_data.order_book is not None:
+        stats['order_book'] = market_data.order_book.stats()
+    return jsonify(stats)
+
 # 统一详情路由
 @app.route('/api/trader/<int:trader_id>')
 @app.route('/api/edition2/trader/<int:trader_id>')
 def unified_trader_detail(trader_id: int):
     try:
-        current_prices = market_data.get_all_prices()
-        leverage_engine.update_positions(current_prices)
+        leverage_engine.update_positions(price_board.get_prices())
     except Exception as e:
         print(f"⚠️ trader detail价格更新失败: {e}, 使用缓存数据", flush=True)
 
@@ -398,8 +432,7 @@ def api_models():
         
         if ai_traders:
             try:
-                current_prices = market_data.get_all_prices()
-                leverage_engine.update_positions(current_prices)
+                leverage_engine.update_positions(price_board.get_prices())
             except Exception as e:
                 print(f"⚠️ 价格更新失败: {e}", flush=True)
             
@@ -477,8 +510,7 @@ def api_model_detail(model_id: str):
     
     # 获取账户信息并更新持仓（确保数据最新）
     try:
-        current_prices = market_data.get_all_prices()
-        leverage_engine.update_positions(current_prices)
+        leverage_engine.update_positions(price_board.get_prices())
     except Exception as e:
         print(f"⚠️ 模型详情页价格更新失败: {e}, 使用缓存数据", flush=True)
     
@@ -616,6 +648,31 @@ def init_trading_system():
     # 初始化交易员
     initialize_traders()
     
+    # 动态币种池（SYMBOL_UNIVERSE_TOP_N>0 时按合约成交额扩展，须在行情/K线模块启动前完成）
+    if SYMBOL_UNIVERSE_TOP_N > 0:
+        symbol_universe.refresh(SYMBOL_UNIVERSE_TOP_N)
+    
+    # K线热启动：立即从本地库恢复，后台并发补齐缺失尾部
+    kline_data.warm_start()
+    
+    # 价格看板后台刷新（HTTP 接口只读快照）
+    price_board.start()
+    
+    # 合约指标（OI、资金费率）后台刷新
+    derivatives_cache.start(async_market_data)
+    
+    # WebSocket 实时行情（可选，MARKET_DATA_STREAMING=1 开启）
+    if MARKET_DATA_STREAMING:
+        # 盘口与K线/行情共用一个组合流连接；持仓按盘口中间价估值
+        order_book = OrderBook(CRYPTO_SYMBOLS) if ORDER_BOOK_ENABLED else None
+        stream = BinanceStream(market_data, order_book=order_book)
+        market_data.attach_stream(stream)
+        if order_book is not None:
+            market_data.attach_order_book(order_book)
+            leverage_engine.attach_order_book(order_book)
+        stream.start()
+        print(f"📡 已启用 Binance WebSocket 实时行情{'（含盘口）' if order_book is not None else ''}", flush=True)
+    
     # 🔧 修复历史数据：同步 margin_used
     print("\n🔧 检查并修复 margin_used...", flush=True)
     try:
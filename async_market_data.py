@@ -0,0 +1,261 @@
+"""
+异步市场数据模块
+基于 aiohttp 的 MarketData 异步版本（价格、K线、持仓量、资金费率），
+交易循环可一次并发拉取所有币种的全部行情与合约指标。
+同步调用方（KLineData、Flask 路由）继续使用 MarketData，本模块把结果回填进它的缓存。
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+from config import (
+    CRYPTO_SYMBOLS,
+    KLINE_INTERVAL,
+    BINANCE_REQUEST_DEADLINE,
+    ENDPOINT_ATTEMPT_TIMEOUT,
+    HTTP_POOL_MAXSIZE,
+    RATE_LIMIT_MAX_WAIT,
+)
+from endpoint_manager import spot_endpoints, fapi_endpoints, EndpointClientError, is_client_error
+from http_client import DEFAULT_HEADERS
+from rate_limiter import rate_governor, RateLimitExceeded, RATE_LIMITED_STATUS
+from cassette import cassette, CassetteMiss
+from kline_store import interval_ms
+from market_data import parse_binance_klines, parse_open_interest_avg, parse_funding_rate
+
+
+class AsyncMarketData:
+    """异步行情客户端；run_sync() 供同步代码在后台事件循环中执行协程"""
+
+    def __init__(self, market_data=None):
+        # 同步 MarketData，用于回填价格缓存（可为空）
+        self.market_data = market_data
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # {symbol: 最近一次拉取K线时所在的K线周期序号}
+        self._kline_bar: Dict[str, int] = {}
+        self._bar_ms = interval_ms(KLINE_INTERVAL)
+
+    # -------- HTTP --------
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=HTTP_POOL_MAXSIZE, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+        return self._session
+
+    async def _endpoint_get(self, endpoints, path: str, params: Dict[str, Any]) -> Any:
+        """与同步版相同的端点选择与熔断策略，总耗时受 BINANCE_REQUEST_DEADLINE 约束"""
+        session = await self._get_session()
+        start = time.time()
+        last_exc: Optional[Exception] = None
+        for base in endpoints.ranked():
+            remaining = BINANCE_REQUEST_DEADLINE - (time.time() - start)
+            if remaining <= 0:
+                break
+            url = f"{base}{path}"
+            if cassette.replaying:
+                return await self._replay(url, params)
+            limited = rate_governor.classify(url, params)
+            if limited is not None:
+                await self._acquire(*limited)
+            t0 = time.time()
+            try:
+                timeout = aiohttp.ClientTimeout(total=min(ENDPOINT_ATTEMPT_TIMEOUT, remaining))
+                async with session.get(url, params=params, timeout=timeout) as response:
+                    if limited is not None:
+                        rate_governor.observe(limited[0], response.status, response.headers)
+                    if response.status in RATE_LIMITED_STATUS:
+                        raise RateLimitExceeded(f"{endpoints.name} HTTP {response.status}: {path}")
+                    if is_client_error(response.status):
+                        raise EndpointClientError(f"{endpoints.name} HTTP {response.status}: {path} {params}",
+                                                  response.status)
+                    response.raise_for_status()
+                    body = await response.read()
+                    if cassette.recording:
+                        cassette.record('GET', url, params, response.status, response.headers, body, time.time() - t0)
+                    data = json.loads(body)
+                endpoints.record_success(base, time.time() - t0)
+                return data
+            except (RateLimitExceeded, EndpointClientError, CassetteMiss):
+                raise
+            except Exception as e:
+                last_exc = e
+                if self._is_endpoint_fault(e):
+                    endpoints.record_failure(base, time.time() - t0)
+        raise RuntimeError(f"{endpoints.name} 请求失败（{time.time() - start:.1f}s）: {path} {params} -> {last_exc}")
+
+    @staticmethod
+    def _is_endpoint_fault(exc: Exception) -> bool:
+        """与同步版一致：只有超时、连接错误和 5xx 计入端点故障"""
+        if isinstance(exc, (asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+            return True
+        return isinstance(exc, aiohttp.ClientResponseError) and exc.status >= 500
+
+    @staticmethod
+    async def _replay(url: str, params: Dict[str, Any]) -> Any:
+        """离线回放录制的响应（按录制耗时异步等待，不占用事件循环）"""
+        interaction = cassette.lookup('GET', url, params)
+        wait = cassette.delay(interaction)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if interaction.status >= 400:
+            raise RuntimeError(f"回放响应 HTTP {interaction.status}: {url}")
+        return json.loads(interaction.body)
+
+    @staticmethod
+    async def _acquire(provider: str, weight: float, priority: int) -> None:
+        """异步排队申请限流配额（不阻塞事件循环）"""
+        deadline = time.time() + RATE_LIMIT_MAX_WAIT
+        waited = False
+        while True:
+            wait = rate_governor.try_acquire(provider, weight, priority)
+            if wait <= 0:
+                if waited:
+                    rate_governor.buckets[provider].waited += 1
+                return
+            if time.time() + wait > deadline:
+                rate_governor.buckets[provider].throttled += 1
+                raise RateLimitExceeded(f"{provider} 配额不足（权重{weight}，优先级{priority}）")
+            waited = True
+            await asyncio.sleep(min(wait, 1.0))
+
+    async def _binance_get(self, path: str, params: Dict[str, Any]) -> Any:
+        return await self._endpoint_get(spot_endpoints, path, params)
+
+    async def _binance_fapi_get(self, path: str, params: Dict[str, Any]) -> Any:
+        return await self._endpoint_get(fapi_endpoints, path, params)
+
+    # -------- 行情 --------
+    async def get_all_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, tuple]:
+        """一次批量请求获取 {symbol: (price, change_percent)}"""
+        symbols = list(CRYPTO_SYMBOLS.keys()) if symbols is None else symbols
+        pair_to_symbol = {CRYPTO_SYMBOLS[s]: s for s in symbols if CRYPTO_SYMBOLS.get(s)}
+        data = await self._binance_get('/api/v3/ticker/24hr', {
+            'symbols': json.dumps(list(pair_to_symbol.keys()), separators=(',', ':'))
+        })
+        result: Dict[str, tuple] = {}
+        for item in data if isinstance(data, list) else []:
+            symbol = pair_to_symbol.get(item.get('symbol'))
+            if symbol is not None:
+                result[symbol] = (float(item['lastPrice']), float(item['priceChangePercent']))
+        return result
+
+    async def get_recent_klines(self, symbol: str, limit: int = 3) -> List[Dict[str, Any]]:
+        raw = await self._binance_get('/api/v3/klines', {
+            'symbol': CRYPTO_SYMBOLS[symbol],
+            'interval': KLINE_INTERVAL,
+            'limit': max(1, min(limit, 1000))
+        })
+        return parse_binance_klines(raw)
+
+    async def get_open_interest(self, symbol: str) -> float:
+        data = await self._binance_fapi_get('/fapi/v1/openInterest', {'symbol': CRYPTO_SYMBOLS[symbol]})
+        return float(data.get('openInterest', 0.0))
+
+    async def get_open_interest_avg(self, symbol: str, period: str = '5m', limit: int = 30) -> float:
+        data = await self._binance_fapi_get('/futures/data/openInterestHist', {
+            'symbol': CRYPTO_SYMBOLS[symbol],
+            'period': period,
+            'limit': limit
+        })
+        return parse_open_interest_avg(data)
+
+    async def get_funding_rate(self, symbol: str) -> float:
+        data = await self._binance_fapi_get('/fapi/v1/fundingRate', {'symbol': CRYPTO_SYMBOLS[symbol], 'limit': 1})
+        return parse_funding_rate(data)
+
+    async def get_futures_metrics(self, symbol: str) -> Dict[str, float]:
+        """并发获取单个币种的 OI / OI 均值 / 资金费率，失败项记为 0"""
+        oi, oi_avg, funding = await asyncio.gather(
+            self.get_open_interest(symbol),
+            self.get_open_interest_avg(symbol),
+            self.get_funding_rate(symbol),
+            return_exceptions=True
+        )
+        return {
+            'open_interest': oi if isinstance(oi, float) else 0.0,
+            'open_interest_avg': oi_avg if isinstance(oi_avg, float) else 0.0,
+            'funding_rate': funding if isinstance(funding, float) else 0.0,
+        }
+
+    async def refresh_snapshot(self, symbols: Optional[List[str]] = None, kline_limit: int = 2,
+                               include_futures: bool = True) -> Dict[str, Any]:
+        """
+        并发刷新所有币种：批量行情 + 近期K线 + 每币种合约指标。
+        返回 {'prices', 'changes', 'klines', 'futures'}，并回填同步 MarketData 的价格缓存。
+
+        K线按需请求：WebSocket 数据新鲜的币种直接取流；其余币种每根K线周期只请求一次
+        （收盘K线定稿），周期内形成中的K线由调用方用批量行情价格更新，请求数不随刷新频率增长。
+        """
+        symbols = list(CRYPTO_SYMBOLS.keys()) if symbols is None else symbols
+        stream = self.market_data.stream if self.market_data is not None else None
+        bar = int(time.time() * 1000) // self._bar_ms
+        streamed: Dict[str, List[Dict[str, Any]]] = {}
+        kline_symbols = []
+        for s in symbols:
+            candles = stream.get_recent_klines(s, kline_limit) if stream is not None else None
+            if candles is not None:
+                streamed[s] = candles
+            elif self._kline_bar.get(s) != bar:
+                kline_symbols.append(s)
+        tasks = [self.get_all_prices(symbols)]
+        tasks += [self.get_recent_klines(s, kline_limit) for s in kline_symbols]
+        if include_futures:
+            tasks += [self.get_futures_metrics(s) for s in symbols]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        snapshot: Dict[str, Any] = {'prices': {}, 'changes': {}, 'klines': {}, 'futures': {}}
+        tickers = results[0]
+        if isinstance(tickers, dict):
+            for symbol, (price, change_percent) in tickers.items():
+                snapshot['prices'][symbol] = price
+                snapshot['changes'][symbol] = change_percent
+        else:
+            print(f"⚠ 异步批量价格失败: {tickers}", flush=True)
+        snapshot['klines'].update(streamed)
+        for i, symbol in enumerate(kline_symbols):
+            klines = results[1 + i]
+            if isinstance(klines, list) and klines:
+                snapshot['klines'][symbol] = klines
+                self._kline_bar[symbol] = bar
+        if include_futures:
+            base = 1 + len(kline_symbols)
+            for i, symbol in enumerate(symbols):
+                if isinstance(results[base + i], dict):
+                    snapshot['futures'][symbol] = results[base + i]
+
+        if self.market_data is not None:
+            now = time.time()
+            for symbol, price in snapshot['prices'].items():
+                self.market_data._store_price(symbol, price, snapshot['changes'][symbol], now)
+        return snapshot
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    # -------- 同步门面 --------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='async-market-data', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def run_sync(self, coro, timeout: Optional[float] = None) -> Any:
+        """在后台事件循环中执行协程并阻塞等待结果（会话与连接池跨调用复用）"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result(timeout)
+
+    def refresh_snapshot_sync(self, symbols: Optional[List[str]] = None, kline_limit: int = 2,
+                              include_futures: bool = True) -> Dict[str, Any]:
+        return self.run_sync(self.refresh_snapshot(symbols, kline_limit, include_futures),
+                             timeout=BINANCE_REQUEST_DEADLINE * 3)
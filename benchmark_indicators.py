@@ -0,0 +1,363 @@
+"""
+指标基准与一致性测试
+对同一份 OHLCV 数据（合成 GBM / 本地K线库录制的真实K线，100 ~ 1M 行）运行所有指标实现：
+  python       纯 Python 逐元素循环（滚动均值版 + Wilder 版，作为参考答案）
+  pandas       kline_data.add_indicator_columns（calculate_indicators 的 pandas 路径）
+  numpy        TechnicalIndicators 向量化单序列
+  numpy_batch  TechnicalIndicators *_batch（币种 × 时间 二维一次算完）
+  incremental  IndicatorEngine 逐根递推
+计时每条路径，并断言同一定义的实现数值一致（滚动均值族：python/pandas/incremental；Wilder 族：python/numpy），
+两族之间的差异只作为信息输出。结果写成 JSON 报告，可与上一次报告对比发现速度或数值回退。
+
+用法：
+  python benchmark_indicators.py --rows 100,1000,10000 --output report.json
+  python benchmark_indicators.py --recorded --baseline last_report.json --max-slowdown 1.5
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+import pandas as pd
+
+from config import KLINE_STORE_DIR, KLINE_INTERVAL
+from kline_store import kline_store
+from kline_data import KLineData, add_indicator_columns
+from indicator_engine import IndicatorEngine
+from technical_indicators import TechnicalIndicators
+
+DEFAULT_ROWS = (100, 1_000, 10_000, 100_000, 1_000_000)
+TOLERANCE = 1e-9  # 相对误差（按 max(1, |参考值|) 归一）
+SERIES_KEYS = ('ema_20', 'ema_50', 'macd', 'macd_signal', 'rsi_7', 'rsi_14', 'atr_3', 'atr_14')
+
+
+def _log(msg: str) -> None:
+    print(msg, file=sys.stderr, flush=True)
+
+
+# -------- 数据 --------
+def synthetic_ohlcv(rows: int, seed: int = 7, start_price: float = 65000.0) -> Dict[str, np.ndarray]:
+    """几何布朗运动 1m K线（年化波动约 80%）"""
+    rng = np.random.default_rng(seed)
+    sigma = 0.8 / math.sqrt(365 * 1440)
+    closes = start_price * np.exp(np.cumsum(rng.normal(0, sigma, rows)))
+    opens = np.concatenate(([start_price], closes[:-1]))
+    wick = np.abs(rng.normal(0, sigma, rows)) * 0.5
+    return {
+        'timestamp': (np.arange(rows, dtype=np.int64) + 28_000_000) * 60_000,
+        'open': opens,
+        'high': np.maximum(opens, closes) * (1 + wick),
+        'low': np.minimum(opens, closes) * (1 - wick),
+        'close': closes,
+        'volume': rng.lognormal(3, 1, rows),
+    }
+
+
+def recorded_fixtures(min_rows: int = 100) -> Dict[str, Dict[str, np.ndarray]]:
+    """本地K线库中每个币种的全部 1m K线"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(KLINE_STORE_DIR, f"*_{KLINE_INTERVAL}.bin"))):
+        symbol = os.path.basename(path)[:-len(f"_{KLINE_INTERVAL}.bin")]
+        records = kline_store.read(symbol, 10 ** 9)
+        if len(records) >= min_rows:
+            fixtures[f"recorded:{symbol}"] = {name: records[name] for name in records.dtype.names}
+    return fixtures
+
+
+def _candles(data: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    names = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+    return [dict(zip(names, row)) for row in zip(*(data[n].tolist() for n in names))]
+
+
+# -------- 纯 Python 参考实现 --------
+def _py_ema(values: List[float], span: int, sma_seed: bool) -> List[float]:
+    """sma_seed=False：首值为种子（pandas adjust=False）；True：前 span 个的 SMA 为种子（TechnicalIndicators）"""
+    alpha = 2 / (span + 1)
+    if sma_seed:
+        if len(values) < span:
+            return []
+        out = [sum(values[:span]) / span]
+        rest = values[span:]
+    else:
+        out = [values[0]]
+        rest = values[1:]
+    for x in rest:
+        out.append((1 - alpha) * out[-1] + alpha * x)
+    return out
+
+
+def _py_rolling_mean(values: List[float], window: int) -> List[float]:
+    out, total = [], 0.0
+    for i, x in enumerate(values):
+        total += x
+        if i >= window:
+            total -= values[i - window]
+        out.append(total / window if i >= window - 1 else math.nan)
+    return out
+
+
+def _py_true_range(high, low, close) -> List[float]:
+    tr = [high[0] - low[0]]
+    for i in range(1, len(close)):
+        tr.append(max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])))
+    return tr
+
+
+def _py_wilder(values: List[float], period: int) -> List[float]:
+    if len(values) < period:
+        return []
+    out = [sum(values[:period]) / period]
+    for x in values[period:]:
+        out.append((out[-1] * (period - 1) + x) / period)
+    return out
+
+
+def python_rolling(data: Dict[str, np.ndarray]) -> Dict[str, List[float]]:
+    """与 pandas 路径同定义：EMA 首值种子，RSI/ATR 为滚动均值"""
+    close, high, low = data['close'].tolist(), data['high'].tolist(), data['low'].tolist()
+    ema12, ema26 = _py_ema(close, 12, False), _py_ema(close, 26, False)
+    macd = [a - b for a, b in zip(ema12, ema26)]
+    signal = _py_ema(macd, 9, False)
+    gains = [0.0] + [max(close[i] - close[i - 1], 0.0) for i in range(1, len(close))]
+    losses = [0.0] + [max(close[i - 1] - close[i], 0.0) for i in range(1, len(close))]
+    out = {'ema_20': _py_ema(close, 20, False), 'ema_50': _py_ema(close, 50, False),
+           'macd': macd, 'macd_signal': signal}
+    for period in (7, 14):
+        g, l = _py_rolling_mean(gains, period), _py_rolling_mean(losses, period)
+        out[f'rsi_{period}'] = [
+            math.nan if math.isnan(a) or (a == 0 and b == 0) else (100.0 if b == 0 else 100 - 100 / (1 + a / b))
+            for a, b in zip(g, l)]
+    tr = _py_true_range(high, low, close)
+    out['atr_3'], out['atr_14'] = _py_rolling_mean(tr, 3), _py_rolling_mean(tr, 14)
+    return out
+
+
+def python_wilder(data: Dict[str, np.ndarray]) -> Dict[str, List[float]]:
+    """与 TechnicalIndicators 同定义：EMA 以 SMA 为种子，RSI/ATR 为 Wilder 平滑"""
+    close, high, low = data['close'].tolist(), data['high'].tolist(), data['low'].tolist()
+    ema12, ema26 = _py_ema(close, 12, True), _py_ema(close, 26, True)
+    macd = [a - b for a, b in zip(ema12[14:], ema26)]
+    out = {'ema_20': _py_ema(close, 20, True), 'ema_50': _py_ema(close, 50, True),
+           'macd': macd, 'macd_signal': _py_ema(macd, 9, True)}
+    deltas = [close[i] - close[i - 1] for i in range(1, len(close))]
+    for period in (7, 14):
+        g = _py_wilder([max(d, 0.0) for d in deltas], period)
+        l = _py_wilder([max(-d, 0.0) for d in deltas], period)
+        out[f'rsi_{period}'] = [100.0 if b == 0 else 100 - 100 / (1 + a / b) for a, b in zip(g, l)]
+    tr = _py_true_range(high, low, close)[1:]
+    out['atr_3'], out['atr_14'] = _py_wilder(tr, 3), _py_wilder(tr, 14)
+    return out
+
+
+# -------- 被测实现 --------
+def run_pandas(data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    df = pd.DataFrame({k: data[k] for k in ('open', 'high', 'low', 'close', 'volume')})
+    add_indicator_columns(df)
+    columns = {'ema_20': 'EMA_20', 'ema_50': 'EMA_50', 'macd': 'MACD_12_26_9', 'macd_signal': 'MACDs_12_26_9',
+               'rsi_7': 'RSI_7', 'rsi_14': 'RSI_14', 'atr_3': 'ATRr_3', 'atr_14': 'ATRr_14'}
+    return {key: df[col].to_numpy() for key, col in columns.items()}
+
+
+def run_numpy(data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    ti = TechnicalIndicators
+    close, high, low = data['close'], data['high'], data['low']
+    macd, signal, _ = ti.macd_series(close)
+    return {'ema_20': ti.ema_series(close, 20), 'ema_50': ti.ema_series(close, 50),
+            'macd': macd, 'macd_signal': signal,
+            'rsi_7': ti.rsi_series(close, 7), 'rsi_14': ti.rsi_series(close, 14),
+            'atr_3': ti.atr_series(high, low, close, 3), 'atr_14': ti.atr_series(high, low, close, 14)}
+
+
+def run_numpy_batch(data: Dict[str, np.ndarray], batch: int) -> Dict[str, np.ndarray]:
+    """同一序列复制 batch 行，模拟多币种一次计算；返回第一行"""
+    ti = TechnicalIndicators
+    close, high, low = (np.tile(data[k], (batch, 1)) for k in ('close', 'high', 'low'))
+    macd, signal, _ = ti.macd_batch(close)
+    out = {'ema_20': ti.ema_batch(close, 20), 'ema_50': ti.ema_batch(close, 50),
+           'macd': macd, 'macd_signal': signal,
+           'rsi_7': ti.rsi_batch(close, 7), 'rsi_14': ti.rsi_batch(close, 14),
+           'atr_3': ti.atr_batch(high, low, close, 3), 'atr_14': ti.atr_batch(high, low, close, 14)}
+    return {k: v[0] for k, v in out.items()}
+
+
+def run_incremental(candles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # 只启用核心指标，与其余路径计算同一组指标
+    engine = IndicatorEngine(indicators=())
+    for c in candles:
+        engine.update('BENCH', c)
+    return engine.snapshot('BENCH')
+
+
+# -------- 比较 --------
+def max_error(actual, expected) -> float:
+    """相对误差上限；NaN 位置不一致视为无穷大"""
+    a, e = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    if a.shape != e.shape:
+        return math.inf
+    nan_a, nan_e = np.isnan(a), np.isnan(e)
+    if (nan_a != nan_e).any():
+        return math.inf
+    if nan_e.all():
+        return 0.0
+    return float(np.max(np.abs(a[~nan_e] - e[~nan_e]) / np.maximum(1.0, np.abs(e[~nan_e]))))
+
+
+def timed(fn: Callable, repeat: int):
+    """最优耗时与最后一次结果"""
+    best, result = math.inf, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+class Benchmark:
+    def __init__(self, repeat: int = 3, batch: int = 8, max_python_rows: int = 100_000,
+                 max_incremental_rows: int = 100_000, tolerance: float = TOLERANCE):
+        self.repeat = repeat
+        self.batch = batch
+        self.max_python_rows = max_python_rows
+        self.max_incremental_rows = max_incremental_rows
+        self.tolerance = tolerance
+        self.timings: List[Dict[str, Any]] = []
+        self.parity: List[Dict[str, Any]] = []
+        self.divergence: List[Dict[str, Any]] = []
+
+    def _time(self, fixture: str, rows: int, path: str, fn: Callable, repeat: Optional[int] = None):
+        seconds, result = timed(fn, repeat or self.repeat)
+        self.timings.append({'fixture': fixture, 'rows': rows, 'path': path, 'seconds': round(seconds, 6),
+                             'rows_per_sec': round(rows / seconds) if seconds > 0 else None})
+        return result
+
+    def _check(self, fixture: str, rows: int, check: str, key: str, actual, expected) -> None:
+        err = max_error(actual, expected)
+        self.parity.append({'fixture': fixture, 'rows': rows, 'check': check, 'indicator': key,
+                            'max_error': err if math.isfinite(err) else 'mismatch',
+                            'tolerance': self.tolerance, 'ok': err <= self.tolerance})
+
+    def run_fixture(self, fixture: str, data: Dict[str, np.ndarray]) -> None:
+        rows = len(data['close'])
+        _log(f"⏱  {fixture}: {rows} 行")
+        pandas_out = self._time(fixture, rows, 'pandas', lambda: run_pandas(data))
+        numpy_out = self._time(fixture, rows, 'numpy', lambda: run_numpy(data))
+        batch_out = self._time(fixture, rows * self.batch, 'numpy_batch', lambda: run_numpy_batch(data, self.batch))
+        for key in SERIES_KEYS:
+            self._check(fixture, rows, 'numpy_batch == numpy', key, batch_out[key], numpy_out[key])
+
+        if rows <= self.max_python_rows:
+            rolling = self._time(fixture, rows, 'python_rolling', lambda: python_rolling(data), repeat=1)
+            wilder = self._time(fixture, rows, 'python_wilder', lambda: python_wilder(data), repeat=1)
+            for key in SERIES_KEYS:
+                self._check(fixture, rows, 'pandas == python_rolling', key, pandas_out[key], rolling[key])
+                self._check(fixture, rows, 'numpy == python_wilder', key, numpy_out[key], wilder[key])
+
+        if rows <= self.max_incremental_rows:
+            candles = _candles(data)
+            snap = self._time(fixture, rows, 'incremental', lambda: run_incremental(candles), repeat=1)
+            if snap is not None:
+                for key in SERIES_KEYS:
+                    if key in snap:
+                        self._check(fixture, rows, 'incremental == pandas (latest)', key, [snap[key]],
+                                    pandas_out[key][-1:])
+                for key in ('ema_20', 'macd', 'rsi_7', 'rsi_14'):
+                    tail = pandas_out[key][-len(snap[f'{key}_series']):]
+                    self._check(fixture, rows, 'incremental == pandas (series)', key, snap[f'{key}_series'], tail)
+            if rows >= 20:
+                self._check_kline_data(fixture, rows, candles)
+
+        # 两种定义之间的差异（信息性，不参与通过判定）
+        for key in ('rsi_14', 'atr_14'):
+            rolling_last, wilder_last = float(pandas_out[key][-1]), float(numpy_out[key][-1]) if len(numpy_out[key]) else math.nan
+            self.divergence.append({'fixture': fixture, 'rows': rows, 'indicator': key, 'rolling_mean': rolling_last,
+                                    'wilder': wilder_last, 'abs_diff': abs(rolling_last - wilder_last)})
+
+    def _check_kline_data(self, fixture: str, rows: int, candles: List[Dict[str, Any]]) -> None:
+        """KLineData 两条路径（pandas 200 行窗口 / 增量引擎）的 RSI 与 ATR 必须一致且不为空（窗口无关的指标）"""
+        kd = KLineData(market_data=None)
+        kd.store = None
+        kd._set_series('BENCH', candles[-kd.max_length:])
+        full, fast = kd.calculate_indicators_pandas('BENCH'), kd.calculate_indicators('BENCH')
+        for key in ('rsi_7', 'rsi_14', 'atr_3', 'atr_14'):
+            ok = full.get(key) is not None and fast.get(key) is not None
+            self._check(fixture, rows, 'KLineData pandas == engine', key,
+                        [fast[key] if ok else math.nan], [full[key] if ok else 0.0])
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                            'pandas': pd.__version__, 'machine': platform.machine()},
+            'tolerance': self.tolerance,
+            'ok': all(p['ok'] for p in self.parity),
+            'timings': self.timings,
+            'parity': self.parity,
+            'divergence': self.divergence,
+        }
+
+
+def compare_baseline(report: Dict[str, Any], baseline: Dict[str, Any], max_slowdown: float) -> List[Dict[str, Any]]:
+    """与上一次报告逐条对比，耗时超过 max_slowdown 倍的记为回退（基线过短的忽略）"""
+    previous = {(t['fixture'], t['rows'], t['path']): t['seconds'] for t in baseline.get('timings', [])}
+    regressions = []
+    for t in report['timings']:
+        before = previous.get((t['fixture'], t['rows'], t['path']))
+        if before and before >= 1e-4 and t['seconds'] > before * max_slowdown:
+            regressions.append({'fixture': t['fixture'], 'rows': t['rows'], 'path': t['path'],
+                                'baseline_seconds': before, 'seconds': t['seconds'],
+                                'slowdown': round(t['seconds'] / before, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指标实现的速度与数值一致性基准')
+    parser.add_argument('--rows', default=','.join(str(r) for r in DEFAULT_ROWS), help='合成数据行数，逗号分隔')
+    parser.add_argument('--recorded', action='store_true', help='同时使用本地K线库中录制的真实K线')
+    parser.add_argument('--repeat', type=int, default=3, help='向量化路径重复次数（取最优）')
+    parser.add_argument('--batch', type=int, default=8, help='numpy_batch 的行数（币种数）')
+    parser.add_argument('--max-python-rows', type=int, default=100_000, help='超过该行数跳过纯 Python 路径')
+    parser.add_argument('--max-incremental-rows', type=int, default=100_000, help='超过该行数跳过增量引擎路径')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--output', help='报告写入路径（默认输出到 stdout）')
+    parser.add_argument('--baseline', help='上一次的报告，用于检测速度回退')
+    parser.add_argument('--max-slowdown', type=float, default=1.5)
+    args = parser.parse_args()
+
+    bench = Benchmark(repeat=args.repeat, batch=args.batch, max_python_rows=args.max_python_rows,
+                      max_incremental_rows=args.max_incremental_rows, tolerance=args.tolerance)
+    for rows in (int(r) for r in args.rows.split(',') if r):
+        bench.run_fixture('synthetic', synthetic_ohlcv(rows))
+    if args.recorded:
+        for name, data in recorded_fixtures().items():
+            bench.run_fixture(name, data)
+
+    report = bench.report()
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare_baseline(report, json.load(f), args.max_slowdown)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        _log(f"✓ 报告已写入 {args.output}")
+    else:
+        print(text)
+
+    failed = [p for p in report['parity'] if not p['ok']]
+    for p in failed:
+        _log(f"❌ {p['fixture']} {p['rows']} 行 {p['check']} [{p['indicator']}]: 误差 {p['max_error']}")
+    for r in report.get('regressions', []):
+        _log(f"🐢 {r['fixture']} {r['rows']} 行 {r['path']}: {r['baseline_seconds']}s -> {r['seconds']}s")
+    sys.exit(1 if failed or report.get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Binance WebSocket 实时行情模块
+订阅组合流 <pair>@kline_1m 与 <pair>@miniTicker，实时维护价格与正在形成的K线，
+断线自动重连并通过 REST 回补缺口；可选同时订阅盘口流并交给 OrderBook 处理。
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from config import (
+    CRYPTO_SYMBOLS,
+    KLINE_INTERVAL,
+    KLINE_LIMIT,
+    BINANCE_WS_BASE_URL,
+    STREAM_STALE_SECONDS,
+    STREAM_IDLE_TIMEOUT,
+    STREAM_RECONNECT_MAX_DELAY,
+    ORDER_BOOK_STREAM,
+)
+from kline_store import interval_ms
+
+
+def merge_candle(candles: List[Dict[str, Any]], candle: Dict[str, Any]) -> None:
+    """把一根K线合并进按时间排序的列表：同一时间戳原地覆盖（形成中的K线），更新的追加"""
+    if candles and candles[-1]['timestamp'] == candle['timestamp']:
+        candles[-1] = candle
+    elif not candles or candle['timestamp'] > candles[-1]['timestamp']:
+        candles.append(candle)
+
+
+class BinanceStream:
+    """Binance 组合流客户端（后台线程运行，线程安全读取）"""
+
+    def __init__(self, market_data=None, symbols: Optional[Dict[str, str]] = None,
+                 base_url: Optional[str] = None, max_candles: int = KLINE_LIMIT, order_book=None):
+        # market_data 仅用于断线后的 REST 回补，可为空
+        self.market_data = market_data
+        # 盘口（可选）：订阅 <pair>@bookTicker 并把消息交给 OrderBook
+        self.order_book = order_book
+        self.symbols = symbols if symbols is not None else CRYPTO_SYMBOLS
+        self.base_url = (base_url or BINANCE_WS_BASE_URL).rstrip('/')
+        self.max_candles = max_candles
+
+        self.prices: Dict[str, float] = {}
+        self.price_changes: Dict[str, float] = {}
+        self.last_update: Dict[str, float] = {}
+        self.klines: Dict[str, List[Dict[str, Any]]] = {}
+
+        self.lock = threading.Lock()
+        self.running = False
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+        self._ws = None
+        self._thread: Optional[threading.Thread] = None
+        self._pair_map: Dict[str, str] = {}
+
+    # -------- 生命周期 --------
+    def stream_url(self) -> str:
+        streams = []
+        for pair in self.symbols.values():
+            p = pair.lower()
+            streams.append(f"{p}@kline_{KLINE_INTERVAL}")
+            streams.append(f"{p}@miniTicker")
+            if self.order_book is not None:
+                streams.append(f"{p}@{ORDER_BOOK_STREAM}")
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='binance-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        import simple_websocket
+
+        delay = 1
+        while self.running:
+            try:
+                self._ws = simple_websocket.Client.connect(self.stream_url())
+                self.connected = True
+                delay = 1
+                print(f"✓ Binance WebSocket 已连接（{len(self.symbols)} 个币种）", flush=True)
+                # 连接建立后先回补断线期间缺失的K线
+                self._backfill()
+                while self.running:
+                    msg = self._ws.receive(timeout=STREAM_IDLE_TIMEOUT)
+                    if msg is None:
+                        raise TimeoutError(f"{STREAM_IDLE_TIMEOUT}秒无消息")
+                    self.handle_message(msg)
+            except Exception as e:
+                if self.running:
+                    print(f"⚠ Binance WebSocket 断开: {e}，{delay}秒后重连", flush=True)
+            finally:
+                self.connected = False
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+            if self.running:
+                time.sleep(delay)
+                delay = min(delay * 2, STREAM_RECONNECT_MAX_DELAY)
+                self.reconnects += 1
+
+    # -------- 消息处理 --------
+    def handle_message(self, raw) -> None:
+        """处理一条组合流消息：{"stream": "...", "data": {...}}"""
+        # 盘口消息频率最高，走 OrderBook 的定长解析，不做完整 JSON 解码
+        if self.order_book is not None and self.order_book.handle_message(raw):
+            self.messages += 1
+            return
+        msg = json.loads(raw)
+        data = msg.get('data', msg)
+        event = data.get('e')
+        if len(self._pair_map) != len(self.symbols):
+            self._pair_map = {p: sym for sym, p in self.symbols.items()}
+        symbol = self._pair_map.get(data.get('s'))
+        if symbol is None:
+            return
+
+        now = time.time()
+        self.messages += 1
+        if event == '24hrMiniTicker':
+            price = float(data['c'])
+            open_24h = float(data['o'])
+            with self.lock:
+                self.prices[symbol] = price
+                self.price_changes[symbol] = ((price - open_24h) / open_24h) * 100 if open_24h else 0.0
+                self.last_update[symbol] = now
+        elif event == 'kline':
+            k = data['k']
+            candle = {
+                'timestamp': int(k['t']),
+                'open': float(k['o']),
+                'high': float(k['h']),
+                'low': float(k['l']),
+                'close': float(k['c']),
+                'volume': float(k['v'])
+            }
+            with self.lock:
+                self._merge(symbol, candle)
+                # K线收盘价同样是最新成交价
+                self.prices[symbol] = candle['close']
+                self.last_update[symbol] = now
+
+    def _merge(self, symbol: str, candle: Dict[str, Any]) -> None:
+        candles = self.klines.setdefault(symbol, [])
+        merge_candle(candles, candle)
+        if len(candles) > self.max_candles:
+            del candles[:len(candles) - self.max_candles]
+
+    def _backfill(self) -> None:
+        """按最后一根K线的时间戳回补缺口"""
+        if self.market_data is None:
+            return
+        now_ms = int(time.time() * 1000)
+        for symbol in list(self.symbols.keys()):
+            with self.lock:
+                candles = self.klines.get(symbol)
+                last_ts = candles[-1]['timestamp'] if candles else None
+            # 无历史时只取最近2根作为种子，完整历史由 KLineData 初始化
+            missing = 2 if last_ts is None else (now_ms - last_ts) // interval_ms(KLINE_INTERVAL) + 1
+            if missing <= 1:
+                continue
+            try:
+                recent = self.market_data.get_recent_klines(symbol, limit=min(missing + 1, 1000), use_stream=False)
+                with self.lock:
+                    for c in recent:
+                        self._merge(symbol, c)
+                print(f"  ✓ {symbol} WebSocket 缺口回补 {len(recent)} 根K线", flush=True)
+            except Exception as e:
+                print(f"  ⚠ {symbol} WebSocket 缺口回补失败: {e}", flush=True)
+
+    # -------- 读取接口 --------
+    def is_fresh(self, symbol: str) -> bool:
+        ts = self.last_update.get(symbol)
+        return self.connected and ts is not None and (time.time() - ts) < STREAM_STALE_SECONDS
+
+    def get_price(self, symbol: str) -> Optional[tuple]:
+        """返回 (price, change_percent)；数据过期时返回 None"""
+        if not self.is_fresh(symbol):
+            return None
+        with self.lock:
+            if symbol not in self.prices:
+                return None
+            return self.prices[symbol], self.price_changes.get(symbol, 0.0)
+
+    def get_recent_klines(self, symbol: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """返回最近 limit 根K线（最后一根可能仍在形成中）；数据不足或过期时返回 None"""
+        if not self.is_fresh(symbol):
+            return None
+        with self.lock:
+            candles = self.klines.get(symbol, [])
+            if len(candles) < limit:
+                return None
+            return [dict(c) for c in candles[-limit:]]
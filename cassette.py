@@ -0,0 +1,174 @@
+"""
+HTTP 录制/回放模块
+record 模式下把每次外部请求的响应追加写入压缩数据文件并记录索引；
+replay 模式下只加载索引，按请求顺序离线返回录制的响应，并按原始或加速后的耗时等待。
+
+文件格式（HTTP_CASSETTE_PATH 为前缀）：
+    <path>.dat   每条响应体一段 zlib 压缩数据，只追加
+    <path>.idx   每行一个 JSON 索引：key / 偏移 / 长度 / 状态码 / 响应头 / 耗时 / 录制时间
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit, urlencode, parse_qsl
+
+import requests
+
+from config import HTTP_CASSETTE_MODE, HTTP_CASSETTE_PATH, HTTP_CASSETTE_SPEED
+
+# 不参与匹配的参数：密钥与随时间变化的时间戳
+VOLATILE_PARAMS = {'token', 'auth_token', 'api_key', 'x_cg_demo_api_key', 'startTime', 'endTime', 'from', 'to'}
+
+# 回放时需要的响应头（其余不保存）
+KEPT_HEADERS = ('Content-Type', 'X-MBX-USED-WEIGHT-1M', 'Retry-After')
+
+# api1.binance.com / fapi2.binance.com 等镜像归并为同一主机
+_MIRROR_RE = re.compile(r'^(api|fapi)\d+\.')
+
+
+class CassetteMiss(RuntimeError):
+    """回放模式下没有匹配的录制响应（调用方按网络错误处理，走原有兜底）"""
+
+
+def request_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """METHOD host/path?稳定参数（排序，去掉密钥与时间戳）"""
+    parts = urlsplit(url)
+    host = _MIRROR_RE.sub(r'\1.', parts.hostname or '')
+    query = dict(parse_qsl(parts.query))
+    query.update({k: str(v) for k, v in (params or {}).items() if v is not None})
+    stable = sorted((k, v) for k, v in query.items() if k not in VOLATILE_PARAMS)
+    return f"{method.upper()} {host}{parts.path}?{urlencode(stable)}"
+
+
+class Interaction:
+    """一条录制的响应"""
+
+    __slots__ = ('status', 'headers', 'body', 'latency')
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, latency: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.latency = latency
+
+    def to_response(self, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers.update(self.headers)
+        response._content = self.body
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+
+class Cassette:
+    """进程内共享的录制/回放器"""
+
+    def __init__(self, mode: str = HTTP_CASSETTE_MODE, path: str = HTTP_CASSETTE_PATH,
+                 speed: float = HTTP_CASSETTE_SPEED):
+        self.mode = mode
+        self.path = path
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        # 回放：key -> [索引条目]，按录制顺序依次返回，用尽后重复最后一条
+        self._index: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._data = None
+        if mode == 'replay':
+            self._load_index()
+        elif mode == 'record':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            print(f"📼 HTTP 录制中: {path}.dat/.idx", flush=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    # -------- 录制 --------
+    def record(self, method: str, url: str, params: Optional[Dict[str, Any]], status: int,
+               headers, body: bytes, latency: float) -> None:
+        blob = zlib.compress(body or b'', 6)
+        entry = {
+            'key': request_key(method, url, params),
+            'status': status,
+            'headers': {h: headers[h] for h in KEPT_HEADERS if headers.get(h) is not None},
+            'latency': round(latency, 4),
+            't': round(time.time(), 3),
+            'len': len(blob),
+        }
+        with self.lock:
+            with open(f"{self.path}.dat", 'ab') as f:
+                entry['offset'] = f.tell()
+                f.write(blob)
+            with open(f"{self.path}.idx", 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self.recorded += 1
+
+    # -------- 回放 --------
+    def _load_index(self) -> None:
+        try:
+            with open(f"{self.path}.idx", encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index[entry['key']].append(entry)
+            self._data = open(f"{self.path}.dat", 'rb')
+            total = sum(len(v) for v in self._index.values())
+            print(f"📼 HTTP 回放: {total} 条响应 / {len(self._index)} 个请求（倍速 {self.speed or '不等待'}）", flush=True)
+        except OSError as e:
+            print(f"⚠ 回放文件不可用，所有请求将视为未命中: {e}", flush=True)
+
+    def lookup(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Interaction:
+        """按录制顺序取下一条匹配的响应；未命中抛出 CassetteMiss"""
+        key = request_key(method, url, params)
+        with self.lock:
+            entries = self._index.get(key)
+            if not entries or self._data is None:
+                self.misses += 1
+                raise CassetteMiss(f"回放未命中: {key}")
+            i = self._cursor[key]
+            entry = entries[min(i, len(entries) - 1)]
+            self._cursor[key] = i + 1
+            self._data.seek(entry['offset'])
+            body = zlib.decompress(self._data.read(entry['len']))
+            self.replayed += 1
+        return Interaction(entry['status'], entry['headers'], body, entry['latency'])
+
+    def delay(self, interaction: Interaction) -> float:
+        """回放时应等待的秒数（原始耗时 / 倍速）"""
+        return interaction.latency / self.speed if self.speed > 0 else 0.0
+
+    def replay(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """同步回放：等待录制耗时后返回 requests.Response"""
+        interaction = self.lookup(method, url, params)
+        wait = self.delay(interaction)
+        if wait > 0:
+            time.sleep(wait)
+        return interaction.to_response(url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'path': self.path,
+            'speed': self.speed,
+            'recorded': self.recorded,
+            'replayed': self.replayed,
+            'misses': self.misses,
+        }
+
+
+# 进程内共享
+cassette = Cassette()
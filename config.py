@@ -26,6 +26,20 @@ CRYPTO_SYMBOLS = {
     'XRP': 'XRPUSDT'
 }
 
+# 动态币种池：>0 时启动时按合约24h成交额选取前 N 个 USDT 永续（现货须有同名交易对），
+# 就地更新 SUPPORTED_CRYPTOS / CRYPTO_SYMBOLS / COINGECKO_IDS；上面六个币种始终保留
+SYMBOL_UNIVERSE_TOP_N = int(os.getenv('SYMBOL_UNIVERSE_TOP_N', '0'))
+
+# CoinGecko 币种ID映射（兜底数据源，支持批量 ids=bitcoin,ethereum,...）
+COINGECKO_IDS = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum',
+    'SOL': 'solana',
+    'BNB': 'binancecoin',
+    'DOGE': 'dogecoin',
+    'XRP': 'ripple'
+}
+
 # Binance 基础端点（自动降级切换）
 BINANCE_BASE_URLS = [
     'https://api.binance.com',
@@ -35,11 +49,117 @@ BINANCE_BASE_URLS = [
     'https://api4.binance.com'
 ]
 
+# Binance 合约（U本位永续）端点
+BINANCE_FAPI_BASE_URLS = [
+    'https://fapi.binance.com',
+    'https://fapi1.binance.com',
+    'https://fapi2.binance.com',
+    'https://fapi3.binance.com'
+]
+
+# 逗号分隔覆盖（如指向本地模拟交易所 mock_exchange.py：http://127.0.0.1:9100）
+if os.getenv('BINANCE_BASE_URLS'):
+    BINANCE_BASE_URLS = os.getenv('BINANCE_BASE_URLS').split(',')
+if os.getenv('BINANCE_FAPI_BASE_URLS'):
+    BINANCE_FAPI_BASE_URLS = os.getenv('BINANCE_FAPI_BASE_URLS').split(',')
+
+# HTTP 录制/回放（off | record | replay），覆盖所有经 HttpClient / AsyncMarketData 的外部请求
+HTTP_CASSETTE_MODE = os.getenv('HTTP_CASSETTE_MODE', 'off')
+HTTP_CASSETTE_PATH = os.getenv('HTTP_CASSETTE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cassettes', 'session'))
+HTTP_CASSETTE_SPEED = float(os.getenv('HTTP_CASSETTE_SPEED', '1'))  # 回放延迟倍速：1=原始耗时，10=加速10倍，0=不等待
+
+# 限流（令牌桶，按交易所权重/配额节流；(容量, 窗口秒)）
+RATE_LIMITS = {
+    'binance_spot': (6000, 60),  # 现货 REQUEST_WEIGHT 6000/分钟
+    'binance_fapi': (2400, 60),  # 合约 REQUEST_WEIGHT 2400/分钟
+    'finnhub': (60, 60),  # Finnhub 免费版 60次/分钟
+    'coingecko': (30, 60),  # CoinGecko 公共接口约 30次/分钟
+    'news': (120, 60),  # 新闻源合计
+}
+RATE_LIMIT_SAFETY = 0.9  # 最多使用配额的90%，留余量给服务器侧统计误差
+RATE_LIMIT_MAX_WAIT = 30  # 排队等待令牌的最长时间（秒），超时才报错
+
+# 端点选择与熔断（按滚动延迟/错误率选最快的健康端点）
+BINANCE_REQUEST_DEADLINE = float(os.getenv('BINANCE_REQUEST_DEADLINE', '8'))  # 单次请求总时限（秒），与镜像数量无关
+ENDPOINT_ATTEMPT_TIMEOUT = 4  # 单个端点单次尝试的超时（秒）
+ENDPOINT_FAILURE_THRESHOLD = 3  # 连续失败次数达到阈值后熔断
+ENDPOINT_OPEN_SECONDS = 30  # 熔断后多久允许探测恢复
+ENDPOINT_PROBE_INTERVAL = 15  # 后台探测间隔（秒）
+
+# HTTP 连接池（每个主机一个 keep-alive 连接池，复用 TCP+TLS 连接）
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))  # 每个主机最大并发连接数
+HTTP_DEFAULT_TIMEOUT = 10  # 未单独配置主机的默认超时（秒）
+HTTP_HOST_TIMEOUTS = {
+    'binance.com': 20,
+    'fapi.binance.com': 15,
+    'fapi1.binance.com': 15,
+    'fapi2.binance.com': 15,
+    'fapi3.binance.com': 15,
+    'finnhub.io': 12,
+    'api.coingecko.com': 10,
+    'dashscope.aliyuncs.com': 120,  # 思考模式需要更长时间
+}
+
 # K线与价格刷新参数
 KLINE_INTERVAL = '1m'
 KLINE_LIMIT = 500  # 初始拉取根数
+KLINE_BUFFER_DTYPE = os.getenv('KLINE_BUFFER_DTYPE', 'float64')  # 内存K线环形缓冲的 OHLCV 精度（float32 内存减半）
+INDICATOR_ENGINE_ENABLED = os.getenv('INDICATOR_ENGINE', '1') == '1'  # 增量指标引擎（关闭时回退为每次整体重算）
+# 核心指标（EMA/MACD/RSI/ATR，prompt 固定格式使用）之外启用的注册指标，见 indicator_registry.py
+INDICATORS = tuple(n for n in os.getenv('INDICATORS', 'bbands,vwap,obv,stoch').split(',') if n)
+# 多周期聚合（由 1m K线增量合成，prompt 的日内序列用 3m，长周期背景用 4h）
+MULTI_TIMEFRAMES = ('3m', '15m', '1h', '4h')
+TIMEFRAME_HISTORY_BARS = 120  # 每个周期保留的聚合K线根数
+TIMEFRAME_MIN_BARS = {'4h': 60}  # 低于该根数时不输出该周期（4h 沿用原 prompt 的 60 根要求），其余周期按指标最少 20 根
+# 原生高周期K线：直接向交易所拉取已收盘K线（每根收盘后刷新一次），替代用 1m K线回溯聚合
+NATIVE_TIMEFRAMES = tuple(tf for tf in os.getenv('NATIVE_TIMEFRAMES', '4h').split(',') if tf)  # 可加 1h,15m
+NATIVE_TIMEFRAME_BARS = 120  # 每个原生周期保留的已收盘K线根数（4h 需要至少 60 根）
+NATIVE_RETRY_SECONDS = 60  # 拉取失败后的重试间隔
 PRICE_REFRESH_SECONDS = 10  # 价格缓存10秒（避免API限制，Finnhub免费版60次/分钟）
 
+# 本地K线库（按币种/周期的只追加内存映射文件，重启无需重新拉取全部历史）
+KLINE_STORE_ENABLED = os.getenv('KLINE_STORE', '1') == '1'
+KLINE_STORE_DIR = os.getenv('KLINE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'klines'))
+KLINE_STORE_BACKFILL = int(os.getenv('KLINE_STORE_BACKFILL', '4320'))  # 空库首次同步回补根数（1m × 3天）
+KLINE_PAGE_LIMIT = 1000  # /api/v3/klines 单页上限
+
+# 价格看板：后台线程独占刷新，HTTP 接口只读快照，不再阻塞在上游请求上
+PRICE_BOARD_REFRESH_SECONDS = 5  # 后台刷新间隔（秒）
+PRICE_BOARD_MAX_STALENESS = float(os.getenv('PRICE_BOARD_MAX_STALENESS', '30'))  # 超过此时长的快照标记为过期（仍返回，降级而非阻塞）
+PRICE_BOARD_INITIAL_WAIT = 3  # 启动时尚无快照，读取方最多等待首次刷新的秒数
+
+# 对冲请求：主数据源超过其 p95 延迟未返回时，并行请求下一个数据源
+PRICE_HEDGING_ENABLED = os.getenv('PRICE_HEDGING', '1') == '1'
+HEDGE_DELAY_MIN = 0.2  # 对冲等待下限（秒）
+HEDGE_DELAY_MAX = 3.0  # 对冲等待上限（秒）
+HEDGE_DELAY_DEFAULT = 1.0  # 样本不足时的对冲等待（秒）
+
+# 合约指标缓存（OI、资金费率由后台按各自节奏刷新，prompt 直接读内存）
+DERIVATIVES_OI_REFRESH = 30  # 最新持仓量刷新间隔（秒）
+DERIVATIVES_FUNDING_REFRESH = 300  # 资金费率刷新间隔（秒，Binance 每8小时结算）
+DERIVATIVES_OI_HIST_REFRESH = 3600  # 持仓量历史重新校准间隔（秒）
+DERIVATIVES_OI_PERIOD = '5m'  # 持仓量滚动序列的采样周期
+DERIVATIVES_OI_WINDOW = 30  # 持仓量均值窗口（个采样点）
+DERIVATIVES_RETRY_SECONDS = 15  # 单个币种拉取失败后的重试间隔（秒），不等下一个完整周期
+DERIVATIVES_STALE_FACTOR = 3  # 距上次成功刷新超过 刷新间隔×该倍数 视为过期，prompt 中标注
+
+# WebSocket 实时行情（组合流 @kline_1m / @miniTicker，替代 REST 轮询）
+MARKET_DATA_STREAMING = os.getenv('MARKET_DATA_STREAMING', '0') == '1'
+BINANCE_WS_BASE_URL = os.getenv('BINANCE_WS_BASE_URL', 'wss://stream.binance.com:9443')
+STREAM_STALE_SECONDS = 5  # 流数据超过5秒未更新视为过期，回退 REST
+STREAM_IDLE_TIMEOUT = 30  # 连接30秒无消息视为断线，触发重连
+STREAM_RECONNECT_MAX_DELAY = 30  # 重连退避上限（秒）
+
+# 盘口（最优买卖价）：随 WebSocket 一起订阅 <pair>@bookTicker（或 depth5@100ms），维护真实中间价与价差
+ORDER_BOOK_ENABLED = os.getenv('ORDER_BOOK', '1') == '1'  # 仅在 MARKET_DATA_STREAMING 开启时生效
+ORDER_BOOK_STREAM = os.getenv('ORDER_BOOK_STREAM', 'bookTicker')  # bookTicker | depth5@100ms
+ORDER_BOOK_STALE_SECONDS = 5  # 盘口超过5秒未更新视为过期，回退成交价
+ORDER_BOOK_SAMPLE_SECONDS = 60  # 中间价/价差序列采样间隔（与1m K线对齐）
+ORDER_BOOK_SERIES_LEN = 120  # 序列保留的采样点数
+MARK_PRICE_SOURCE = os.getenv('MARK_PRICE_SOURCE', 'mid')  # 持仓估值：mid=盘口中间价（无新鲜盘口时用成交价）| last=成交价
+# 列式持仓簿：持仓存成 NumPy 列，每个 tick 向量化估值并按账户 bincount 汇总（大量交易员/持仓时开启）
+POSITION_BOOK_ENABLED = os.getenv('POSITION_BOOK', '0') == '1'
+
 # AI 模型配置 - 最新版本
 AI_MODELS = [
     {
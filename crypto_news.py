@@ -5,11 +5,12 @@
 支持多个免费API源
 """
 
-import requests
 from datetime import datetime
 from typing import List, Dict, Optional
 import time
 
+from http_client import get_http_client
+
 class CryptoNewsAPI:
     """加密货币新闻API封装 - 整合4个主要新闻源"""
     
@@ -23,6 +24,9 @@ class CryptoNewsAPI:
         # CryptoPanic API Key
         self.cryptopanic_key = cryptopanic_key
         
+        # 共享 keep-alive 连接池
+        self.http = get_http_client()
+        
         # 缓存设置
         self.cache = {}
         self.cache_expiry = 60  # 1分钟缓存（降低缓存时间）
@@ -106,10 +110,9 @@ class CryptoNewsAPI:
         if categories:
             params["categories"] = ",".join(categories)
         
-        response = requests.get(
+        response = self.http.get(
             self.cryptocompare_base,
-            params=params,
-            timeout=10
+            params=params
         )
         
         if response.status_code != 200:
@@ -143,10 +146,9 @@ class CryptoNewsAPI:
             "fields": "title,content,published_at,url"
         }
         
-        response = requests.get(
+        response = self.http.get(
             self.messari_base,
-            params=params,
-            timeout=10
+            params=params
         )
         
         if response.status_code != 200:
@@ -193,10 +195,9 @@ class CryptoNewsAPI:
             # CryptoPanic使用逗号分隔的币种代码
             params["currencies"] = ",".join(categories)
         
-        response = requests.get(
+        response = self.http.get(
             self.cryptopanic_base,
-            params=params,
-            timeout=10
+            params=params
         )
         
         if response.status_code != 200:
@@ -250,13 +251,12 @@ class CryptoNewsAPI:
         
         try:
             # CoinGecko的状态更新端点
-            response = requests.get(
+            response = self.http.get(
                 f"{self.coingecko_base}status_updates",
                 params={
                     "category": "general",
                     "per_page": limit
-                },
-                timeout=10
+                }
             )
             
             if response.status_code != 200:
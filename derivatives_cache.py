@@ -0,0 +1,173 @@
+"""
+合约指标缓存模块
+进程内共享的 OI / 资金费率缓存：后台线程按各自节奏刷新，
+本地维护滚动持仓量序列计算均值，prompt 构建直接读内存并获知每个值的新鲜度。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from config import (
+    CRYPTO_SYMBOLS,
+    DERIVATIVES_OI_REFRESH,
+    DERIVATIVES_FUNDING_REFRESH,
+    DERIVATIVES_OI_HIST_REFRESH,
+    DERIVATIVES_OI_PERIOD,
+    DERIVATIVES_OI_WINDOW,
+    DERIVATIVES_RETRY_SECONDS,
+    DERIVATIVES_STALE_FACTOR,
+)
+
+# 采样周期字符串 -> 秒
+_PERIOD_SECONDS = {'5m': 300, '15m': 900, '30m': 1800, '1h': 3600}
+# 各指标的刷新间隔（秒）
+_REFRESH_SECONDS = {
+    'open_interest': DERIVATIVES_OI_REFRESH,
+    'funding_rate': DERIVATIVES_FUNDING_REFRESH,
+    'oi_hist': DERIVATIVES_OI_HIST_REFRESH,
+}
+
+
+class DerivativesCache:
+    """OI / OI 均值 / 资金费率的后台刷新缓存"""
+
+    def __init__(self):
+        self.async_market_data = None
+        self.bucket_seconds = _PERIOD_SECONDS.get(DERIVATIVES_OI_PERIOD, 300)
+        # {symbol: {'open_interest': (value, ts), 'funding_rate': (value, ts)}}
+        self.values: Dict[str, Dict[str, tuple]] = {}
+        # {symbol: deque[(bucket_start, oi)]}，均值在本地计算
+        self.oi_series: Dict[str, deque] = {}
+        self.oi_series_ts: Dict[str, float] = {}
+        # {kind: {symbol: 下次到期时间}}：按币种推进，成功后隔一个刷新周期，失败后 DERIVATIVES_RETRY_SECONDS 重试
+        self.next_due: Dict[str, Dict[str, float]] = {kind: {} for kind in _REFRESH_SECONDS}
+        self.lock = threading.Lock()
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, async_market_data) -> None:
+        """用交易循环的 AsyncMarketData 启动后台刷新（重复调用无副作用）"""
+        if self.running:
+            return
+        self.async_market_data = async_market_data
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='derivatives-cache', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+
+    # -------- 刷新 --------
+    def _run(self) -> None:
+        while self.running:
+            try:
+                self.refresh_due()
+            except Exception as e:
+                print(f"⚠ 合约指标刷新失败: {e}", flush=True)
+            time.sleep(1)
+
+    def refresh_due(self) -> None:
+        """刷新所有到期的（指标, 币种）；各币种并发请求，只有成功的币种推进到下一个周期"""
+        now = time.time()
+        amd = self.async_market_data
+        fetchers = {'oi_hist': self._fetch_oi_hist,
+                    'open_interest': amd.get_open_interest,
+                    'funding_rate': amd.get_funding_rate}
+        due = {kind: [s for s in CRYPTO_SYMBOLS.keys() if now >= self.next_due[kind].get(s, 0.0)]
+               for kind in fetchers}
+        jobs = {kind: [fetchers[kind](s) for s in symbols] for kind, symbols in due.items() if symbols}
+        if not jobs:
+            return
+
+        async def gather_all():
+            return {kind: await asyncio.gather(*coros, return_exceptions=True) for kind, coros in jobs.items()}
+
+        results = amd.run_sync(gather_all(), timeout=60)
+        ts = time.time()
+        with self.lock:
+            for kind, values in results.items():
+                for symbol, value in zip(due[kind], values):
+                    if isinstance(value, Exception):
+                        ok = False
+                    elif kind == 'oi_hist':
+                        ok = self._seed_oi_series(symbol, value, ts)
+                    else:
+                        ok = True
+                        self.values.setdefault(symbol, {})[kind] = (value, ts)
+                        if kind == 'open_interest':
+                            self._append_oi_sample(symbol, value, ts)
+                    self.next_due[kind][symbol] = ts + (_REFRESH_SECONDS[kind] if ok else DERIVATIVES_RETRY_SECONDS)
+
+    async def _fetch_oi_hist(self, symbol: str):
+        return await self.async_market_data._binance_fapi_get('/futures/data/openInterestHist', {
+            'symbol': CRYPTO_SYMBOLS[symbol],
+            'period': DERIVATIVES_OI_PERIOD,
+            'limit': DERIVATIVES_OI_WINDOW
+        })
+
+    def _seed_oi_series(self, symbol: str, data: Any, ts: float) -> bool:
+        """用交易所的持仓量历史校准本地滚动序列；响应无效时返回 False"""
+        if not isinstance(data, list) or not data:
+            return False
+        series = deque(maxlen=DERIVATIVES_OI_WINDOW)
+        for x in data:
+            if not x:
+                continue
+            bucket = int(x.get('timestamp', 0)) // 1000 // self.bucket_seconds * self.bucket_seconds
+            series.append((bucket, float(x.get('sumOpenInterest', x.get('sumOpenInterestValue', 0)))))
+        self.oi_series[symbol] = series
+        self.oi_series_ts[symbol] = ts
+        return True
+
+    def _append_oi_sample(self, symbol: str, value: float, ts: float) -> None:
+        """每个采样周期保留一个点：同周期覆盖，新周期追加"""
+        series = self.oi_series.setdefault(symbol, deque(maxlen=DERIVATIVES_OI_WINDOW))
+        bucket = int(ts) // self.bucket_seconds * self.bucket_seconds
+        if series and series[-1][0] == bucket:
+            series[-1] = (bucket, value)
+        elif not series or bucket > series[-1][0]:
+            series.append((bucket, value))
+        self.oi_series_ts[symbol] = ts
+
+    # -------- 读取 --------
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        返回 {open_interest, open_interest_avg, funding_rate, staleness{...秒}, stale{...}}；从未刷新过返回 None。
+        stale 为 True 表示该值从未取到，或距上次成功刷新已超过 刷新间隔×DERIVATIVES_STALE_FACTOR。
+        """
+        now = time.time()
+        with self.lock:
+            values = self.values.get(symbol)
+            series = self.oi_series.get(symbol)
+            if not values and not series:
+                return None
+            oi, oi_ts = values.get('open_interest', (0.0, None)) if values else (0.0, None)
+            funding, funding_ts = values.get('funding_rate', (0.0, None)) if values else (0.0, None)
+            oi_avg = sum(v for _, v in series) / len(series) if series else 0.0
+            series_ts = self.oi_series_ts.get(symbol)
+        staleness = {
+            'open_interest': round(now - oi_ts, 1) if oi_ts else None,
+            # 滚动序列随每次最新持仓量采样推进，按持仓量的刷新间隔判断
+            'open_interest_avg': round(now - series_ts, 1) if series_ts else None,
+            'funding_rate': round(now - funding_ts, 1) if funding_ts else None,
+        }
+        limits = {'open_interest': DERIVATIVES_OI_REFRESH, 'open_interest_avg': DERIVATIVES_OI_REFRESH,
+                  'funding_rate': DERIVATIVES_FUNDING_REFRESH}
+        return {
+            'open_interest': oi,
+            'open_interest_avg': oi_avg,
+            'funding_rate': funding,
+            'staleness': staleness,
+            'stale': {key: age is None or age > limits[key] * DERIVATIVES_STALE_FACTOR
+                      for key, age in staleness.items()},
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {symbol: self.get(symbol) for symbol in CRYPTO_SYMBOLS.keys()}
+
+
+# 进程内共享
+derivatives_cache = DerivativesCache()
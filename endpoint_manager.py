@@ -0,0 +1,210 @@
+"""
+端点管理模块
+跟踪每个 Binance 基础端点的滚动延迟与错误率，优先路由到最快的健康端点，
+连续失败触发熔断，后台探测恢复；单次请求总耗时受总时限约束。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from config import (
+    BINANCE_BASE_URLS,
+    BINANCE_FAPI_BASE_URLS,
+    BINANCE_REQUEST_DEADLINE,
+    ENDPOINT_ATTEMPT_TIMEOUT,
+    ENDPOINT_FAILURE_THRESHOLD,
+    ENDPOINT_OPEN_SECONDS,
+    ENDPOINT_PROBE_INTERVAL,
+)
+from http_client import get_http_client
+from rate_limiter import RateLimitExceeded, RATE_LIMITED_STATUS
+from cassette import CassetteMiss
+
+# 熔断器状态
+CLOSED = 'closed'        # 正常
+OPEN = 'open'            # 熔断中，不参与路由
+HALF_OPEN = 'half_open'  # 冷却结束，允许一次试探
+
+
+class EndpointClientError(RuntimeError):
+    """4xx 响应（限流除外）：请求本身有误，换镜像结果相同，也不计入端点故障"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def is_client_error(status: int) -> bool:
+    return 400 <= status < 500 and status not in RATE_LIMITED_STATUS
+
+
+def is_endpoint_fault(exc: Exception) -> bool:
+    """只有超时、连接错误和 5xx 说明端点本身有问题，计入熔断统计"""
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    response = getattr(exc, 'response', None)
+    return isinstance(exc, requests.HTTPError) and response is not None and response.status_code >= 500
+
+
+class EndpointStats:
+    """单个端点的滚动统计"""
+
+    def __init__(self, base: str, window: int):
+        self.base = base
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True=成功, False=失败
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> float:
+        # 未测过的端点得分为0，优先尝试以获得延迟样本；错误率放大延迟
+        latency = self.avg_latency
+        if latency is None:
+            return 0.0
+        return latency * (1 + 4 * self.error_rate)
+
+
+class EndpointManager:
+    """一组可互相替代的基础端点（如 Binance 现货镜像）"""
+
+    def __init__(self, name: str, base_urls: List[str], probe_path: str,
+                 window: int = 50,
+                 failure_threshold: int = ENDPOINT_FAILURE_THRESHOLD,
+                 open_seconds: float = ENDPOINT_OPEN_SECONDS,
+                 probe_interval: float = ENDPOINT_PROBE_INTERVAL):
+        self.name = name
+        self.probe_path = probe_path
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.probe_interval = probe_interval
+        self.stats: Dict[str, EndpointStats] = {b: EndpointStats(b, window) for b in base_urls}
+        self.lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+
+    # -------- 路由 --------
+    def ranked(self) -> List[str]:
+        """按得分排序的可用端点；全部熔断时按熔断先后返回全部端点作为最后手段"""
+        now = time.time()
+        with self.lock:
+            healthy = []
+            for st in self.stats.values():
+                if st.state == OPEN and now - st.opened_at >= self.open_seconds:
+                    st.state = HALF_OPEN
+                if st.state != OPEN:
+                    healthy.append(st)
+            if healthy:
+                healthy.sort(key=lambda st: st.score())
+                return [st.base for st in healthy]
+            return [st.base for st in sorted(self.stats.values(), key=lambda st: st.opened_at)]
+
+    def record_success(self, base: str, latency: float) -> None:
+        with self.lock:
+            st = self.stats[base]
+            st.latencies.append(latency)
+            st.outcomes.append(True)
+            st.consecutive_failures = 0
+            st.state = CLOSED
+
+    def record_failure(self, base: str, latency: float) -> None:
+        with self.lock:
+            st = self.stats[base]
+            st.latencies.append(latency)
+            st.outcomes.append(False)
+            st.consecutive_failures += 1
+            if st.state == HALF_OPEN or st.consecutive_failures >= self.failure_threshold:
+                if st.state != OPEN:
+                    print(f"⚡ [{self.name}] 端点熔断: {base}", flush=True)
+                st.state = OPEN
+                st.opened_at = time.time()
+
+    def request(self, path: str, params: Dict[str, Any], deadline: float = BINANCE_REQUEST_DEADLINE,
+                http=None) -> Any:
+        """在总时限内依次尝试排名靠前的端点，返回第一个成功的 JSON"""
+        http = http or get_http_client()
+        self.ensure_probing()
+        start = time.time()
+        last_exc: Optional[Exception] = None
+        for base in self.ranked():
+            remaining = deadline - (time.time() - start)
+            if remaining <= 0:
+                break
+            t0 = time.time()
+            try:
+                response = http.get(f"{base}{path}", params=params,
+                                    timeout=min(ENDPOINT_ATTEMPT_TIMEOUT, remaining))
+                if response.status_code in RATE_LIMITED_STATUS:
+                    # 限流按 IP 计算，换镜像无济于事，也不应计入端点故障
+                    raise RateLimitExceeded(f"{self.name} HTTP {response.status_code}: {path}")
+                if is_client_error(response.status_code):
+                    raise EndpointClientError(f"{self.name} HTTP {response.status_code}: {path} {params}",
+                                              response.status_code)
+                response.raise_for_status()
+                data = response.json()
+                self.record_success(base, time.time() - t0)
+                return data
+            except (RateLimitExceeded, EndpointClientError, CassetteMiss):
+                raise
+            except Exception as e:
+                # 其他异常（如响应体不是 JSON）换下一个镜像，但不计入该端点的故障
+                last_exc = e
+                if is_endpoint_fault(e):
+                    self.record_failure(base, time.time() - t0)
+        raise RuntimeError(f"{self.name} 请求失败（{time.time() - start:.1f}s）: {path} {params} -> {last_exc}")
+
+    # -------- 后台探测 --------
+    def ensure_probing(self) -> None:
+        if self._probe_thread is not None:
+            return
+        with self.lock:
+            if self._probe_thread is None:
+                self._probe_thread = threading.Thread(target=self._probe_loop, name=f'probe-{self.name}', daemon=True)
+                self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        http = get_http_client()
+        while True:
+            time.sleep(self.probe_interval)
+            now = time.time()
+            with self.lock:
+                due = [st.base for st in self.stats.values()
+                       if st.state != CLOSED and now - st.opened_at >= self.open_seconds]
+            for base in due:
+                t0 = time.time()
+                try:
+                    response = http.get(f"{base}{self.probe_path}", timeout=ENDPOINT_ATTEMPT_TIMEOUT)
+                    response.raise_for_status()
+                    self.record_success(base, time.time() - t0)
+                    print(f"✓ [{self.name}] 端点恢复: {base}", flush=True)
+                except Exception:
+                    self.record_failure(base, time.time() - t0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各端点的健康指标"""
+        with self.lock:
+            return {
+                st.base: {
+                    'state': st.state,
+                    'avg_latency_ms': round(st.avg_latency * 1000, 1) if st.avg_latency is not None else None,
+                    'error_rate': round(st.error_rate, 3),
+                    'consecutive_failures': st.consecutive_failures,
+                }
+                for st in self.stats.values()
+            }
+
+
+# 进程内共享（MarketData 会被多处临时创建，统计必须跨实例保留）
+spot_endpoints = EndpointManager('Binance', BINANCE_BASE_URLS, '/api/v3/ping')
+fapi_endpoints = EndpointManager('Binance FAPI', BINANCE_FAPI_BASE_URLS, '/fapi/v1/ping')
@@ -0,0 +1,123 @@
+"""
+对冲请求模块
+主数据源在基于 p95 延迟的对冲时间内未返回时，并行发起下一个数据源，
+取第一个有效结果；记录各数据源的胜出次数与延迟。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Callable, Tuple, Optional
+
+from config import HEDGE_DELAY_MIN, HEDGE_DELAY_MAX, HEDGE_DELAY_DEFAULT
+
+
+class SourceStats:
+    """单个数据源的滚动统计"""
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.wins = 0
+        self.errors = 0
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def p50(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2]
+
+
+class HedgedFetcher:
+    """按优先级排列的多数据源对冲请求"""
+
+    def __init__(self, name: str, max_workers: int = 8):
+        self.name = name
+        self.stats: Dict[str, SourceStats] = {}
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'hedge-{name}')
+
+    def _source(self, source: str) -> SourceStats:
+        st = self.stats.get(source)
+        if st is None:
+            with self.lock:
+                st = self.stats.setdefault(source, SourceStats())
+        return st
+
+    def hedge_delay(self, source: str) -> float:
+        """数据源的对冲等待时间 = 其 p95 延迟（样本不足时用默认值），并限制在上下限之间"""
+        p95 = self._source(source).p95()
+        delay = HEDGE_DELAY_DEFAULT if p95 is None else p95
+        return max(HEDGE_DELAY_MIN, min(HEDGE_DELAY_MAX, delay))
+
+    def _timed(self, source: str, func: Callable[[], Any]) -> Any:
+        st = self._source(source)
+        t0 = time.time()
+        try:
+            result = func()
+        except Exception:
+            with self.lock:
+                st.errors += 1
+                st.latencies.append(time.time() - t0)
+            raise
+        with self.lock:
+            st.latencies.append(time.time() - t0)
+        return result
+
+    def fetch(self, sources: List[Tuple[str, Callable[[], Any]]]) -> Tuple[str, Any]:
+        """
+        依次启动数据源：上一个源超过对冲时间未返回或已失败，则启动下一个。
+        返回 (胜出数据源, 结果)；全部失败时抛出最后一个异常。
+        """
+        pending = {}
+        last_exc: Optional[Exception] = None
+        index = 0
+        while index < len(sources) or pending:
+            if index < len(sources):
+                source, func = sources[index]
+                with self.lock:
+                    self._source(source).requests += 1
+                pending[self.executor.submit(self._timed, source, func)] = source
+                timeout = self.hedge_delay(source)
+                index += 1
+            else:
+                timeout = None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_exc = e
+                    continue
+                with self.lock:
+                    self._source(source).wins += 1
+                # 落选的请求在后台自然结束，仅计入延迟统计
+                return source, result
+        raise RuntimeError(f"{self.name} 所有数据源都失败: {last_exc}")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各数据源的请求数、胜出数、错误数与延迟"""
+        with self.lock:
+            result = {}
+            for source, st in self.stats.items():
+                p50, p95 = st.p50(), st.p95()
+                result[source] = {
+                    'requests': st.requests,
+                    'wins': st.wins,
+                    'errors': st.errors,
+                    'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+                    'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+                }
+            return result
+
+
+# 进程内共享，统计跨 MarketData 实例累计
+price_hedger = HedgedFetcher('price')
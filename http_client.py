@@ -0,0 +1,119 @@
+"""
+HTTP 客户端模块
+所有对外请求共用的连接池：每个主机一个 keep-alive Session，线程安全，按主机配置超时；
+行情与新闻请求经共享限流器排队；可按 HTTP_CASSETTE_MODE 录制或离线回放
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_POOL_MAXSIZE, HTTP_DEFAULT_TIMEOUT, HTTP_HOST_TIMEOUTS
+from rate_limiter import rate_governor
+from cassette import cassette
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'TrigoNexus/1.0',
+    'Accept': 'application/json'
+}
+
+
+class HttpClient:
+    """按主机复用连接的 HTTP 客户端"""
+
+    def __init__(self, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 default_timeout: float = HTTP_DEFAULT_TIMEOUT,
+                 host_timeouts: Optional[Dict[str, float]] = None):
+        self.pool_maxsize = pool_maxsize
+        self.default_timeout = default_timeout
+        self.host_timeouts = dict(HTTP_HOST_TIMEOUTS if host_timeouts is None else host_timeouts)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # 每个主机独立连接池；重试由调用方控制
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                self._sessions[host] = session
+        return session
+
+    def timeout_for(self, host: str) -> float:
+        """精确匹配主机，其次按上级域名匹配（api1.binance.com -> binance.com）"""
+        if host in self.host_timeouts:
+            return self.host_timeouts[host]
+        parts = host.split('.')
+        for i in range(1, len(parts) - 1):
+            parent = '.'.join(parts[i:])
+            if parent in self.host_timeouts:
+                return self.host_timeouts[parent]
+        return self.default_timeout
+
+    def request(self, method: str, url: str, timeout: Optional[float] = None,
+                priority: Optional[int] = None, **kwargs) -> requests.Response:
+        """priority 覆盖限流器按路径推断的优先级（rate_limiter.PRIORITY_*）"""
+        host = urlsplit(url).hostname or ''
+        if timeout is None:
+            timeout = self.timeout_for(host)
+        match_params = self._match_params(kwargs)
+        if cassette.replaying:
+            return cassette.replay(method, url, match_params)
+        limited = rate_governor.classify(url, kwargs.get('params'))
+        if limited is not None:
+            provider, weight, default_priority = limited
+            rate_governor.acquire(provider, weight, default_priority if priority is None else priority)
+        t0 = time.time()
+        response = self._session(host).request(method, url, timeout=timeout, **kwargs)
+        if limited is not None:
+            rate_governor.observe(provider, response.status_code, response.headers)
+        if cassette.recording:
+            cassette.record(method, url, match_params, response.status_code, response.headers,
+                            response.content, time.time() - t0)
+        return response
+
+    @staticmethod
+    def _match_params(kwargs) -> Optional[Dict]:
+        """录制/回放的匹配参数：查询参数，POST JSON 另加 model（区分不同模型的对话请求）"""
+        params = kwargs.get('params')
+        body = kwargs.get('json')
+        if isinstance(body, dict) and 'model' in body:
+            return dict(params or {}, model=body['model'])
+        return params
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """进程内共享的 HTTP 客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,123 @@
+"""
+增量指标引擎
+按币种保存注册表中所有启用指标（indicator_registry）的递推状态，每根新K线或形成中K线的更新
+对所有指标做一次融合推进（O(1)），替代每次调用都重建 200 行 DataFrame 再整体重算的 pandas 路径。
+
+最后一根K线视为“待定”：同一时间戳重复更新时从上一根已确认的状态重新推一步，
+出现更新的时间戳时才把待定结果确认进状态与序列。
+RSI / ATR 的滚动均值与 pandas 路径逐位一致；EMA 从该币种第一根K线起递推，
+pandas 路径则以 200 行窗口首行为种子，两者差异按 (1-α)^200 衰减（EMA50 约 3e-4 倍的种子偏差，其余可忽略）。
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable, Union
+
+from config import INDICATORS
+from indicator_registry import indicator_registry, IndicatorSet, NAN
+
+MIN_CANDLES = 20  # 与 calculate_indicators 的最小根数要求一致
+SERIES_LEN = 30  # prompt 使用的序列长度
+
+
+class _SymbolState:
+    """单个币种的已确认递推状态、待定K线的推算结果与输出序列"""
+
+    __slots__ = ('indicators', 'count', 'close', 'states', 'pending_ts', 'pending', 'carries', 'series')
+
+    def __init__(self, indicators: IndicatorSet, series_len: int):
+        self.indicators = indicators
+        self.count = 0  # 已确认K线根数
+        self.close: Optional[float] = None
+        self.states: List[Any] = [ind.init_state() for ind in indicators]
+        self.pending_ts: Optional[int] = None
+        self.pending: Optional[Dict[str, Any]] = None
+        self.carries: Optional[List[Any]] = None  # 待定K线确认时各指标写回状态的增量
+        # 已确认K线的输出序列（prompt 用），待定K线的值在快照时追加
+        self.series: Dict[str, deque] = {key: deque(maxlen=series_len) for key in (
+            ('close',) + indicators.series_keys)}
+
+    def step(self, candle: Dict[str, Any]):
+        """在已确认状态上对所有指标推一步（不修改状态），返回 (该K线的全部指标, 各指标待确认的增量)"""
+        bar = self.indicators.bar(candle, self.close)
+        out = {'timestamp': bar['timestamp'], 'current_price': bar['close'], 'volume': bar['volume']}
+        carries = []
+        n = self.count + 1
+        for ind, state in zip(self.indicators, self.states):
+            carries.append(ind.step(state, bar, out))
+            if n < ind.warmup:
+                for key in ind.outputs:
+                    out[key] = NAN
+        return out, carries
+
+    def commit(self) -> None:
+        """把待定K线确认进递推状态与输出序列"""
+        p = self.pending
+        if p is None:
+            return
+        self.count += 1
+        self.close = p['current_price']
+        self.states = [ind.commit(state, carry) for ind, state, carry in zip(self.indicators, self.states, self.carries)]
+        self.series['close'].append(p['current_price'])
+        for key in self.indicators.series_keys:
+            self.series[key].append(p[key])
+        self.pending = None
+
+    def update(self, candle: Dict[str, Any]) -> bool:
+        ts = int(candle['timestamp'])
+        if self.pending_ts is not None:
+            if ts < self.pending_ts:
+                return False
+            if ts > self.pending_ts:
+                self.commit()
+        self.pending, self.carries = self.step(candle)
+        self.pending_ts = ts
+        return True
+
+
+class IndicatorEngine:
+    """所有币种的增量指标；写入来自交易循环，读取可来自多个交易员线程"""
+
+    def __init__(self, series_len: int = SERIES_LEN, min_candles: int = MIN_CANDLES,
+                 indicators: Union[IndicatorSet, Iterable[str]] = INDICATORS):
+        self.series_len = series_len
+        # 可传入已解析的 IndicatorSet（多个引擎共享同一组指标），或注册名列表
+        self.indicators = indicators if isinstance(indicators, IndicatorSet) else indicator_registry.resolve(indicators)
+        self.min_candles = min_candles
+        self._states: Dict[str, _SymbolState] = {}
+        self.lock = threading.Lock()
+        self.updates = 0
+
+    def update(self, symbol: str, candle: Dict[str, Any]) -> bool:
+        """新K线或形成中K线的更新（早于待定K线的忽略），返回是否生效"""
+        with self.lock:
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = _SymbolState(self.indicators, self.series_len)
+            self.updates += 1
+            return state.update(candle)
+
+    def rebuild(self, symbol: str, candles: List[Dict[str, Any]]) -> None:
+        """用完整K线序列重建某个币种的状态（如热启动替换了内存K线）"""
+        state = _SymbolState(self.indicators, self.series_len)
+        for c in candles:
+            state.update(c)
+        with self.lock:
+            self._states[symbol] = state
+
+    def reset(self, symbol: str) -> None:
+        with self.lock:
+            self._states.pop(symbol, None)
+
+    def snapshot(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """当前指标（格式同 KLineData.calculate_indicators）；K线不足 min_candles 时返回 None"""
+        with self.lock:
+            state = self._states.get(symbol)
+            if state is None or state.pending is None or state.count + 1 < self.min_candles:
+                return None
+            p = state.pending
+            indicators = {key: p[key] for key in ('current_price', 'volume') + self.indicators.output_keys}
+            indicators['price_series'] = list(state.series['close'])[1 - self.series_len:] + [p['current_price']]
+            for key in self.indicators.series_keys:
+                indicators[f'{key}_series'] = list(state.series[key])[1 - self.series_len:] + [p[key]]
+        return indicators
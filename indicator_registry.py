@@ -0,0 +1,347 @@
+"""
+指标注册表
+每个指标声明输入字段、预热根数、输出键、需要保留序列的输出及自己的递推状态；
+IndicatorEngine 据此对每根K线做一次融合推进：共享的派生输入（涨跌、真实波幅、典型价）每根只算一次，
+所有启用的指标在同一次遍历中更新，新增指标不会增加对K线的遍历或 DataFrame 复制。
+
+新增指标：继承 Indicator，实现 init_state / step / commit 并 register()，再加入 config.INDICATORS；
+引擎快照、多周期聚合与 prompt 的附加指标行会自动包含它。
+"""
+
+import math
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable
+
+NAN = float('nan')
+
+# K线原始字段与每根K线共享计算一次的派生字段
+RAW_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+DERIVED_FIELDS = ('prev_close', 'gain', 'loss', 'tr', 'typical')
+
+# 核心指标：prompt 以固定格式使用，始终启用
+CORE_INDICATORS = ('ema_20', 'ema_50', 'macd', 'rsi_7', 'rsi_14', 'atr_3', 'atr_14')
+
+
+def _tail_mean(window: deque, new: float, n: int) -> float:
+    """已确认窗口的最后 n-1 个值加上新值的均值；不足 n 个时为 NaN"""
+    if len(window) + 1 < n:
+        return NAN
+    total = new
+    for i in range(len(window) - n + 1, len(window)):
+        total += window[i]
+    return total / n
+
+
+def _tail(window: deque, new: float, n: int) -> List[float]:
+    """已确认窗口的最后 n-1 个值加上新值"""
+    return [window[i] for i in range(max(0, len(window) - n + 1), len(window))] + [new]
+
+
+def _rsi(gain: float, loss: float) -> float:
+    """与 pandas 路径相同：loss 为 0 时 rs=inf -> 100；gain 也为 0 时为 NaN"""
+    if math.isnan(gain) or math.isnan(loss):
+        return NAN
+    if loss == 0:
+        return 100.0 if gain > 0 else NAN
+    return 100 - 100 / (1 + gain / loss)
+
+
+class Indicator:
+    """
+    指标基类。step 在已确认状态上推一步（不得修改状态），把输出写入 out 并返回确认所需的增量；
+    commit 在该K线确认时把增量写回状态并返回新状态（不可变状态直接返回新值即可）。
+    """
+
+    name = ''
+    inputs: tuple = ('close',)
+    warmup = 1  # 输出有效所需的最少K线根数，之前的输出由引擎置为 NaN
+    outputs: tuple = ()
+    series: tuple = ()  # 需要在快照中附带 {key}_series 的输出
+    template: Optional[str] = None  # prompt 附加指标行（str.format，字段为输出键）；None 表示由 prompt 专门格式化
+
+    def init_state(self) -> Any:
+        return None
+
+    def step(self, state: Any, bar: Dict[str, Any], out: Dict[str, Any]) -> Any:
+        raise NotImplementedError
+
+    def commit(self, state: Any, carry: Any) -> Any:
+        return carry
+
+    def describe(self, values) -> Optional[str]:
+        """按 template 格式化当前值；未注册模板或值无效时返回 None"""
+        if self.template is None:
+            return None
+        current = {key: values.get(key) for key in self.outputs}
+        if any(v is None or math.isnan(v) for v in current.values()):
+            return None
+        return self.template.format(**current)
+
+
+class EMA(Indicator):
+    """adjust=False 的 EMA（首个收盘价为种子，与 pandas 路径一致）"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.name = f'ema_{period}'
+        self.outputs = (self.name,)
+        self.series = (self.name,) if period == 20 else ()
+
+    def step(self, state, bar, out):
+        value = bar['close'] if state is None else (1 - self.alpha) * state + self.alpha * bar['close']
+        out[self.name] = value
+        return value
+
+
+class MACD(Indicator):
+    """MACD 线（快慢 EMA 之差）、信号线与柱状图；状态为 (快线, 慢线, 信号线)"""
+
+    name = 'macd'
+    outputs = ('macd', 'macd_signal', 'macd_hist')
+    series = ('macd',)
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.alphas = tuple(2.0 / (n + 1) for n in (fast, slow, signal))
+
+    def step(self, state, bar, out):
+        close = bar['close']
+        af, as_, ag = self.alphas
+        if state is None:
+            fast = slow = close
+            macd = signal = 0.0
+        else:
+            fast = (1 - af) * state[0] + af * close
+            slow = (1 - as_) * state[1] + as_ * close
+            macd = fast - slow
+            signal = (1 - ag) * state[2] + ag * macd
+        out['macd'], out['macd_signal'], out['macd_hist'] = macd, signal, macd - signal
+        return fast, slow, signal
+
+
+class RSI(Indicator):
+    """滚动均值 RSI（与 pandas 路径逐位一致）；状态为涨幅、跌幅窗口"""
+
+    inputs = ('gain', 'loss')
+
+    def __init__(self, period: int):
+        self.period = self.warmup = period
+        self.name = f'rsi_{period}'
+        self.outputs = self.series = (self.name,)
+
+    def init_state(self):
+        return deque(maxlen=self.period), deque(maxlen=self.period)
+
+    def step(self, state, bar, out):
+        gains, losses = state
+        out[self.name] = _rsi(_tail_mean(gains, bar['gain'], self.period), _tail_mean(losses, bar['loss'], self.period))
+        return bar['gain'], bar['loss']
+
+    def commit(self, state, carry):
+        state[0].append(carry[0])
+        state[1].append(carry[1])
+        return state
+
+
+class ATR(Indicator):
+    """真实波幅的滚动均值（与 pandas 路径一致）"""
+
+    inputs = ('tr',)
+
+    def __init__(self, period: int):
+        self.period = self.warmup = period
+        self.name = f'atr_{period}'
+        self.outputs = (self.name,)
+
+    def init_state(self):
+        return deque(maxlen=self.period)
+
+    def step(self, state, bar, out):
+        out[self.name] = _tail_mean(state, bar['tr'], self.period)
+        return bar['tr']
+
+    def commit(self, state, carry):
+        state.append(carry)
+        return state
+
+
+class Bollinger(Indicator):
+    """布林带：收盘价 period 根的均值 ± k 倍总体标准差"""
+
+    name = 'bbands'
+    outputs = ('bb_upper', 'bb_middle', 'bb_lower')
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.period = self.warmup = period
+        self.k = k
+        self.template = (f"Bollinger Bands ({period}, {k:g}σ): upper {{bb_upper:.3f}}, "
+                         f"middle {{bb_middle:.3f}}, lower {{bb_lower:.3f}}")
+
+    def init_state(self):
+        return deque(maxlen=self.period)
+
+    def step(self, state, bar, out):
+        window = _tail(state, bar['close'], self.period)
+        mean = sum(window) / len(window)
+        std = math.sqrt(sum((x - mean) ** 2 for x in window) / len(window))
+        out['bb_upper'], out['bb_middle'], out['bb_lower'] = mean + self.k * std, mean, mean - self.k * std
+        return bar['close']
+
+    def commit(self, state, carry):
+        state.append(carry)
+        return state
+
+
+class VWAP(Indicator):
+    """
+    滚动成交量加权均价：最近 period 根的 Σ(典型价 × 成交量) / Σ成交量。
+    不用按 UTC 日重置的会话 VWAP：内存K线（500 根 1m、120 根聚合K线）覆盖不了完整交易日，会话起点不可知。
+    """
+
+    inputs = ('typical', 'volume')
+    outputs = ('vwap',)
+
+    def __init__(self, period: int = 20):
+        self.period = self.warmup = period
+        self.name = 'vwap'
+        self.template = f"VWAP ({period}‑bar): {{vwap:.3f}}"
+
+    def init_state(self):
+        return deque(maxlen=self.period), deque(maxlen=self.period)
+
+    def step(self, state, bar, out):
+        pv, v = bar['typical'] * bar['volume'], bar['volume']
+        total_v = sum(_tail(state[1], v, self.period))
+        out['vwap'] = sum(_tail(state[0], pv, self.period)) / total_v if total_v > 0 else bar['typical']
+        return pv, v
+
+    def commit(self, state, carry):
+        state[0].append(carry[0])
+        state[1].append(carry[1])
+        return state
+
+
+class OBV(Indicator):
+    """能量潮：收盘上涨加成交量、下跌减成交量（首根为 0）"""
+
+    name = 'obv'
+    inputs = ('gain', 'loss', 'volume')
+    outputs = ('obv',)
+    template = "On‑balance volume: {obv:.3f}"
+
+    def step(self, state, bar, out):
+        value = state or 0.0
+        if bar['gain'] > 0:
+            value += bar['volume']
+        elif bar['loss'] > 0:
+            value -= bar['volume']
+        out['obv'] = value
+        return value
+
+
+class Stochastic(Indicator):
+    """随机指标：%K = 收盘价在 k 根高低区间中的位置（区间为 0 时取 50），%D = %K 的 d 根均值"""
+
+    name = 'stoch'
+    inputs = ('high', 'low', 'close')
+    outputs = ('stoch_k', 'stoch_d')
+
+    def __init__(self, k: int = 14, d: int = 3):
+        self.k, self.d = k, d
+        self.warmup = k + d - 1
+        self.template = f"Stochastic ({k}, {d}): %K {{stoch_k:.3f}}, %D {{stoch_d:.3f}}"
+
+    def init_state(self):
+        return deque(maxlen=self.k), deque(maxlen=self.k), deque(maxlen=self.d)
+
+    def step(self, state, bar, out):
+        highs, lows, ks = state
+        hh = max(_tail(highs, bar['high'], self.k))
+        ll = min(_tail(lows, bar['low'], self.k))
+        k = 100 * (bar['close'] - ll) / (hh - ll) if hh > ll else 50.0
+        out['stoch_k'] = k
+        out['stoch_d'] = _tail_mean(ks, k, self.d)
+        return bar['high'], bar['low'], k
+
+    def commit(self, state, carry):
+        for window, value in zip(state, carry):
+            window.append(value)
+        return state
+
+
+class IndicatorSet:
+    """一组启用的指标；bar() 每根K线只计算这组指标需要的派生字段"""
+
+    def __init__(self, indicators: List[Indicator]):
+        self.indicators = indicators
+        needed = {field for ind in indicators for field in ind.inputs}
+        self._need_tr = 'tr' in needed
+        self._need_typical = 'typical' in needed
+        self.series_keys = tuple(key for ind in indicators for key in ind.series)
+        self.output_keys = tuple(key for ind in indicators for key in ind.outputs)
+
+    def __iter__(self):
+        return iter(self.indicators)
+
+    def bar(self, candle: Dict[str, Any], prev_close: Optional[float]) -> Dict[str, Any]:
+        high, low, close = float(candle['high']), float(candle['low']), float(candle['close'])
+        bar = {'timestamp': int(candle['timestamp']), 'open': float(candle['open']), 'high': high, 'low': low, 'close': close,
+               'volume': float(candle['volume']), 'prev_close': prev_close}
+        if prev_close is None:
+            # pandas: diff 首行为 NaN，where 后 gain/loss 取 0；TR 首行只有 high-low
+            bar['gain'] = bar['loss'] = 0.0
+            if self._need_tr:
+                bar['tr'] = high - low
+        else:
+            delta = close - prev_close
+            bar['gain'], bar['loss'] = (delta, 0.0) if delta > 0 else (0.0, -delta if delta < 0 else 0.0)
+            if self._need_tr:
+                bar['tr'] = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if self._need_typical:
+            bar['typical'] = (high + low + close) / 3
+        return bar
+
+    def describe(self, values) -> List[str]:
+        """已注册 prompt 模板的指标的当前值文本（值无效的跳过）"""
+        lines = (ind.describe(values) for ind in self.indicators)
+        return [line for line in lines if line]
+
+
+class IndicatorRegistry:
+    """按名称登记的指标；resolve() 把配置中的名称解析为 IndicatorSet（核心指标总在最前）"""
+
+    def __init__(self):
+        self._indicators: Dict[str, Indicator] = {}
+
+    def register(self, indicator: Indicator) -> Indicator:
+        unknown = set(indicator.inputs) - set(RAW_FIELDS) - set(DERIVED_FIELDS)
+        if unknown:
+            raise ValueError(f"指标 {indicator.name} 的输入字段未知: {sorted(unknown)}")
+        taken = {key for ind in self._indicators.values() if ind.name != indicator.name for key in ind.outputs}
+        clash = taken & set(indicator.outputs)
+        if clash:
+            raise ValueError(f"指标 {indicator.name} 的输出键与已注册指标重复: {sorted(clash)}")
+        self._indicators[indicator.name] = indicator
+        return indicator
+
+    def names(self) -> List[str]:
+        return list(self._indicators)
+
+    def get(self, name: str) -> Optional[Indicator]:
+        return self._indicators.get(name)
+
+    def resolve(self, names: Iterable[str] = ()) -> IndicatorSet:
+        selected = []
+        for name in list(CORE_INDICATORS) + list(names):
+            ind = self._indicators.get(name)
+            if ind is None:
+                print(f"⚠️ 未注册的指标 {name}，已忽略（可用: {', '.join(self._indicators)}）", flush=True)
+            elif ind not in selected:
+                selected.append(ind)
+        return IndicatorSet(selected)
+
+
+indicator_registry = IndicatorRegistry()
+for _indicator in (EMA(20), EMA(50), MACD(), RSI(7), RSI(14), ATR(3), ATR(14),
+                   Bollinger(), VWAP(), OBV(), Stochastic()):
+    indicator_registry.register(_indicator)
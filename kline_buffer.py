@@ -0,0 +1,142 @@
+"""
+K线环形缓冲模块
+每个币种一块预分配的列式 numpy 缓冲（时间戳 + OHLCV），追加 O(1)，
+最近 N 根以连续只读视图返回；dataframe() 从视图一次性复制出独立的 DataFrame（不再逐根构造字典）。
+
+双写技巧：底层数组长度为 2 × capacity，每根K线同时写入槽位 i 与 i + capacity，
+任意“最近 N 根”（N ≤ capacity）在 [pos + capacity - N, pos + capacity) 上总是连续的，
+读取时不需要拼接回绕的两段。
+"""
+
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# OHLCV 列顺序（与 KLINE_DTYPE / Binance K线字典字段一致）
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(COLUMNS))
+
+
+class KlineBuffer:
+    """单个币种的K线环形缓冲；返回的视图只读，随后续写入在原地变化"""
+
+    def __init__(self, capacity: int, dtype: Any = np.float64):
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        # 列式：每个字段一行，行内连续
+        self._values = np.zeros((len(COLUMNS), 2 * capacity), dtype=self.dtype)
+        self.pos = 0  # 下一次写入的槽位 [0, capacity)
+        self.count = 0
+
+    @classmethod
+    def from_candles(cls, candles: List[Dict[str, Any]], capacity: int, dtype: Any = np.float64) -> 'KlineBuffer':
+        buf = cls(capacity, dtype)
+        buf.extend(candles)
+        return buf
+
+    def __len__(self) -> int:
+        return self.count
+
+    # -------- 写入 --------
+    def _write(self, slot: int, candle: Dict[str, Any]) -> None:
+        ts = int(candle['timestamp'])
+        row = [candle['open'], candle['high'], candle['low'], candle['close'], candle['volume']]
+        self._ts[slot] = ts
+        self._ts[slot + self.capacity] = ts
+        self._values[:, slot] = row
+        self._values[:, slot + self.capacity] = row
+
+    def append(self, candle: Dict[str, Any]) -> None:
+        """追加一根K线（缓冲满时覆盖最旧的一根）"""
+        self._write(self.pos, candle)
+        self.pos = (self.pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, candles: List[Dict[str, Any]]) -> None:
+        for c in candles[-self.capacity:]:
+            self.append(c)
+
+    def replace_last(self, candle: Dict[str, Any]) -> None:
+        """原地替换最后一根（形成中的K线）"""
+        self._write((self.pos - 1) % self.capacity, candle)
+
+    def merge(self, candle: Dict[str, Any]) -> bool:
+        """同一时间戳原地更新，更新的时间戳追加，更旧的忽略；返回是否写入"""
+        ts = int(candle['timestamp'])
+        last = self.last_timestamp
+        if last is not None and ts == last:
+            self.replace_last(candle)
+        elif last is None or ts > last:
+            self.append(candle)
+        else:
+            return False
+        return True
+
+    def update_last_price(self, price: float) -> None:
+        """用最新成交价更新最后一根的收盘价与高低点"""
+        for slot in ((self.pos - 1) % self.capacity, (self.pos - 1) % self.capacity + self.capacity):
+            self._values[CLOSE, slot] = price
+            self._values[HIGH, slot] = max(self._values[HIGH, slot], price)
+            self._values[LOW, slot] = min(self._values[LOW, slot], price)
+
+    # -------- 读取 --------
+    def _range(self, n: Optional[int]) -> slice:
+        n = self.count if n is None else max(0, min(n, self.count))
+        end = self.pos + self.capacity
+        return slice(end - n, end)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._ts[self.pos + self.capacity - 1]) if self.count else None
+
+    @property
+    def last_close(self) -> Optional[float]:
+        return float(self._values[CLOSE, self.pos + self.capacity - 1]) if self.count else None
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """最后一根K线（字典副本）"""
+        return self.to_candles(1)[0] if self.count else None
+
+    def timestamps(self, n: Optional[int] = None) -> np.ndarray:
+        """最近 n 根的时间戳（毫秒，只读视图）"""
+        view = self._ts[self._range(n)]
+        view.flags.writeable = False
+        return view
+
+    def values(self, n: Optional[int] = None) -> np.ndarray:
+        """最近 n 根的 OHLCV，形状 (5, n)，每列连续（只读视图）"""
+        view = self._values[:, self._range(n)]
+        view.flags.writeable = False
+        return view
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        return self.values(n)[COLUMNS.index(name)]
+
+    def to_candles(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """以K线字典列表返回（复制；用于落盘与兼容旧接口）"""
+        r = self._range(n)
+        return [
+            {'timestamp': ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for ts, (o, h, l, c, v) in zip(self._ts[r].tolist(), self._values[:, r].T.tolist())
+        ]
+
+    def dataframe(self, n: Optional[int] = None, older: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        最近 n 根K线的 DataFrame（DatetimeIndex，毫秒精度）。
+        总是返回副本：缓冲的双写槽位会被后续追加与 update_last_price 原地改写，交出去的帧不能跟着变；
+        提供 older（KLINE_DTYPE 记录，如本地库中更早的K线）时拼接在前面。
+        """
+        ts, values = self.timestamps(n), self.values(n)
+        if older is not None and len(older):
+            ts = np.concatenate([older['timestamp'], ts])
+            values = np.concatenate([np.vstack([older[name] for name in COLUMNS]).astype(self.dtype), values], axis=1)
+        else:
+            ts = ts.copy()
+        index = pd.DatetimeIndex(ts.view('M8[ms]'), copy=False, name='timestamp')
+        # 转置后按行连续复制一次，DataFrame 持有独立的数据块
+        return pd.DataFrame(np.array(values.T, order='C'), index=index, columns=list(COLUMNS), copy=False)
+
+    def nbytes(self) -> int:
+        return self._ts.nbytes + self._values.nbytes
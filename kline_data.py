@@ -3,40 +3,282 @@ K线数据管理模块
 获取、存储和计算技术指标
 """
 
+import numpy as np
 import pandas as pd
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
+from types import MappingProxyType
+
+from config import (
+    KLINE_INTERVAL, KLINE_STORE_ENABLED, KLINE_BUFFER_DTYPE, INDICATOR_ENGINE_ENABLED, INDICATORS,
+    NATIVE_TIMEFRAMES, NATIVE_TIMEFRAME_BARS, NATIVE_RETRY_SECONDS,
+)
+from kline_store import kline_store, interval_ms
+from kline_buffer import KlineBuffer, COLUMNS
+from indicator_engine import IndicatorEngine
+from indicator_registry import indicator_registry
+from timeframe_aggregator import TimeframeAggregator
 
 class KLineData:
     """K线数据管理类"""
     
     def __init__(self, market_data):
         self.market_data = market_data
-        self.klines = {}  # {symbol: deque of price points}
+        self.klines = {}  # {symbol: KlineBuffer}（列式环形缓冲）
         self.max_length = 500  # 保留最近500个数据点
         self.initialized = False
+        self.ready = {}  # {symbol: 是否已补齐到当前}
+        self.startup_metrics = {'started_at': None, 'time_to_ready': None, 'symbols': {}}
+        # 本地K线库：重启时直接恢复，只增量拉取缺失部分；更长回看从库中离线读取
+        self.store = kline_store if KLINE_STORE_ENABLED else None
+        # 启用的注册指标（核心 + config.INDICATORS），1m 引擎与各周期引擎共用
+        self.indicators = indicator_registry.resolve(INDICATORS)
+        # 增量指标引擎：随K线写入逐根递推，calculate_indicators 直接读取快照
+        self.engine = IndicatorEngine(indicators=self.indicators) if INDICATOR_ENGINE_ENABLED else None
+        # 多周期聚合（3m/15m/1h/4h）：随 1m K线增量更新，重建时从本地库补足更长的历史
+        self.timeframes = TimeframeAggregator(indicators=self.indicators)
+        # 原生高周期已收盘K线：{(symbol, tf): [K线]}，每根收盘后拉取一次；{(symbol, tf): 下次到期时间}
+        self.native_timeframes = [tf for tf in NATIVE_TIMEFRAMES if tf in self.timeframes.steps]
+        self.native_klines = {}
+        self._native_due = {}
+        self._native_thread = None  # 后台到期刷新线程，交易循环不再为原生周期发请求
+        # 指标快照缓存：{symbol: ((代数, 最后K线时间戳, 最后收盘价), 只读快照)}，所有交易员与接口共享
+        self._indicator_cache = {}
+        self._all_indicators = None
+        self._generation = 0  # update_klines / 整体替换K线时递增，使缓存失效
+        self._indicator_lock = threading.Lock()
+        self.indicator_cache_stats = {'hits': 0, 'misses': 0}
+        # 每币种一把可重入锁：热启动补齐线程整体替换K线、交易循环逐根合并，两者对同一币种互斥
+        self._symbol_locks = {}
+        self._lock = threading.Lock()  # 保护 _symbol_locks 的创建与 _generation 递增
         
     def initialize_historical_data(self):
-        """初始化历史K线数据（Binance 真实K线，失败则模拟）"""
-        print("📊 初始化历史K线（Binance真实数据）...", flush=True)
+        """初始化历史K线数据（Binance 真实K线，失败则模拟），阻塞直到所有币种就绪"""
+        self.warm_start(wait=True)
+
+    def warm_start(self, wait=False):
+        """
+        热启动：先从本地K线库立即恢复所有币种（无网络），再并发补齐各币种缺失的尾部。
+        每个币种追平后标记就绪，全部就绪时记录 time_to_ready；wait=False 时补齐在后台进行。
+        """
         from config import CRYPTO_SYMBOLS
-        for symbol in CRYPTO_SYMBOLS.keys():
+        symbols = list(CRYPTO_SYMBOLS.keys())
+        t0 = time.time()
+        self.ready = {}
+        self.startup_metrics = {'started_at': t0, 'time_to_ready': None, 'symbols': {}}
+        print("📊 初始化历史K线（本地库恢复 + 并发补齐）...", flush=True)
+        for symbol in symbols:
+            restored = self.store.get_candles(symbol, self.max_length) if self.store is not None else []
+            if restored:
+                self._set_series(symbol, restored)
+            self.startup_metrics['symbols'][symbol] = {'restored': len(restored), 'source': None, 'ready_after': None}
+        self.initialized = True
+
+        def catch_up_all():
+            with ThreadPoolExecutor(max_workers=min(8, max(1, len(symbols))), thread_name_prefix='kline-warm') as pool:
+                list(pool.map(lambda sym: self._catch_up(sym, t0), symbols))
+            self.startup_metrics['time_to_ready'] = round(time.time() - t0, 3)
+            print(f"✓ 历史K线初始化完成（{len(symbols)} 个币种，耗时 {self.startup_metrics['time_to_ready']}s）", flush=True)
+
+        if wait:
+            catch_up_all()
+        else:
+            threading.Thread(target=catch_up_all, name='kline-warm-start', daemon=True).start()
+        self._start_native_refresher()
+
+    def _catch_up(self, symbol, t0):
+        """补齐单个币种到当前：优先增量同步本地库，其次整段拉取，最后用价格模拟"""
+        if self._restore_from_store(symbol):
+            source = 'store'
+        else:
+            source = 'rest'
             print(f"  拉取 {symbol} 历史K线...", flush=True)
             try:
                 historical = self.market_data.get_historical_candles(symbol, days=3)
                 if historical and len(historical) > 0:
-                    self.klines[symbol] = deque(historical, maxlen=self.max_length)
+                    self._replace_series(symbol, historical)
+                    if self.store is not None:
+                        self.store.append(symbol, historical)
                     print(f"  ✓ {symbol}: {len(historical)} 根K线", flush=True)
                 else:
                     # Binance失败，使用Finnhub模拟
-                    self._simulate_klines_from_price(symbol)
+                    source = self._fallback(symbol)
             except Exception as e:
                 print(f"  ⚠️ {symbol}: Binance失败 ({str(e)[:50]}), 使用Finnhub价格模拟", flush=True)
-                self._simulate_klines_from_price(symbol)
-        
-        self.initialized = True
-        print("✓ 历史K线初始化完成", flush=True)
-    
+                source = self._fallback(symbol)
+        for tf in self.native_timeframes:
+            self._refresh_native(symbol, tf)
+        self.ready[symbol] = True
+        self.startup_metrics['symbols'][symbol].update(source=source, ready_after=round(time.time() - t0, 3))
+
+    def _fallback(self, symbol):
+        """补齐失败：已从本地库恢复的真实K线优先于模拟数据，由交易循环继续追加"""
+        if self.startup_metrics['symbols'][symbol]['restored']:
+            print(f"  ⚠️ {symbol}: 沿用本地库K线（尾部待交易循环补齐）", flush=True)
+            return 'stale_store'
+        self._simulate_klines_from_price(symbol)
+        return 'simulated'
+
+    def _restore_from_store(self, symbol):
+        """增量同步本地K线库并载入；同步失败或库为空时返回 False"""
+        if self.store is None:
+            return False
+        try:
+            added = self.store.sync(symbol, self.market_data)
+        except Exception as e:
+            print(f"  ⚠️ {symbol}: 本地K线库同步失败 ({str(e)[:50]})", flush=True)
+            return False
+        stored = self.store.get_candles(symbol, self.max_length)
+        if not stored:
+            return False
+        self._replace_series(symbol, stored)
+        print(f"  ✓ {symbol}: {len(stored)} 根K线（本地库，新增 {added} 根）", flush=True)
+        return True
+
+    def _symbol_lock(self, symbol):
+        lock = self._symbol_locks.get(symbol)
+        if lock is None:
+            with self._lock:
+                lock = self._symbol_locks.setdefault(symbol, threading.RLock())
+        return lock
+
+    def _bump_generation(self):
+        with self._lock:
+            self._generation += 1
+
+    def _set_series(self, symbol, candles=()):
+        """整体替换某币种的内存K线，并据此重建增量指标状态"""
+        candles = list(candles)
+        with self._symbol_lock(symbol):
+            self.klines[symbol] = KlineBuffer.from_candles(candles, self.max_length, KLINE_BUFFER_DTYPE)
+            if self.engine is not None:
+                self.engine.rebuild(symbol, candles)
+            self._rebuild_timeframes(symbol)
+        self._bump_generation()
+
+    def _rebuild_timeframes(self, symbol):
+        """用内存K线 + 本地库中更早的K线重建多周期聚合（向量化，覆盖最长周期所需的历史）"""
+        series = self.klines[symbol]
+        ts, values = series.timestamps(), series.values()
+        if self.store is not None and len(series):
+            # 原生周期不靠 1m 回溯，只为其余周期读取所需的历史
+            base = interval_ms(KLINE_INTERVAL)
+            longest = max((step for tf, step in self.timeframes.steps.items() if tf not in self.native_timeframes),
+                          default=base)
+            need = longest // base * self.timeframes.capacity - len(series)
+            if need > 0:
+                older = self.store.read(symbol, need, before=int(ts[0]))
+                if len(older):
+                    ts = np.concatenate([older['timestamp'], ts])
+                    values = np.concatenate([np.vstack([older[name] for name in COLUMNS]), values], axis=1)
+        self.timeframes.rebuild(symbol, ts, values)
+        for tf in self.native_timeframes:
+            if (symbol, tf) in self.native_klines:
+                self.timeframes.seed_native(symbol, tf, self.native_klines[(symbol, tf)])
+
+    def _refresh_native(self, symbol, tf):
+        """
+        拉取某币种一个原生周期的已收盘K线并播种聚合器；有本地库时增量同步（重启后只补缺失的几根）。
+        成功后下次到期为当前K线收盘时刻，失败则 NATIVE_RETRY_SECONDS 后重试。
+        """
+        step = interval_ms(tf)
+        now_ms = int(time.time() * 1000)
+        try:
+            if self.store is not None:
+                self.store.sync(symbol, self.market_data, interval=tf, backfill=NATIVE_TIMEFRAME_BARS)
+                bars = self.store.get_candles(symbol, NATIVE_TIMEFRAME_BARS, interval=tf)
+            else:
+                recent = self.market_data.get_recent_klines(symbol, NATIVE_TIMEFRAME_BARS + 1, use_stream=False, interval=tf)
+                bars = [c for c in recent if c['timestamp'] + step <= now_ms]
+        except Exception as e:
+            print(f"  ⚠️ {symbol}: {tf} K线拉取失败 ({str(e)[:50]})", flush=True)
+            bars = []
+        # 网络请求在锁外；播种聚合器与交易循环的逐根合并、补齐线程的整体替换互斥
+        with self._symbol_lock(symbol):
+            if not bars:
+                self._native_due[(symbol, tf)] = time.time() + NATIVE_RETRY_SECONDS
+                return False
+            self.native_klines[(symbol, tf)] = bars
+            self.timeframes.seed_native(symbol, tf, bars)
+            self._native_due[(symbol, tf)] = (now_ms // step + 1) * step / 1000
+        self._bump_generation()
+        return True
+
+    def _refresh_native_due(self):
+        """只刷新跨过原生周期收盘（或重试时间到）的币种；补齐未完成的币种由 _catch_up 负责"""
+        now = time.time()
+        for (symbol, tf), due in list(self._native_due.items()):
+            if now >= due and self.ready.get(symbol):
+                self._refresh_native(symbol, tf)
+
+    def _start_native_refresher(self):
+        """启动后台线程按到期时间刷新原生周期K线（阻塞 I/O 不进入交易循环）"""
+        if not self.native_timeframes or self._native_thread is not None:
+            return
+        with self._lock:
+            if self._native_thread is None:
+                self._native_thread = threading.Thread(target=self._native_loop, name='kline-native', daemon=True)
+                self._native_thread.start()
+
+    def _native_loop(self):
+        while True:
+            try:
+                self._refresh_native_due()
+            except Exception as e:
+                print(f"  ⚠️ 原生周期K线刷新失败: {e}", flush=True)
+            # 睡到最早的到期时间（至少 1 秒，至多 NATIVE_RETRY_SECONDS，以便及时接手新就绪的币种）
+            upcoming = min(self._native_due.values(), default=time.time() + NATIVE_RETRY_SECONDS)
+            time.sleep(min(max(upcoming - time.time(), 1.0), NATIVE_RETRY_SECONDS))
+
+    def _add_candle(self, symbol, candle):
+        """合并一根K线（同一时间戳原地更新，更新的时间戳追加），同步推进增量指标"""
+        with self._symbol_lock(symbol):
+            if self.klines[symbol].merge(candle):
+                if self.engine is not None:
+                    self.engine.update(symbol, candle)
+                self.timeframes.update(symbol, candle)
+
+    def _replace_series(self, symbol, candles):
+        """替换内存K线，保留交易循环在补齐期间已合并的更新K线（如形成中的K线）"""
+        # 读取旧缓冲与换入新缓冲在同一把锁内，期间合并的K线不会丢失
+        with self._symbol_lock(symbol):
+            old = self.klines.get(symbol)
+            newer = [c for c in old.to_candles() if c['timestamp'] > candles[-1]['timestamp']] if old is not None else []
+            self._set_series(symbol, list(candles) + newer)
+
+    def is_ready(self, symbol=None):
+        """热启动补齐是否完成（不传 symbol 时要求全部币种就绪）"""
+        if not self.initialized:
+            return False
+        if symbol is not None:
+            return self.ready.get(symbol, False)
+        return all(self.ready.get(s, False) for s in self.startup_metrics['symbols'])
+
+    def get_startup_metrics(self):
+        """启动指标：各币种恢复根数、数据来源、就绪耗时，以及整体 time_to_ready（秒）"""
+        if not self.initialized:
+            return {'ready': False, 'time_to_ready': None, 'symbols': {}}
+        return {
+            'ready': self.is_ready(),
+            'time_to_ready': self.startup_metrics['time_to_ready'],
+            'symbols': {s: dict(m, ready=self.ready.get(s, False)) for s, m in self.startup_metrics['symbols'].items()},
+        }
+
+    def _persist(self, symbol, recent):
+        """已收盘K线写入本地库；与库尾不连续（如停机期间）时先分页补齐缺口"""
+        # 热启动补齐完成前由 _catch_up 的分页同步负责落盘，避免抢先写入导致空库跳过回补
+        if self.store is None or not recent or not self.ready.get(symbol):
+            return
+        try:
+            last_ts = self.store.last_timestamp(symbol)
+            if last_ts is not None and recent[0]['timestamp'] - last_ts > interval_ms(KLINE_INTERVAL):
+                self.store.sync(symbol, self.market_data)
+            else:
+                self.store.append(symbol, recent)
+        except Exception as e:
+            print(f"  ⚠️ {symbol}: K线落盘失败: {e}", flush=True)
+
     def _simulate_klines_from_price(self, symbol):
         """使用Finnhub当前价格模拟K线数据"""
         try:
@@ -58,14 +300,18 @@ class KLineData:
                     'close': price,
                     'volume': 1000000
                 })
-            self.klines[symbol] = deque(simulated, maxlen=self.max_length)
+            self._set_series(symbol, simulated)
             print(f"  ✓ {symbol}: 已模拟500根K线（基于Finnhub价格${current_price:.2f}）", flush=True)
         except Exception as e:
             print(f"  ✗ {symbol}: 模拟K线失败: {e}", flush=True)
-            self.klines[symbol] = deque(maxlen=self.max_length)
+            self._set_series(symbol)
     
-    def update_klines(self):
-        """更新K线数据 - 添加最新价格"""
+    def update_klines(self, recent_klines=None, prices=None):
+        """更新K线数据 - 添加最新价格
+        
+        recent_klines: 可选的 {symbol: [K线]}（如异步快照已并发拉取），提供时不再逐个请求
+        prices: 可选的 {symbol: 最新价}（批量行情）；快照中没有K线的币种用它更新形成中的K线
+        """
         # 首次调用时初始化历史数据
         if not self.initialized:
             self.initialize_historical_data()
@@ -74,87 +320,89 @@ class KLineData:
         from config import CRYPTO_SYMBOLS
         for symbol in CRYPTO_SYMBOLS.keys():
             try:
-                recent = self.market_data.get_recent_klines(symbol, limit=2)
-                if symbol not in self.klines:
-                    self.klines[symbol] = deque(maxlen=self.max_length)
-                # 仅在时间戳比最后一条更新时追加
-                last_ts = self.klines[symbol][-1]['timestamp'] if len(self.klines[symbol]) else None
-                for c in recent:
-                    if (last_ts is None) or (c['timestamp'] > last_ts):
-                        self.klines[symbol].append(c)
+                if recent_klines is not None and symbol in recent_klines:
+                    recent = recent_klines[symbol]
+                elif prices is not None and symbol in prices and self._apply_price(symbol, prices[symbol]):
+                    continue
+                else:
+                    recent = self.market_data.get_recent_klines(symbol, limit=2)
+                with self._symbol_lock(symbol):
+                    if symbol not in self.klines:
+                        self._set_series(symbol)
+                    for c in recent:
+                        self._add_candle(symbol, c)
+                self._persist(symbol, recent)
             except Exception as e:
                 # Binance失败，使用Finnhub价格追加模拟K线
                 try:
                     price_data = self.market_data.get_crypto_price(symbol)
                     current_price = price_data[0] if isinstance(price_data, tuple) else price_data
                     current_time = int(time.time() * 1000)
-                    if symbol not in self.klines:
-                        self.klines[symbol] = deque(maxlen=self.max_length)
-                    
-                    # 追加一个新的模拟K线点
-                    last_ts = self.klines[symbol][-1]['timestamp'] if len(self.klines[symbol]) else 0
-                    if current_time > last_ts:
-                        self.klines[symbol].append({
-                            'timestamp': current_time,
-                            'open': current_price,
-                            'high': current_price * 1.001,
-                            'low': current_price * 0.999,
-                            'close': current_price,
-                            'volume': 1000000
-                        })
+                    with self._symbol_lock(symbol):
+                        if symbol not in self.klines:
+                            self._set_series(symbol)
+                        
+                        # 追加一个新的模拟K线点
+                        last_ts = self.klines[symbol].last_timestamp or 0
+                        if current_time > last_ts:
+                            self._add_candle(symbol, {
+                                'timestamp': current_time,
+                                'open': current_price,
+                                'high': current_price * 1.001,
+                                'low': current_price * 0.999,
+                                'close': current_price,
+                                'volume': 1000000
+                            })
                 except Exception as e2:
                     pass  # 静默失败，不打印太多错误
+        # 本轮数据已变化：下一次 get_all_indicators 重新计算（每轮每币种只算一次）
+        self._bump_generation()
     
+    def _apply_price(self, symbol, price):
+        """用最新成交价更新当前周期内形成中的K线；最后一根不属于当前周期时返回 False（需拉取K线）"""
+        step = interval_ms(KLINE_INTERVAL)
+        with self._symbol_lock(symbol):
+            series = self.klines.get(symbol)
+            if not series:
+                return False
+            if series.last_timestamp != int(time.time() * 1000) // step * step:
+                return False
+            series.update_last_price(price)
+            last = series.last()
+            if self.engine is not None:
+                self.engine.update(symbol, last)
+            self.timeframes.update(symbol, last)
+        return True
+
     def get_dataframe(self, symbol, periods=100):
-        """获取指定币种的DataFrame"""
-        if symbol not in self.klines or len(self.klines[symbol]) < 2:
+        """
+        获取指定币种的DataFrame（索引为 openTime，毫秒精度）。
+        从环形缓冲复制出独立的 DataFrame（不随后续写入变化）；超出内存窗口的部分从本地K线库补齐（无网络请求）。
+        """
+        series = self.klines.get(symbol)
+        if series is None or len(series) < 2:
             return None
         
-        data = list(self.klines[symbol])[-periods:]
-        df = pd.DataFrame(data)
-        # Binance 返回的 openTime 为毫秒时间戳
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        
-        return df
+        with self._symbol_lock(symbol):
+            n = min(periods, len(series))
+            older = None
+            if n < periods and self.store is not None:
+                older = self.store.read(symbol, periods - n, before=int(series.timestamps(n)[0]))
+            return series.dataframe(n, older)
     
     def calculate_indicators(self, symbol):
-        """计算所有技术指标"""
+        """计算所有技术指标（开启增量引擎时直接读取其快照，O(1)）"""
+        if self.engine is not None:
+            return self.engine.snapshot(symbol)
+        return self.calculate_indicators_pandas(symbol)
+
+    def calculate_indicators_pandas(self, symbol):
+        """基于最近200根K线的 DataFrame 整体重算（参考实现）"""
         df = self.get_dataframe(symbol, 200)
         if df is None or len(df) < 20:  # 降低最小要求从50到20
             return None
         
-        # 计算指标（纯 pandas 实现）
-        # EMA
-        df['EMA_20'] = df['close'].ewm(span=20, adjust=False).mean()
-        df['EMA_50'] = df['close'].ewm(span=50, adjust=False).mean()
-        
-        # MACD
-        ema12 = df['close'].ewm(span=12, adjust=False).mean()
-        ema26 = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD_12_26_9'] = ema12 - ema26
-        df['MACDs_12_26_9'] = df['MACD_12_26_9'].ewm(span=9, adjust=False).mean()
-        df['MACDh_12_26_9'] = df['MACD_12_26_9'] - df['MACDs_12_26_9']
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=7).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=7).mean()
-        rs = gain / loss
-        df['RSI_7'] = 100 - (100 / (1 + rs))
-        
-        gain14 = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss14 = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs14 = gain14 / loss14
-        df['RSI_14'] = 100 - (100 / (1 + rs14))
-        
-        # ATR
-        high_low = df['high'] - df['low']
-        high_close = abs(df['high'] - df['close'].shift())
-        low_close = abs(df['low'] - df['close'].shift())
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        df['ATRr_3'] = tr.rolling(window=3).mean()
-        df['ATRr_14'] = tr.rolling(window=14).mean()
+        add_indicator_columns(df)
         
         # 获取最新值
         latest = df.iloc[-1]
@@ -168,8 +416,8 @@ class KLineData:
             'macd_hist': latest.get('MACDh_12_26_9', None),
             'rsi_7': latest.get('RSI_7', None),
             'rsi_14': latest.get('RSI_14', None),
-            'atr_3': latest.get('ATR_3', None),
-            'atr_14': latest.get('ATR_14', None),
+            'atr_3': latest.get('ATRr_3', None),
+            'atr_14': latest.get('ATRr_14', None),
             'volume': latest.get('volume', 0)
         }
         
@@ -188,12 +436,75 @@ class KLineData:
         
         return indicators
     
+    def get_timeframe_indicators(self, symbol, timeframe):
+        """某币种某个聚合周期（如 '3m'、'4h'）的当前指标与序列；历史不足时返回 None"""
+        return self.timeframes.snapshot(symbol, timeframe)
+
     def get_all_indicators(self):
-        """获取所有币种的技术指标"""
-        all_indicators = {}
-        for symbol in self.klines.keys():
-            indicators = self.calculate_indicators(symbol)
-            if indicators:
-                all_indicators[symbol] = indicators
-        return all_indicators
+        """
+        获取所有币种的技术指标（只读快照）。
+        按 (代数, 最后K线时间戳, 最后收盘价) 缓存：数据未变化时所有交易员与接口拿到同一个对象，
+        指标计算每轮数据变化只付出一次，而不是每个调用方一次。
+        """
+        with self._indicator_lock:
+            changed = self._all_indicators is None
+            all_indicators = {}
+            for symbol, series in list(self.klines.items()):
+                key = (self._generation, series.last_timestamp, series.last_close)
+                cached = self._indicator_cache.get(symbol)
+                if cached is not None and cached[0] == key:
+                    self.indicator_cache_stats['hits'] += 1
+                else:
+                    self.indicator_cache_stats['misses'] += 1
+                    indicators = self.calculate_indicators(symbol)
+                    cached = self._indicator_cache[symbol] = (key, _freeze(indicators) if indicators else None)
+                    changed = True
+                if cached[1] is not None:
+                    all_indicators[symbol] = cached[1]
+            if changed or len(all_indicators) != len(self._all_indicators):
+                self._all_indicators = MappingProxyType(all_indicators)
+            return self._all_indicators
+
+
+def add_indicator_columns(df):
+    """
+    pandas 参考实现：在 OHLCV DataFrame 上追加 EMA/MACD/RSI(滚动均值)/ATR(滚动均值) 列并返回。
+    calculate_indicators_pandas 与 benchmark_indicators.py 共用。
+    """
+    # EMA
+    df['EMA_20'] = df['close'].ewm(span=20, adjust=False).mean()
+    df['EMA_50'] = df['close'].ewm(span=50, adjust=False).mean()
+    
+    # MACD
+    ema12 = df['close'].ewm(span=12, adjust=False).mean()
+    ema26 = df['close'].ewm(span=26, adjust=False).mean()
+    df['MACD_12_26_9'] = ema12 - ema26
+    df['MACDs_12_26_9'] = df['MACD_12_26_9'].ewm(span=9, adjust=False).mean()
+    df['MACDh_12_26_9'] = df['MACD_12_26_9'] - df['MACDs_12_26_9']
+    
+    # RSI
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=7).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=7).mean()
+    rs = gain / loss
+    df['RSI_7'] = 100 - (100 / (1 + rs))
+    
+    gain14 = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss14 = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs14 = gain14 / loss14
+    df['RSI_14'] = 100 - (100 / (1 + rs14))
+    
+    # ATR
+    high_low = df['high'] - df['low']
+    high_close = abs(df['high'] - df['close'].shift())
+    low_close = abs(df['low'] - df['close'].shift())
+    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    df['ATRr_3'] = tr.rolling(window=3).mean()
+    df['ATRr_14'] = tr.rolling(window=14).mean()
+    return df
+
+
+def _freeze(indicators):
+    """指标字典转为只读快照：外层 MappingProxyType，序列转为元组"""
+    return MappingProxyType({k: tuple(v) if isinstance(v, list) else v for k, v in indicators.items()})
 
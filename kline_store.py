@@ -0,0 +1,158 @@
+"""
+本地K线库模块
+按币种/周期保存只追加的定长记录文件（numpy 内存映射读取），
+从最后一根已存K线起分页增量同步，任意回看长度都可离线读取。
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    KLINE_INTERVAL,
+    KLINE_STORE_DIR,
+    KLINE_STORE_BACKFILL,
+    KLINE_PAGE_LIMIT,
+)
+
+# 每根K线一条 48 字节记录，字段与 parse_binance_klines 的输出一致
+KLINE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+_INTERVAL_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def interval_ms(interval: str) -> int:
+    """'1m' / '4h' / '1d' -> 毫秒"""
+    return int(interval[:-1]) * _INTERVAL_UNITS_MS[interval[-1]]
+
+
+class KlineStore:
+    """只追加的本地K线库：只保存已收盘K线，文件按时间戳严格递增"""
+
+    def __init__(self, base_dir: str = KLINE_STORE_DIR):
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        # (symbol, interval) -> (文件字节数, memmap)，文件增长后重新映射
+        self._maps: Dict[tuple, tuple] = {}
+
+    def path(self, symbol: str, interval: str = KLINE_INTERVAL) -> str:
+        return os.path.join(self.base_dir, f"{symbol}_{interval}.bin")
+
+    # -------- 读取 --------
+    def _records(self, symbol: str, interval: str) -> np.ndarray:
+        """当前全部记录（只读内存映射；文件不存在时为空数组）"""
+        path = self.path(symbol, interval)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        n = size // KLINE_DTYPE.itemsize
+        if n == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        key = (symbol, interval)
+        cached = self._maps.get(key)
+        if cached is None or cached[0] != n:
+            cached = (n, np.memmap(path, dtype=KLINE_DTYPE, mode='r', shape=(n,)))
+            self._maps[key] = cached
+        return cached[1]
+
+    def count(self, symbol: str, interval: str = KLINE_INTERVAL) -> int:
+        return len(self._records(symbol, interval))
+
+    def last_timestamp(self, symbol: str, interval: str = KLINE_INTERVAL) -> Optional[int]:
+        records = self._records(symbol, interval)
+        return int(records['timestamp'][-1]) if len(records) else None
+
+    def read(self, symbol: str, periods: int, interval: str = KLINE_INTERVAL,
+             before: Optional[int] = None) -> np.ndarray:
+        """最近 periods 条记录（可限定时间戳早于 before），返回独立副本"""
+        records = self._records(symbol, interval)
+        end = len(records)
+        if before is not None:
+            end = int(np.searchsorted(records['timestamp'], before, side='left'))
+        return np.array(records[max(0, end - periods):end])
+
+    def get_candles(self, symbol: str, periods: int, interval: str = KLINE_INTERVAL,
+                    before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """以 K线字典列表返回（与 KLineData 的内存格式一致）"""
+        rows = self.read(symbol, periods, interval, before)
+        names = KLINE_DTYPE.names
+        return [
+            {name: (int(row[0]) if name == 'timestamp' else float(row[i])) for i, name in enumerate(names)}
+            for row in rows.tolist()
+        ]
+
+    def get_dataframe(self, symbol: str, periods: int = 100,
+                      interval: str = KLINE_INTERVAL) -> Optional[pd.DataFrame]:
+        """离线读取最近 periods 根已收盘K线，格式与 KLineData.get_dataframe 相同"""
+        rows = self.read(symbol, periods, interval)
+        if len(rows) < 2:
+            return None
+        df = pd.DataFrame(rows)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df
+
+    # -------- 写入 --------
+    def append(self, symbol: str, candles: List[Dict[str, Any]], interval: str = KLINE_INTERVAL,
+               now_ms: Optional[int] = None) -> int:
+        """追加已收盘且晚于库中最后一根的K线，返回写入条数"""
+        if not candles:
+            return 0
+        step = interval_ms(interval)
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        with self.lock:
+            last_ts = self.last_timestamp(symbol, interval)
+            fresh = []
+            for c in candles:
+                ts = int(c['timestamp'])
+                if ts + step > now_ms:
+                    break  # 形成中的K线不落盘
+                if last_ts is None or ts > last_ts:
+                    fresh.append((ts, c['open'], c['high'], c['low'], c['close'], c['volume']))
+                    last_ts = ts
+            if not fresh:
+                return 0
+            os.makedirs(self.base_dir, exist_ok=True)
+            path = self.path(symbol, interval)
+            with open(path, 'ab') as f:
+                # 截掉上次异常退出留下的半条记录
+                size = f.tell()
+                if size % KLINE_DTYPE.itemsize:
+                    f.truncate(size - size % KLINE_DTYPE.itemsize)
+                f.write(np.array(fresh, dtype=KLINE_DTYPE).tobytes())
+            return len(fresh)
+
+    # -------- 同步 --------
+    def sync(self, symbol: str, market_data, interval: str = KLINE_INTERVAL,
+             backfill: int = KLINE_STORE_BACKFILL) -> int:
+        """从最后一根已存K线之后分页拉取到当前，空库时回补 backfill 根；返回新增条数"""
+        step = interval_ms(interval)
+        now_ms = int(time.time() * 1000)
+        last_ts = self.last_timestamp(symbol, interval)
+        start = last_ts + step if last_ts is not None else now_ms - backfill * step
+        added = 0
+        while start + step <= now_ms:
+            page = market_data.get_klines_since(symbol, start, interval=interval, limit=KLINE_PAGE_LIMIT)
+            if not page:
+                break
+            added += self.append(symbol, page, interval, now_ms)
+            if len(page) < KLINE_PAGE_LIMIT:
+                break
+            start = int(page[-1]['timestamp']) + step
+        return added
+
+
+# 进程内共享
+kline_store = KlineStore()
@@ -6,10 +6,14 @@
 import time
 from datetime import datetime
 
+from config import MARK_PRICE_SOURCE, POSITION_BOOK_ENABLED
+from position_book import PositionBook
+from liquidation_index import LiquidationIndex
+
 class LeverageEngine:
     """杠杆交易引擎"""
     
-    def __init__(self, initial_balance=10000):
+    def __init__(self, initial_balance=10000, position_book=POSITION_BOOK_ENABLED):
         self.accounts = {}
         self.positions = {}  # {trader_id: {symbol: position_obj}}
         self.orders = {}  # {trader_id: [order_list]}
@@ -24,6 +28,17 @@ class LeverageEngine:
             'history': []
         }
         
+        # 可选的盘口：MARK_PRICE_SOURCE=mid 时持仓按最优买卖中间价估值
+        self.order_book = None
+        # 可选的列式持仓簿：开启时 update_positions 对所有持仓做向量化估值，positions 字典按需回写
+        self.book = PositionBook() if position_book else None
+        # 按币种/方向排序的清算价索引：每个 tick 只访问被价格穿越的持仓
+        self.liquidations = LiquidationIndex()
+        
+    def attach_order_book(self, order_book):
+        """挂载盘口（OrderBook），持仓估值与清算检查改用新鲜的盘口中间价"""
+        self.order_book = order_book
+    
     def create_account(self, trader_id, trader_name):
         """创建交易账户"""
         self.accounts[trader_id] = {
@@ -45,6 +60,8 @@ class LeverageEngine:
             'created_at': time.time()
         }
         self.positions[trader_id] = {}
+        if self.book is not None:
+            self.book.add_trader(trader_id)
         self.orders[trader_id] = []
         self.account_history[trader_id] = []
         return self.accounts[trader_id]
@@ -121,6 +138,9 @@ class LeverageEngine:
         if trader_id not in self.positions:
             self.positions[trader_id] = {}
         self.positions[trader_id][symbol] = position
+        if self.book is not None:
+            self.book.add(trader_id, symbol, position)
+        self.liquidations.add(trader_id, symbol, side, liquidation_price)
         
         # 记录交易
         trade = {
@@ -211,18 +231,61 @@ class LeverageEngine:
         
         # 删除持仓
         del self.positions[trader_id][symbol]
+        if self.book is not None:
+            self.book.remove(trader_id, symbol)
+        self.liquidations.remove(trader_id, symbol)
         
         return {'success': True, 'trade': trade, 'pnl': net_pnl}
     
     def update_positions(self, current_prices):
-        """更新所有持仓的未实现盈亏"""
+        """更新所有持仓的未实现盈亏（有新鲜盘口且 MARK_PRICE_SOURCE=mid 时按中间价估值）"""
+        mids = self.order_book.get_mids() if self.order_book is not None and MARK_PRICE_SOURCE == 'mid' else {}
+        prices = dict(current_prices, **mids)
+        
+        # 先平掉清算价被穿越的持仓（索引二分定位，只访问被穿越的部分），再对剩余持仓估值
+        for symbol, price in prices.items():
+            for trader_id in self.liquidations.triggered(symbol, price):
+                self.liquidate_position(trader_id, symbol, price)
+        
+        if self.book is not None:
+            ts = self._update_positions_book(prices)
+        else:
+            ts = self._update_positions_dict(current_prices, mids)
+        
+        # 更新BTC Buy & Hold基准
+        if 'BTC' in current_prices:
+            btc_price = current_prices['BTC']
+            
+            # 初始化BTC基准价格
+            if self.btc_benchmark['initial_price'] is None:
+                self.btc_benchmark['initial_price'] = btc_price
+            
+            # 计算BTC Buy & Hold收益
+            btc_return_pct = ((btc_price - self.btc_benchmark['initial_price']) / self.btc_benchmark['initial_price']) * 100
+            btc_value = self.initial_balance * (1 + btc_return_pct / 100)
+            
+            # 记录历史
+            self.btc_benchmark['history'].append({
+                'timestamp': ts,
+                'value': btc_value,
+                'profit_loss_percent': btc_return_pct,
+                'price': btc_price
+            })
+            
+            # 数据压缩策略：保留更长时间的历史，但对旧数据降采样
+            if len(self.btc_benchmark['history']) > 5000:
+                self.btc_benchmark['history'] = self._compress_history(self.btc_benchmark['history'])
+    
+    def _update_positions_dict(self, current_prices, mids):
+        """逐个持仓估值（默认路径），返回本次时间戳"""
+        ts = time.time()
         for trader_id, positions in self.positions.items():
             total_unrealized = 0
             total_margin = 0  # 重新计算实际使用的保证金
             
             for symbol, pos in positions.items():
-                if symbol in current_prices:
-                    current_price = current_prices[symbol]
+                current_price = mids.get(symbol, current_prices.get(symbol))
+                if current_price is not None:
                     pos['current_price'] = current_price
                     
                     # 计算未实现盈亏
@@ -236,12 +299,6 @@ class LeverageEngine:
                     
                     # 累加实际持仓的保证金
                     total_margin += pos.get('margin', 0)
-                    
-                    # 检查是否触及清算价
-                    if pos['side'] == 'long' and current_price <= pos['liquidation_price']:
-                        self.liquidate_position(trader_id, symbol, current_price)
-                    elif pos['side'] == 'short' and current_price >= pos['liquidation_price']:
-                        self.liquidate_position(trader_id, symbol, current_price)
             
             # 更新账户总价值（权益 = 初始资金 + 已实现盈亏 + 未实现盈亏 - 手续费）
             account = self.accounts[trader_id]
@@ -257,7 +314,6 @@ class LeverageEngine:
             account['profit_loss_percent'] = ((account['total_value'] - self.initial_balance) / self.initial_balance) * 100
             
             # 记录历史（每次持仓更新都记录，确保曲线反映市场波动）
-            import time
             if trader_id not in self.account_history:
                 self.account_history[trader_id] = []
             
@@ -272,30 +328,41 @@ class LeverageEngine:
             # 数据压缩策略：保留更长时间的历史，但对旧数据降采样
             if len(self.account_history[trader_id]) > 5000:
                 self.account_history[trader_id] = self._compress_history(self.account_history[trader_id])
+        return ts
+    
+    def _update_positions_book(self, prices):
+        """
+        列式持仓簿路径：一次向量运算完成全部持仓估值，再按账户汇总（bincount）的未实现盈亏与保证金更新账户，
+        返回本次时间戳。清算已由索引先行处理，mark 的穿越判定只作兜底
+        """
+        unrealized, margin, liquidations = self.book.mark(prices)
+        for trader_id, symbol, price in liquidations:
+            self.liquidate_position(trader_id, symbol, price)
         
-        # 更新BTC Buy & Hold基准
-        if 'BTC' in current_prices:
-            btc_price = current_prices['BTC']
+        ts = time.time()
+        for trader_id, total_unrealized, total_margin in zip(self.book.trader_ids, unrealized.tolist(), margin.tolist()):
+            account = self.accounts.get(trader_id)
+            if account is None:
+                continue
+            account['unrealized_pnl'] = total_unrealized
             
-            # 初始化BTC基准价格
-            if self.btc_benchmark['initial_price'] is None:
-                self.btc_benchmark['initial_price'] = btc_price
+            # 同步 margin_used 为实际持仓的保证金总和（求和顺序不同带来的浮点误差不提示）
+            if abs(account['margin_used'] - total_margin) > 1e-6:
+                print(f"  🔧 [修复] {account['name']} margin_used 不同步：{account['margin_used']:.2f} -> {total_margin:.2f}", flush=True)
+            account['margin_used'] = total_margin
             
-            # 计算BTC Buy & Hold收益
-            btc_return_pct = ((btc_price - self.btc_benchmark['initial_price']) / self.btc_benchmark['initial_price']) * 100
-            btc_value = self.initial_balance * (1 + btc_return_pct / 100)
+            account['total_value'] = self.initial_balance - account['fees'] + account['realized_pnl'] + total_unrealized
+            account['profit_loss_percent'] = ((account['total_value'] - self.initial_balance) / self.initial_balance) * 100
             
-            # 记录历史
-            self.btc_benchmark['history'].append({
+            history = self.account_history.setdefault(trader_id, [])
+            history.append({
                 'timestamp': ts,
-                'value': btc_value,
-                'profit_loss_percent': btc_return_pct,
-                'price': btc_price
+                'value': account['total_value'],
+                'profit_loss_percent': account['profit_loss_percent']
             })
-            
-            # 数据压缩策略：保留更长时间的历史，但对旧数据降采样
-            if len(self.btc_benchmark['history']) > 5000:
-                self.btc_benchmark['history'] = self._compress_history(self.btc_benchmark['history'])
+            if len(history) > 5000:
+                self.account_history[trader_id] = self._compress_history(history)
+        return ts
     
     def liquidate_position(self, trader_id, symbol, current_price):
         """清算持仓"""
@@ -344,7 +411,7 @@ class LeverageEngine:
         if not account:
             return None
         
-        positions = self.positions.get(trader_id, {})
+        positions = self.get_positions(trader_id)
         
         # === 核心财务指标 ===
         initial_balance = self.initial_balance
@@ -436,8 +503,11 @@ class LeverageEngine:
         return metrics
     
     def get_positions(self, trader_id):
-        """获取持仓"""
-        return self.positions.get(trader_id, {})
+        """获取持仓（开启持仓簿时先回写该账户最新的现价与未实现盈亏）"""
+        positions = self.positions.get(trader_id, {})
+        if self.book is not None:
+            self.book.sync(trader_id, positions)
+        return positions
     
     def get_leaderboard(self):
         """获取排行榜（包含BTC基准）- 使用统一财务指标"""
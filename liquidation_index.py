@@ -0,0 +1,64 @@
+"""
+清算触发索引
+每个币种按方向各维护一个按清算价排序的列表：多仓按清算价降序、空仓按清算价升序，
+价格变动时被穿越的持仓恰好是列表的前缀，二分查找即可定位，O(log n + k)，
+update_positions 不再逐个持仓比较清算价。
+
+排序键：多仓用 -清算价（价格 <= 清算价触发），空仓用清算价（价格 >= 清算价触发），
+两者都是“键 <= 阈值”的前缀，共用同一套 bisect 逻辑。
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Tuple
+
+
+class LiquidationIndex:
+    """按 (币种, 方向) 排序的清算价索引；开仓时加入、平仓时移除"""
+
+    def __init__(self):
+        self._books: Dict[Tuple[str, str], Tuple[List[float], List[Any]]] = {}  # {(symbol, side): (排序键, trader_id)}
+        self._entries: Dict[Tuple[Any, str], Tuple[str, float]] = {}  # {(trader_id, symbol): (side, 排序键)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(side: str, liquidation_price: float) -> float:
+        return -liquidation_price if side == 'long' else liquidation_price
+
+    def add(self, trader_id, symbol: str, side: str, liquidation_price: float) -> None:
+        """加入（或替换同一账户同一币种的）持仓清算价"""
+        self.remove(trader_id, symbol)
+        side = 'long' if side == 'long' else 'short'  # 与开仓一致：非 long 均按空仓处理
+        key = self._key(side, float(liquidation_price))
+        keys, traders = self._books.setdefault((symbol, side), ([], []))
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        traders.insert(i, trader_id)
+        self._entries[(trader_id, symbol)] = (side, key)
+
+    def remove(self, trader_id, symbol: str) -> bool:
+        entry = self._entries.pop((trader_id, symbol), None)
+        if entry is None:
+            return False
+        side, key = entry
+        keys, traders = self._books[(symbol, side)]
+        i = bisect_left(keys, key)
+        while traders[i] != trader_id:  # 清算价相同的持仓按加入顺序排列
+            i += 1
+        del keys[i]
+        del traders[i]
+        return True
+
+    def triggered(self, symbol: str, price: float) -> List[Any]:
+        """当前价格穿越清算价的账户（多仓在前，各自按穿越深度从深到浅）"""
+        hit = []
+        for side, threshold in (('long', -price), ('short', price)):
+            book = self._books.get((symbol, side))
+            if book:
+                hit.extend(book[1][:bisect_right(book[0], threshold)])
+        return hit
+
+    def stats(self) -> Dict[str, Any]:
+        return {'positions': len(self._entries),
+                'by_symbol': {f"{symbol}:{side}": len(keys) for (symbol, side), (keys, _) in self._books.items() if keys}}
@@ -5,17 +5,54 @@
 
 import time
 import json
-import requests
 from typing import Dict, Any, List, Optional
 
 from config import (
     CRYPTO_SYMBOLS,
-    BINANCE_BASE_URLS,
     KLINE_INTERVAL,
     KLINE_LIMIT,
+    KLINE_PAGE_LIMIT,
     PRICE_REFRESH_SECONDS,
     FINNHUB_API_KEY,
+    COINGECKO_IDS,
+    PRICE_HEDGING_ENABLED,
 )
+from http_client import get_http_client
+from rate_limiter import rate_governor
+from cassette import cassette
+from endpoint_manager import spot_endpoints, fapi_endpoints
+from hedged_request import price_hedger
+
+
+def parse_binance_klines(raw: List[List[Any]]) -> List[Dict[str, Any]]:
+    """Binance /klines 原始数组 -> K线字典列表"""
+    candles: List[Dict[str, Any]] = []
+    for k in raw:
+        candles.append({
+            'timestamp': int(k[0]),
+            'open': float(k[1]),
+            'high': float(k[2]),
+            'low': float(k[3]),
+            'close': float(k[4]),
+            'volume': float(k[5])
+        })
+    return candles
+
+
+def parse_open_interest_avg(data: Any) -> float:
+    """/futures/data/openInterestHist 序列 -> 平均持仓量"""
+    if isinstance(data, list) and len(data) > 0:
+        vals = [float(x.get('sumOpenInterest', x.get('sumOpenInterestValue', 0))) for x in data if x]
+        if len(vals) > 0:
+            return sum(vals) / len(vals)
+    return 0.0
+
+
+def parse_funding_rate(data: Any) -> float:
+    """/fapi/v1/fundingRate 序列 -> 最新资金费率"""
+    if isinstance(data, list) and len(data) > 0:
+        return float(data[0].get('fundingRate', 0.0))
+    return 0.0
 
 
 class MarketData:
@@ -23,66 +60,26 @@ class MarketData:
         self.prices: Dict[str, float] = {}
         self.price_changes: Dict[str, float] = {}
         self.last_update: Dict[str, float] = {}  # 每个币种独立缓存时间
+        self.stream = None  # 可选的 BinanceStream（WebSocket 实时行情）
+        self.order_book = None  # 可选的 OrderBook（盘口中间价/价差）
+        self.http = get_http_client()  # 共享 keep-alive 连接池
+
+    def attach_stream(self, stream) -> None:
+        """挂载 WebSocket 行情流；流数据新鲜时价格与近期K线直接从内存读取"""
+        self.stream = stream
+
+    def attach_order_book(self, order_book) -> None:
+        """挂载盘口；prompt 构建从这里读取中间价与价差序列"""
+        self.order_book = order_book
 
     # -------- Binance HTTP Helper --------
     def _binance_get(self, path: str, params: Dict[str, Any]) -> Any:
-        import time
-        last_exc: Optional[Exception] = None
-        
-        # 添加重试机制：每个base URL尝试2次，失败后等待
-        for attempt in range(2):
-            for base in BINANCE_BASE_URLS:
-                url = f"{base}{path}"
-                try:
-                    response = requests.get(
-                        url,
-                        params=params,
-                        headers={
-                            'User-Agent': 'TrigoNexus/1.0',
-                            'Accept': 'application/json'
-                        },
-                        timeout=20  # 增加超时时间到20秒
-                    )
-                    response.raise_for_status()
-                    return response.json()
-                except Exception as e:
-                    last_exc = e
-                    continue
-            
-            # 第一次尝试所有base都失败，等待2秒后重试
-            if attempt == 0:
-                time.sleep(2)
-        
-        raise RuntimeError(f"Binance请求失败: {path} {params} -> {last_exc}")
+        # 按延迟/错误率选择最快的健康端点，总耗时受 BINANCE_REQUEST_DEADLINE 约束
+        return spot_endpoints.request(path, params, http=self.http)
 
     # -------- Futures (Perps) Helpers --------
     def _binance_fapi_get(self, path: str, params: Dict[str, Any]) -> Any:
-        # Binance Futures base
-        bases = [
-            'https://fapi.binance.com',
-            'https://fapi1.binance.com',
-            'https://fapi2.binance.com',
-            'https://fapi3.binance.com'
-        ]
-        last_exc: Optional[Exception] = None
-        for base in bases:
-            url = f"{base}{path}"
-            try:
-                response = requests.get(
-                    url,
-                    params=params,
-                    headers={
-                        'User-Agent': 'TrigoNexus/1.0',
-                        'Accept': 'application/json'
-                    },
-                    timeout=15
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                last_exc = e
-                continue
-        raise RuntimeError(f"Binance FAPI请求失败: {path} {params} -> {last_exc}")
+        return fapi_endpoints.request(path, params, http=self.http)
 
     # -------- Finnhub API (主要数据源，适合 Render 部署) --------
     def _get_price_from_finnhub(self, symbol: str) -> tuple:
@@ -93,13 +90,12 @@ class MarketData:
         try:
             # 获取实时报价
             url = "https://finnhub.io/api/v1/quote"
-            response = requests.get(
+            response = self.http.get(
                 url,
                 params={
                     'symbol': finnhub_symbol,
                     'token': FINNHUB_API_KEY
-                },
-                timeout=10
+                }
             )
             response.raise_for_status()
             data = response.json()
@@ -133,7 +129,7 @@ class MarketData:
             _limit = max(1, min(limit, 1000))
             ts_from = now - _limit * window_sec * 2  # 留余量保证足够根数
             url = "https://finnhub.io/api/v1/crypto/candle"
-            resp = requests.get(
+            resp = self.http.get(
                 url,
                 params={
                     'symbol': finnhub_symbol,
@@ -141,8 +137,7 @@ class MarketData:
                     'from': ts_from,
                     'to': now,
                     'token': FINNHUB_API_KEY
-                },
-                timeout=12
+                }
             )
             resp.raise_for_status()
             data = resp.json()
@@ -171,15 +166,7 @@ class MarketData:
     # -------- Backup: CoinGecko API --------
     def _get_price_from_coingecko(self, symbol: str) -> tuple[float, float]:
         """从 CoinGecko 获取价格（备选方案）"""
-        coin_ids = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'SOL': 'solana',
-            'BNB': 'binancecoin',
-            'DOGE': 'dogecoin',
-            'XRP': 'ripple'
-        }
-        coin_id = coin_ids.get(symbol)
+        coin_id = COINGECKO_IDS.get(symbol)
         if not coin_id:
             raise ValueError(f"CoinGecko 不支持的币种: {symbol}")
         
@@ -190,7 +177,7 @@ class MarketData:
             'include_24hr_change': 'true'
         }
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params)
             response.raise_for_status()
             data = response.json()
             price = float(data[coin_id]['usd'])
@@ -199,10 +186,63 @@ class MarketData:
         except Exception as e:
             raise RuntimeError(f"CoinGecko请求失败: {symbol} -> {e}")
 
+    # -------- Batch Prices（一次请求获取多个币种） --------
+    def _get_prices_from_binance_batch(self, symbols: List[str]) -> Dict[str, tuple]:
+        """Binance 批量行情：/ticker/24hr?symbols=[...]，返回 {symbol: (price, change_percent)}"""
+        pair_to_symbol = {CRYPTO_SYMBOLS[s]: s for s in symbols if CRYPTO_SYMBOLS.get(s)}
+        if not pair_to_symbol:
+            return {}
+        data = self._binance_get('/api/v3/ticker/24hr', {
+            'symbols': json.dumps(list(pair_to_symbol.keys()), separators=(',', ':'))
+        })
+        result: Dict[str, tuple] = {}
+        for item in data if isinstance(data, list) else []:
+            symbol = pair_to_symbol.get(item.get('symbol'))
+            if symbol is None:
+                continue
+            try:
+                result[symbol] = (float(item['lastPrice']), float(item['priceChangePercent']))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return result
+
+    def _get_prices_from_coingecko_batch(self, symbols: List[str]) -> Dict[str, tuple]:
+        """CoinGecko 批量行情：ids=bitcoin,ethereum,...，返回 {symbol: (price, change_percent)}"""
+        id_to_symbol = {COINGECKO_IDS[s]: s for s in symbols if COINGECKO_IDS.get(s)}
+        if not id_to_symbol:
+            return {}
+        response = self.http.get(
+            "https://api.coingecko.com/api/v3/simple/price",
+            params={
+                'ids': ','.join(id_to_symbol.keys()),
+                'vs_currencies': 'usd',
+                'include_24hr_change': 'true'
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        result: Dict[str, tuple] = {}
+        for coin_id, symbol in id_to_symbol.items():
+            entry = data.get(coin_id)
+            if not entry or 'usd' not in entry:
+                continue
+            result[symbol] = (float(entry['usd']), float(entry.get('usd_24h_change') or 0))
+        return result
+
+    def _get_price_from_binance(self, pair: str) -> tuple[float, float]:
+        data = self._binance_get('/api/v3/ticker/24hr', {'symbol': pair})
+        return float(data['lastPrice']), float(data['priceChangePercent'])
+
     # -------- Realtime Prices --------
     def get_crypto_price(self, symbol: str) -> float:
         """获取单个加密货币的实时价格（Binance 优先，Finnhub 备选）"""
         current_time = time.time()
+        # WebSocket 流数据新鲜时直接使用，不消耗 REST 权重（缓存只用于限制 REST 请求频率）
+        if self.stream is not None:
+            streamed = self.stream.get_price(symbol)
+            if streamed is not None:
+                return self._store_price(symbol, streamed[0], streamed[1], current_time)
+
         # 每个币种独立缓存判断
         if symbol in self.prices and symbol in self.last_update and (current_time - self.last_update[symbol]) < PRICE_REFRESH_SECONDS:
             return self.prices[symbol]
@@ -211,11 +251,23 @@ class MarketData:
         if not pair:
             raise ValueError(f"不支持的币种: {symbol}")
 
+        if PRICE_HEDGING_ENABLED:
+            # 对冲模式：Binance 慢于其 p95 延迟时并行请求 Finnhub，再慢则 CoinGecko，先到先用
+            try:
+                source, (price, change_percent) = price_hedger.fetch([
+                    ('binance', lambda: self._get_price_from_binance(pair)),
+                    ('finnhub', lambda: self._get_price_from_finnhub(symbol)),
+                    ('coingecko', lambda: self._get_price_from_coingecko(symbol)),
+                ])
+                print(f"✓ {symbol} {source}价格: ${price:,.2f} ({change_percent:+.2f}%)")
+            except Exception:
+                print(f"❌ {symbol} 所有数据源都失败: Binance/Finnhub/CoinGecko")
+                raise
+            return self._store_price(symbol, price, change_percent, current_time)
+
         # 第一优先：Binance（速度快、覆盖广）
         try:
-            data = self._binance_get('/api/v3/ticker/24hr', {'symbol': pair})
-            price = float(data['lastPrice'])
-            change_percent = float(data['priceChangePercent'])
+            price, change_percent = self._get_price_from_binance(pair)
             print(f"✓ {symbol} Binance价格: ${price:,.2f} ({change_percent:+.2f}%)")
         except Exception as e1:
             # Binance 失败，尝试 Finnhub（更稳定但可能有频率限制）
@@ -239,16 +291,67 @@ class MarketData:
         return price
 
     def get_all_prices(self, force_refresh: bool = False) -> Dict[str, float]:
+        """批量获取所有币种价格：Binance 一次请求 → CoinGecko 一次请求 → 仅对缺失币种逐个兜底"""
         if force_refresh:
             self.last_update = {}  # 清空所有币种的缓存
+        current_time = time.time()
         prices: Dict[str, float] = {}
+        missing: List[str] = []
         for symbol in CRYPTO_SYMBOLS.keys():
+            # 流数据优先；缓存只在流不可用时替代 REST 请求
+            streamed = self.stream.get_price(symbol) if self.stream is not None else None
+            cached = symbol in self.prices and (current_time - self.last_update.get(symbol, 0)) < PRICE_REFRESH_SECONDS
+            if streamed is not None:
+                prices[symbol] = self._store_price(symbol, streamed[0], streamed[1], current_time)
+            elif cached:
+                prices[symbol] = self.prices[symbol]
+            else:
+                missing.append(symbol)
+
+        if missing:
+            try:
+                batch = self._get_prices_from_binance_batch(missing)
+                for symbol, (price, change_percent) in batch.items():
+                    prices[symbol] = self._store_price(symbol, price, change_percent, current_time)
+                print(f"✓ Binance批量价格: {len(batch)}/{len(missing)} 个币种", flush=True)
+            except Exception as e:
+                print(f"⚠ Binance批量价格失败，切换CoinGecko: {e}")
+            missing = [s for s in missing if s not in prices]
+
+        if missing:
+            try:
+                batch = self._get_prices_from_coingecko_batch(missing)
+                for symbol, (price, change_percent) in batch.items():
+                    prices[symbol] = self._store_price(symbol, price, change_percent, current_time)
+                print(f"✓ CoinGecko批量价格: {len(batch)}/{len(missing)} 个币种", flush=True)
+            except Exception as e:
+                print(f"⚠ CoinGecko批量价格失败: {e}")
+            missing = [s for s in missing if s not in prices]
+
+        # 批量接口都未覆盖的币种，逐个走完整兜底链
+        for symbol in missing:
             prices[symbol] = self.get_crypto_price(symbol)
         return prices
 
+    def _store_price(self, symbol: str, price: float, change_percent: float, ts: float) -> float:
+        self.prices[symbol] = price
+        self.price_changes[symbol] = change_percent
+        self.last_update[symbol] = ts
+        return price
+
     def get_price_change(self, symbol: str) -> float:
         return self.price_changes.get(symbol, 0.0)
 
+    def get_source_stats(self) -> Dict[str, Any]:
+        """行情数据源健康指标：端点延迟/熔断状态、对冲请求各数据源胜出次数、限流配额与录制/回放状态"""
+        return {
+            'price_sources': price_hedger.snapshot(),
+            'spot_endpoints': spot_endpoints.snapshot(),
+            'fapi_endpoints': fapi_endpoints.snapshot(),
+            'rate_limits': rate_governor.snapshot(),
+            'cassette': cassette.stats(),
+        }
+
     # -------- Klines --------
     def get_historical_candles(self, symbol: str, days: int = 3) -> List[Dict[str, Any]]:
         """获取历史K线（严格真实）。默认取最近 KLINE_LIMIT 根 1m K线。"""
@@ -262,16 +365,7 @@ class MarketData:
                 'interval': KLINE_INTERVAL,
                 'limit': KLINE_LIMIT
             })
-            candles: List[Dict[str, Any]] = []
-            for k in raw:
-                candles.append({
-                    'timestamp': int(k[0]),
-                    'open': float(k[1]),
-                    'high': float(k[2]),
-                    'low': float(k[3]),
-                    'close': float(k[4]),
-                    'volume': float(k[5])
-                })
+            candles = parse_binance_klines(raw)
             print(f"✓ {symbol} Binance历史K线: {len(candles)} 根", flush=True)
             return candles
         except Exception as e1:
@@ -284,6 +378,20 @@ class MarketData:
                 print(f"❌ {symbol} 历史K线全部数据源失败: {e2}")
                 return []
 
+    def get_klines_since(self, symbol: str, start_time: int, interval: str = KLINE_INTERVAL,
+                         limit: int = KLINE_PAGE_LIMIT) -> List[Dict[str, Any]]:
+        """从 start_time（毫秒）起取一页K线，用于本地K线库的增量分页同步（仅 Binance）"""
+        pair = CRYPTO_SYMBOLS.get(symbol)
+        if not pair:
+            raise ValueError(f"不支持的币种: {symbol}")
+        raw = self._binance_get('/api/v3/klines', {
+            'symbol': pair,
+            'interval': interval,
+            'startTime': int(start_time),
+            'limit': max(1, min(limit, KLINE_PAGE_LIMIT))
+        })
+        return parse_binance_klines(raw)
+
     # -------- Futures Metrics (OI & Funding) --------
     def get_open_interest(self, symbol: str) -> float:
         pair = CRYPTO_SYMBOLS.get(symbol)
@@ -306,10 +414,7 @@ class MarketData:
                 'period': period,
                 'limit': limit
             })
-            if isinstance(data, list) and len(data) > 0:
-                vals = [float(x.get('sumOpenInterest', x.get('sumOpenInterestValue', 0))) for x in data if x]
-                if len(vals) > 0:
-                    return sum(vals) / len(vals)
+            return parse_open_interest_avg(data)
         except Exception:
             pass
         return 0.0
@@ -320,37 +425,36 @@ class MarketData:
             return 0.0
         try:
             data = self._binance_fapi_get('/fapi/v1/fundingRate', {'symbol': pair, 'limit': 1})
-            if isinstance(data, list) and len(data) > 0:
-                return float(data[0].get('fundingRate', 0.0))
+            return parse_funding_rate(data)
         except Exception:
             pass
         return 0.0
 
-    def get_recent_klines(self, symbol: str, limit: int = 3) -> List[Dict[str, Any]]:
+    def get_recent_klines(self, symbol: str, limit: int = 3, use_stream: bool = True,
+                          interval: str = KLINE_INTERVAL) -> List[Dict[str, Any]]:
+        """最近 limit 根K线（含形成中的一根）；interval 可取原生高周期（如 '4h'），此时不走 WebSocket"""
         pair = CRYPTO_SYMBOLS.get(symbol)
         if not pair:
             raise ValueError(f"不支持的币种: {symbol}")
+        if use_stream and self.stream is not None and interval == KLINE_INTERVAL:
+            streamed = self.stream.get_recent_klines(symbol, limit)
+            if streamed is not None:
+                return streamed
         try:
             raw = self._binance_get('/api/v3/klines', {
                 'symbol': pair,
-                'interval': KLINE_INTERVAL,
+                'interval': interval,
                 'limit': max(1, min(limit, 1000))
             })
-            recent: List[Dict[str, Any]] = []
-            for k in raw:
-                recent.append({
-                    'timestamp': int(k[0]),
-                    'open': float(k[1]),
-                    'high': float(k[2]),
-                    'low': float(k[3]),
-                    'close': float(k[4]),
-                    'volume': float(k[5])
-                })
-            return recent
+            return parse_binance_klines(raw)
         except Exception as e1:
+            if interval != KLINE_INTERVAL:
+                # Finnhub 兜底只覆盖基础周期
+                print(f"⚠ {symbol} Binance {interval} K线失败: {e1}")
+                return []
             print(f"⚠ {symbol} Binance近期K线失败，切换Finnhub: {e1}")
             try:
-                return self._get_klines_from_finnhub(symbol, limit=limit, interval=KLINE_INTERVAL)
+                return self._get_klines_from_finnhub(symbol, limit=limit, interval=interval)
             except Exception as e2:
                 print(f"❌ {symbol} 近期K线全部数据源失败: {e2}")
                 return []
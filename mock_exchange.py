@@ -0,0 +1,539 @@
+"""
+本地模拟交易所
+实现 MarketData / SymbolUniverse 用到的 Binance 现货/合约 REST 子集与对应 WebSocket 组合流（仅标准库 + numpy），
+价格由可配置的随机过程生成，可注入延迟、错误与限流响应，用于数百个币种规模的压测。
+
+用法：
+    python mock_exchange.py --port 9100 --symbols 300 --latency 0.05 --error-rate 0.01
+    BINANCE_BASE_URLS=http://127.0.0.1:9100 BINANCE_FAPI_BASE_URLS=http://127.0.0.1:9100 \\
+    BINANCE_WS_BASE_URL=ws://127.0.0.1:9100 python app_dual_edition.py
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+
+from config import CRYPTO_SYMBOLS
+from kline_store import interval_ms
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MINUTE_MS = 60_000
+
+# 已知币种的起始价格，其余合成币种随机生成
+_SEED_PRICES = {'BTCUSDT': 65000.0, 'ETHUSDT': 3200.0, 'SOLUSDT': 150.0, 'BNBUSDT': 580.0,
+                'DOGEUSDT': 0.15, 'XRPUSDT': 0.55}
+
+
+class SyntheticMarket:
+    """按分钟K线保存历史的合成行情；所有币种一次向量化推进"""
+
+    def __init__(self, pairs: List[str], process: str = 'gbm', volatility: float = 0.8,
+                 history: int = 1500, seed: Optional[int] = None):
+        self.pairs = list(pairs)
+        self.index = {p: i for i, p in enumerate(self.pairs)}
+        self.process = process
+        n = len(self.pairs)
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.lock = threading.Lock()
+        self.tick = threading.Condition(self.lock)
+        self.seq = 0
+
+        self.anchor = np.array([_SEED_PRICES.get(p, float(np.exp(rng.uniform(np.log(0.01), np.log(500)))))
+                                for p in self.pairs])
+        # 年化波动率 -> 每秒
+        self.sigma = volatility / np.sqrt(365 * 86400) * rng.uniform(0.7, 1.5, n)
+        self.kappa = 1 / 3600  # OU 均值回归速度（每秒）
+
+        # 历史分钟K线：hist[symbol, minute, (o,h,l,c,v)]，容量为历史 + 两天
+        self.capacity = history + 2 * 1440
+        self.hist = np.zeros((n, self.capacity, 5))
+        self.hist_ts = np.zeros(self.capacity, dtype=np.int64)
+        now_min = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+        steps = rng.standard_normal((n, history)) * (self.sigma[:, None] * np.sqrt(60))
+        log_path = np.cumsum(steps, axis=1)
+        closes = self.anchor[:, None] * np.exp(log_path - log_path[:, -1:])
+        opens = np.concatenate([closes[:, :1], closes[:, :-1]], axis=1)
+        wick = np.abs(rng.standard_normal((n, history))) * self.sigma[:, None] * np.sqrt(60) * 0.5
+        self.hist[:, :history, 0] = opens
+        self.hist[:, :history, 1] = np.maximum(opens, closes) * (1 + wick)
+        self.hist[:, :history, 2] = np.minimum(opens, closes) * (1 - wick)
+        self.hist[:, :history, 3] = closes
+        self.hist[:, :history, 4] = rng.lognormal(3, 1, (n, history))
+        self.hist_ts[:history] = now_min - np.arange(history, 0, -1, dtype=np.int64) * MINUTE_MS
+        self.count = history
+
+        # 形成中的K线
+        self.cur_ts = now_min
+        self.price = closes[:, -1].copy()
+        self.cur = np.stack([self.price, self.price, self.price, self.price, np.zeros(n)], axis=1)
+        self.last_step = time.time()
+
+        # 合约指标
+        self.open_interest = rng.lognormal(10, 1.5, n)
+        self.funding = rng.normal(0.0001, 0.0001, n)
+
+    # -------- 推进 --------
+    def step(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self.lock:
+            dt = max(1e-3, now - self.last_step)
+            self.last_step = now
+            z = self.rng.standard_normal(len(self.pairs))
+            if self.process == 'ou':
+                x = np.log(self.price)
+                x += self.kappa * (np.log(self.anchor) - x) * dt + self.sigma * np.sqrt(dt) * z
+                self.price = np.exp(x)
+            else:
+                self.price = self.price * np.exp(-0.5 * self.sigma ** 2 * dt + self.sigma * np.sqrt(dt) * z)
+            now_min = int(now * 1000) // MINUTE_MS * MINUTE_MS
+            if now_min > self.cur_ts:
+                self._close_minute()
+                self.cur_ts = now_min
+                self.cur = np.stack([self.price, self.price, self.price, self.price,
+                                     np.zeros(len(self.pairs))], axis=1)
+            self.cur[:, 1] = np.maximum(self.cur[:, 1], self.price)
+            self.cur[:, 2] = np.minimum(self.cur[:, 2], self.price)
+            self.cur[:, 3] = self.price
+            self.cur[:, 4] += self.rng.lognormal(0, 1, len(self.pairs)) * dt
+            self.open_interest *= np.exp(self.rng.normal(0, 0.0005, len(self.pairs)))
+            self.seq += 1
+            self.tick.notify_all()
+
+    def _close_minute(self) -> None:
+        if self.count == self.capacity:
+            keep = self.capacity - 1440
+            self.hist[:, :keep] = self.hist[:, -keep:]
+            self.hist_ts[:keep] = self.hist_ts[-keep:]
+            self.count = keep
+        self.hist[:, self.count] = self.cur
+        self.hist_ts[self.count] = self.cur_ts
+        self.count += 1
+
+    def wait_tick(self, seq: int, timeout: float) -> int:
+        with self.lock:
+            self.tick.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq
+
+    # -------- 查询 --------
+    def ticker(self, i: int) -> Dict[str, Any]:
+        with self.lock:
+            start = max(0, self.count - 1439)
+            last = float(self.cur[i, 3])
+            open_24h = float(self.hist[i, start, 0]) if self.count else float(self.cur[i, 0])
+            high = max(float(self.hist[i, start:self.count, 1].max(initial=0)), float(self.cur[i, 1]))
+            low = min(float(self.hist[i, start:self.count, 2].min(initial=np.inf)), float(self.cur[i, 2]))
+            volume = float(self.hist[i, start:self.count, 4].sum() + self.cur[i, 4])
+            seq = self.seq
+        return {
+            'symbol': self.pairs[i],
+            'lastPrice': f"{last:.8f}",
+            'openPrice': f"{open_24h:.8f}",
+            'highPrice': f"{high:.8f}",
+            'lowPrice': f"{low:.8f}",
+            'priceChange': f"{last - open_24h:.8f}",
+            'priceChangePercent': f"{(last - open_24h) / open_24h * 100:.3f}",
+            'volume': f"{volume:.3f}",
+            'quoteVolume': f"{volume * last:.3f}",
+            'count': seq,
+        }
+
+    def klines(self, i: int, interval: str, limit: int, start: Optional[int], end: Optional[int]) -> List[list]:
+        """Binance 格式K线数组；非 1m 周期由分钟K线聚合"""
+        step = interval_ms(interval)
+        with self.lock:
+            ts = np.append(self.hist_ts[:self.count], self.cur_ts)
+            rows = np.vstack([self.hist[i, :self.count], self.cur[i:i + 1]])
+        buckets = ts // step * step
+        keys, first = np.unique(buckets, return_index=True)
+        last = np.append(first[1:], len(ts)) - 1
+        o = rows[first, 0]
+        c = rows[last, 3]
+        h = np.maximum.reduceat(rows[:, 1], first)
+        l = np.minimum.reduceat(rows[:, 2], first)
+        v = np.add.reduceat(rows[:, 4], first)
+        mask = np.ones(len(keys), dtype=bool)
+        if start is not None:
+            mask &= keys >= start // step * step
+        if end is not None:
+            mask &= keys <= end
+        idx = np.nonzero(mask)[0]
+        idx = idx[:limit] if start is not None else idx[-limit:]
+        return [[int(keys[j]), f"{o[j]:.8f}", f"{h[j]:.8f}", f"{l[j]:.8f}", f"{c[j]:.8f}", f"{v[j]:.3f}",
+                 int(keys[j]) + step - 1, f"{v[j] * c[j]:.3f}", 100, "0", "0", "0"] for j in idx]
+
+    def kline_event(self, i: int, now_ms: int) -> Dict[str, Any]:
+        with self.lock:
+            o, h, l, c, v = (float(x) for x in self.cur[i])
+        return {'e': 'kline', 'E': now_ms, 's': self.pairs[i], 'k': {
+            't': self.cur_ts, 'T': self.cur_ts + MINUTE_MS - 1, 's': self.pairs[i], 'i': '1m',
+            'o': f"{o:.8f}", 'h': f"{h:.8f}", 'l': f"{l:.8f}", 'c': f"{c:.8f}", 'v': f"{v:.3f}", 'x': False}}
+
+    def mini_ticker_event(self, i: int, now_ms: int) -> Dict[str, Any]:
+        t = self.ticker(i)
+        return {'e': '24hrMiniTicker', 'E': now_ms, 's': self.pairs[i], 'c': t['lastPrice'],
+                'o': t['openPrice'], 'h': t['highPrice'], 'l': t['lowPrice'], 'v': t['volume'],
+                'q': t['quoteVolume']}
+
+    def book_ticker_event(self, i: int, now_ms: int) -> Dict[str, Any]:
+        """最优买卖价：围绕最新价的 1~3bps 价差"""
+        with self.lock:
+            last = float(self.cur[i, 3])
+            r = self.rng.random(3)
+            seq = self.seq
+        half = last * (0.5 + r[0]) * 1e-4
+        return {'u': seq, 's': self.pairs[i], 'b': f"{last - half:.8f}", 'B': f"{r[1] * 5:.3f}",
+                'a': f"{last + half:.8f}", 'A': f"{r[2] * 5:.3f}"}
+
+    def depth_event(self, i: int, now_ms: int, levels: int = 5) -> Dict[str, Any]:
+        """部分深度快照（depth5/10/20），档位间隔 1bp"""
+        book = self.book_ticker_event(i, now_ms)
+        bid, ask = float(book['b']), float(book['a'])
+        step = bid * 1e-4
+        with self.lock:
+            qty = self.rng.random((2, levels)) * 5
+        return {'lastUpdateId': book['u'],
+                'bids': [[f"{bid - k * step:.8f}", f"{qty[0, k]:.3f}"] for k in range(levels)],
+                'asks': [[f"{ask + k * step:.8f}", f"{qty[1, k]:.3f}"] for k in range(levels)]}
+
+
+class MockExchangeServer(ThreadingHTTPServer):
+    """模拟交易所 HTTP/WebSocket 服务；故障注入参数可在运行中修改"""
+
+    daemon_threads = True
+
+    def __init__(self, address, market: SyntheticMarket, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, weight_limit: int = 6000,
+                 retry_after: int = 5, tick: float = 1.0):
+        super().__init__(address, MockExchangeHandler)
+        self.market = market
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.weight_limit = weight_limit
+        self.retry_after = retry_after
+        self.tick_seconds = tick
+        self.lock = threading.Lock()
+        self.weight_minute = 0
+        self.weight_used = 0
+        self.requests = Counter()
+        self.injected = Counter()
+        self.ws_clients = 0
+        self.running = True
+        threading.Thread(target=self._tick_loop, name='mock-exchange-tick', daemon=True).start()
+
+    def _tick_loop(self) -> None:
+        while self.running:
+            time.sleep(self.tick_seconds)
+            self.market.step()
+
+    def use_weight(self, weight: int) -> int:
+        """按自然分钟累计权重（与 Binance 的 1M 窗口一致），返回本分钟已用权重"""
+        minute = int(time.time() // 60)
+        with self.lock:
+            if minute != self.weight_minute:
+                self.weight_minute = minute
+                self.weight_used = 0
+            self.weight_used += weight
+            return self.weight_used
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'symbols': len(self.market.pairs),
+            'requests': dict(self.requests),
+            'injected': dict(self.injected),
+            'weight_used_1m': self.weight_used,
+            'ws_clients': self.ws_clients,
+            'ticks': self.market.seq,
+        }
+
+    def shutdown(self) -> None:
+        self.running = False
+        super().shutdown()
+
+
+def _weight(path: str, params: Dict[str, str]) -> int:
+    if path in ('/api/v3/ticker/24hr', '/fapi/v1/ticker/24hr'):
+        if 'symbol' in params:
+            return 2
+        if 'symbols' in params:
+            n = params['symbols'].count(',') + 1
+            return 2 if n <= 20 else (40 if n <= 100 else 80)
+        return 80
+    if path.endswith('/klines'):
+        return 2
+    if path == '/api/v3/ticker/price':
+        return 2 if 'symbol' in params else 4
+    return 1
+
+
+class MockExchangeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: MockExchangeServer
+
+    def log_message(self, format, *args):
+        pass
+
+    # -------- HTTP --------
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path, params = parts.path, dict(parse_qsl(parts.query))
+        srv = self.server
+        if self.headers.get('Upgrade', '').lower() == 'websocket':
+            return self._websocket(path, params)
+        if path == '/mock/stats':
+            return self._send(200, srv.stats())
+        srv.requests[path] += 1
+
+        delay = srv.latency + random.uniform(0, srv.jitter) if (srv.latency or srv.jitter) else 0
+        if delay > 0:
+            time.sleep(delay)
+        used = srv.use_weight(_weight(path, params))
+        headers = {'X-MBX-USED-WEIGHT-1M': str(used)}
+        if used > srv.weight_limit or random.random() < srv.rate_limit_rate:
+            srv.injected['429'] += 1
+            headers['Retry-After'] = str(srv.retry_after)
+            return self._send(429, {'code': -1003, 'msg': 'Too many requests (mock).'}, headers)
+        if random.random() < srv.error_rate:
+            srv.injected['500'] += 1
+            return self._send(500, {'code': -1000, 'msg': 'Injected error (mock).'}, headers)
+
+        handler = self.ROUTES.get(path)
+        if handler is None:
+            return self._send(404, {'code': -1, 'msg': f'Unknown path {path}'}, headers)
+        try:
+            status, body = handler(self, params)
+        except KeyError:
+            status, body = 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        except (ValueError, TypeError) as e:
+            status, body = 400, {'code': -1100, 'msg': str(e)}
+        return self._send(status, body, headers)
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _symbol(self, params: Dict[str, str]) -> int:
+        return self.server.market.index[params['symbol']]
+
+    def _ping(self, params):
+        return 200, {}
+
+    def _ticker_24hr(self, params):
+        market = self.server.market
+        if 'symbol' in params:
+            return 200, market.ticker(self._symbol(params))
+        pairs = json.loads(params['symbols']) if 'symbols' in params else market.pairs
+        return 200, [market.ticker(market.index[p]) for p in pairs if p in market.index]
+
+    def _klines(self, params):
+        start = int(params['startTime']) if 'startTime' in params else None
+        end = int(params['endTime']) if 'endTime' in params else None
+        limit = max(1, min(int(params.get('limit', 500)), 1500))
+        return 200, self.server.market.klines(self._symbol(params), params.get('interval', '1m'), limit, start, end)
+
+    def _ticker_price(self, params):
+        market = self.server.market
+        if 'symbol' in params:
+            i = self._symbol(params)
+            return 200, {'symbol': params['symbol'], 'price': f"{market.price[i]:.8f}"}
+        return 200, [{'symbol': p, 'price': f"{market.price[i]:.8f}"} for p, i in market.index.items()]
+
+    def _exchange_info(self, params):
+        return 200, {'timezone': 'UTC', 'symbols': [
+            {'symbol': p, 'pair': p, 'contractType': 'PERPETUAL', 'status': 'TRADING',
+             'baseAsset': p[:-4], 'quoteAsset': 'USDT', 'marginAsset': 'USDT'}
+            for p in self.server.market.pairs]}
+
+    def _open_interest(self, params):
+        i = self._symbol(params)
+        return 200, {'symbol': params['symbol'], 'openInterest': f"{self.server.market.open_interest[i]:.3f}",
+                     'time': int(time.time() * 1000)}
+
+    def _open_interest_hist(self, params):
+        i = self._symbol(params)
+        market = self.server.market
+        step = interval_ms(params.get('period', '5m'))
+        limit = max(1, min(int(params.get('limit', 30)), 500))
+        now_bucket = int(time.time() * 1000) // step * step
+        # 以当前持仓量为终点、按桶时间戳定种子的随机游走，同一时刻重复请求结果一致
+        walk = np.random.default_rng(now_bucket + i).normal(0, 0.002, limit)
+        series = market.open_interest[i] * np.exp(walk[::-1].cumsum()[::-1] - walk[-1])
+        price = float(market.price[i])
+        return 200, [{'symbol': params['symbol'], 'sumOpenInterest': f"{v:.3f}",
+                      'sumOpenInterestValue': f"{v * price:.3f}",
+                      'timestamp': now_bucket - (limit - 1 - k) * step} for k, v in enumerate(series)]
+
+    def _funding_rate(self, params):
+        i = self._symbol(params)
+        limit = max(1, min(int(params.get('limit', 100)), 1000))
+        eight_h = 8 * 3600 * 1000
+        last = int(time.time() * 1000) // eight_h * eight_h
+        rate = float(self.server.market.funding[i])
+        return 200, [{'symbol': params['symbol'], 'fundingRate': f"{rate:.8f}",
+                      'fundingTime': last - (limit - 1 - k) * eight_h} for k in range(limit)]
+
+    ROUTES = {
+        '/api/v3/ping': _ping,
+        '/fapi/v1/ping': _ping,
+        '/api/v3/ticker/24hr': _ticker_24hr,
+        '/api/v3/klines': _klines,
+        '/api/v3/ticker/price': _ticker_price,
+        '/fapi/v1/exchangeInfo': _exchange_info,
+        '/fapi/v1/ticker/24hr': _ticker_24hr,
+        '/fapi/v1/klines': _klines,
+        '/fapi/v1/openInterest': _open_interest,
+        '/futures/data/openInterestHist': _open_interest_hist,
+        '/fapi/v1/fundingRate': _funding_rate,
+    }
+
+    # -------- WebSocket --------
+    def _websocket(self, path: str, params: Dict[str, str]) -> None:
+        """/stream?streams=a/b 组合流或 /ws/<stream> 单流；每个推进周期推送一次"""
+        names = params.get('streams', '').split('/') if path == '/stream' else [path[len('/ws/'):]]
+        market = self.server.market
+        subs = []
+        for name in filter(None, names):
+            pair, _, kind = name.partition('@')
+            i = market.index.get(pair.upper())
+            if i is not None and kind.split('@')[0] in ('miniTicker', 'kline_1m', 'bookTicker', 'depth5', 'depth10', 'depth20'):
+                subs.append((name, i, kind))
+
+        accept = base64.b64encode(hashlib.sha1((self.headers['Sec-WebSocket-Key'] + WS_GUID).encode()).digest())
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept.decode())
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        sock = self.connection
+        send_lock = threading.Lock()
+        closed = threading.Event()
+
+        def send_frame(opcode: int, payload: bytes) -> None:
+            n = len(payload)
+            if n < 126:
+                header = struct.pack('!BB', 0x80 | opcode, n)
+            elif n < 65536:
+                header = struct.pack('!BBH', 0x80 | opcode, 126, n)
+            else:
+                header = struct.pack('!BBQ', 0x80 | opcode, 127, n)
+            with send_lock:
+                sock.sendall(header + payload)
+
+        def reader() -> None:
+            # 处理客户端的 ping / close（客户端帧带掩码）
+            try:
+                while not closed.is_set():
+                    b1, b2 = self.rfile.read(2)
+                    opcode, n = b1 & 0x0F, b2 & 0x7F
+                    if n == 126:
+                        n = struct.unpack('!H', self.rfile.read(2))[0]
+                    elif n == 127:
+                        n = struct.unpack('!Q', self.rfile.read(8))[0]
+                    mask = self.rfile.read(4) if b2 & 0x80 else b'\0\0\0\0'
+                    payload = bytes(b ^ mask[k % 4] for k, b in enumerate(self.rfile.read(n)))
+                    if opcode == 0x8:
+                        send_frame(0x8, payload[:2])
+                        break
+                    if opcode == 0x9:
+                        send_frame(0xA, payload)
+            except (OSError, ValueError):
+                pass
+            closed.set()
+
+        threading.Thread(target=reader, daemon=True).start()
+        self.server.ws_clients += 1
+        try:
+            seq = market.seq
+            while not closed.is_set() and self.server.running:
+                seq = market.wait_tick(seq, timeout=1.0)
+                now_ms = int(time.time() * 1000)
+                for name, i, kind in subs:
+                    if kind == 'kline_1m':
+                        data = market.kline_event(i, now_ms)
+                    elif kind == 'bookTicker':
+                        data = market.book_ticker_event(i, now_ms)
+                    elif kind.startswith('depth'):
+                        data = market.depth_event(i, now_ms, int(kind[5:].split('@')[0]))
+                    else:
+                        data = market.mini_ticker_event(i, now_ms)
+                    send_frame(0x1, json.dumps({'stream': name, 'data': data}, separators=(',', ':')).encode())
+        except OSError:
+            pass
+        finally:
+            closed.set()
+            self.server.ws_clients -= 1
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def start_mock_exchange(port: int = 0, symbols: int = 0, host: str = '127.0.0.1', process: str = 'gbm',
+                        volatility: float = 0.8, seed: Optional[int] = None, history: int = 1500,
+                        **faults) -> MockExchangeServer:
+    """在后台线程启动模拟交易所，返回服务对象（server.server_port 为实际端口）"""
+    pairs = list(dict.fromkeys(CRYPTO_SYMBOLS.values()))
+    pairs += [f"SYN{k:04d}USDT" for k in range(max(0, symbols - len(pairs)))]
+    market = SyntheticMarket(pairs, process=process, volatility=volatility, history=history, seed=seed)
+    server = MockExchangeServer((host, port), market, **faults)
+    threading.Thread(target=server.serve_forever, name='mock-exchange', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Binance 兼容的本地模拟交易所')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--symbols', type=int, default=0, help='币种总数（不足部分用 SYNxxxxUSDT 补齐）')
+    parser.add_argument('--process', choices=('gbm', 'ou'), default='gbm', help='价格过程：几何布朗运动 / 均值回归')
+    parser.add_argument('--volatility', type=float, default=0.8, help='年化波动率')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--history', type=int, default=1500, help='预生成的分钟K线根数（4h 指标需要 ≥ 14400）')
+    parser.add_argument('--tick', type=float, default=1.0, help='价格推进与 WebSocket 推送间隔（秒）')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个 REST 请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 HTTP 500 的概率')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='随机返回 HTTP 429 的概率')
+    parser.add_argument('--weight-limit', type=int, default=6000, help='每分钟权重上限，超出返回 429')
+    parser.add_argument('--retry-after', type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_mock_exchange(
+        port=args.port, symbols=args.symbols, host=args.host, process=args.process,
+        volatility=args.volatility, seed=args.seed, history=args.history, tick=args.tick, latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        weight_limit=args.weight_limit, retry_after=args.retry_after,
+    )
+    print(f"🧪 模拟交易所已启动: http://{args.host}:{server.server_port}（{len(server.market.pairs)} 个币种）", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+盘口模块
+按币种维护最优买卖价（bookTicker / depth5 推送），数据放在预分配的 numpy 数组中，
+每条消息只做定长字段解析与标量写入；按固定间隔把中间价与价差采样进环形序列供 prompt 使用。
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    ORDER_BOOK_STALE_SECONDS,
+    ORDER_BOOK_SAMPLE_SECONDS,
+    ORDER_BOOK_SERIES_LEN,
+)
+
+# bookTicker 消息字段（固定格式：{"u":..,"s":"BTCUSDT","b":"..","B":"..","a":"..","A":".."}）
+_KEY_S = '"s":"'
+_KEY_B = '"b":"'
+_KEY_BQ = '"B":"'
+_KEY_A = '"a":"'
+_KEY_AQ = '"A":"'
+
+
+def _field(raw: str, key: str, start: int) -> Tuple[str, int]:
+    """从 start 起查找 "key":"value" 中的 value，返回 (value, value 结束位置)"""
+    i = raw.index(key, start) + len(key)
+    j = raw.index('"', i)
+    return raw[i:j], j
+
+
+class OrderBook:
+    """所有币种的最优买卖价（一行一个币种）"""
+
+    def __init__(self, symbols: Dict[str, str], series_len: int = ORDER_BOOK_SERIES_LEN,
+                 sample_seconds: float = ORDER_BOOK_SAMPLE_SECONDS,
+                 stale_seconds: float = ORDER_BOOK_STALE_SECONDS):
+        self.symbols = list(symbols.keys())
+        self.rows = {sym: i for i, sym in enumerate(self.symbols)}
+        self.pair_rows = {pair: i for i, pair in enumerate(symbols.values())}
+        # 小写交易对 -> 行号（depth 推送不带交易对，只能从流名称取）
+        self.stream_rows = {pair.lower(): i for pair, i in self.pair_rows.items()}
+        n = len(self.symbols)
+        self.bid = np.full(n, np.nan)
+        self.ask = np.full(n, np.nan)
+        self.bid_qty = np.zeros(n)
+        self.ask_qty = np.zeros(n)
+        self.updated = np.zeros(n)
+        self.stale_seconds = stale_seconds
+
+        # 中间价 / 价差(bps) 环形序列：每 sample_seconds 对所有币种整列写入一次
+        self.series_len = series_len
+        self.sample_seconds = sample_seconds
+        self.mid_hist = np.full((n, series_len), np.nan)
+        self.spread_hist = np.full((n, series_len), np.nan)
+        self.head = 0
+        self.samples = 0
+        self._next_sample = (time.time() // sample_seconds + 1) * sample_seconds
+
+        self.lock = threading.Lock()
+        self.updates = 0
+
+    # -------- 写入（WebSocket 线程） --------
+    def handle_message(self, raw: str) -> bool:
+        """处理一条组合流消息；不是盘口消息时返回 False（由调用方继续处理）"""
+        head = raw[:64]
+        if '@bookTicker' in head:
+            self._handle_book_ticker(raw)
+            return True
+        if '@depth' in head:
+            self._handle_depth(raw)
+            return True
+        return False
+
+    def _handle_book_ticker(self, raw: str) -> None:
+        pair, pos = _field(raw, _KEY_S, raw.index('"data"'))
+        row = self.pair_rows.get(pair)
+        if row is None:
+            return
+        bid, pos = _field(raw, _KEY_B, pos)
+        bid_qty, pos = _field(raw, _KEY_BQ, pos)
+        ask, pos = _field(raw, _KEY_A, pos)
+        ask_qty, _ = _field(raw, _KEY_AQ, pos)
+        self.update(row, float(bid), float(bid_qty), float(ask), float(ask_qty))
+
+    def _handle_depth(self, raw: str) -> None:
+        msg = json.loads(raw)
+        row = self.stream_rows.get(msg['stream'].split('@', 1)[0])
+        data = msg['data']
+        bids, asks = data.get('bids') or data.get('b'), data.get('asks') or data.get('a')
+        if row is None or not bids or not asks:
+            return
+        self.update(row, float(bids[0][0]), float(bids[0][1]), float(asks[0][0]), float(asks[0][1]))
+
+    def update(self, row: int, bid: float, bid_qty: float, ask: float, ask_qty: float,
+               now: Optional[float] = None) -> None:
+        """写入一个币种的最优买卖价（标量写入，无内存分配）"""
+        now = time.time() if now is None else now
+        self.bid[row] = bid
+        self.ask[row] = ask
+        self.bid_qty[row] = bid_qty
+        self.ask_qty[row] = ask_qty
+        self.updated[row] = now
+        self.updates += 1
+        if now >= self._next_sample:
+            self.sample(now)
+
+    def sample(self, now: Optional[float] = None) -> None:
+        """把当前所有币种的中间价与价差写入环形序列的下一列（过期盘口记为 NaN）"""
+        now = time.time() if now is None else now
+        with self.lock:
+            fresh = (now - self.updated) < self.stale_seconds
+            mid = (self.bid + self.ask) * 0.5
+            col = self.head
+            self.mid_hist[:, col] = np.where(fresh, mid, np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):  # 尚无盘口的行 mid 为 0
+                self.spread_hist[:, col] = np.where(fresh, (self.ask - self.bid) / mid * 1e4, np.nan)
+            self.head = (col + 1) % self.series_len
+            self.samples += 1
+            self._next_sample = (now // self.sample_seconds + 1) * self.sample_seconds
+
+    # -------- 读取 --------
+    def get_quote(self, symbol: str) -> Optional[Dict[str, float]]:
+        """{'bid','ask','mid','spread_bps'}；盘口过期时返回 None"""
+        row = self.rows.get(symbol)
+        if row is None or time.time() - self.updated[row] >= self.stale_seconds:
+            return None
+        bid, ask = float(self.bid[row]), float(self.ask[row])
+        mid = (bid + ask) / 2
+        return {'bid': bid, 'ask': ask, 'mid': mid, 'spread_bps': (ask - bid) / mid * 1e4}
+
+    def get_mids(self) -> Dict[str, float]:
+        """所有盘口新鲜的币种的中间价（一次向量化计算）"""
+        fresh = (time.time() - self.updated) < self.stale_seconds
+        mid = (self.bid + self.ask) * 0.5
+        return {self.symbols[i]: float(mid[i]) for i in np.flatnonzero(fresh)}
+
+    def series(self, symbol: str, n: int = 30) -> Tuple[List[float], List[float]]:
+        """
+        最近 n 个采样点的 (中间价, 买卖价差基点)，旧 → 新。
+        两列在同一把锁内读取、用同一个新鲜度掩码过滤，逐项对应同一采样点。
+        """
+        row = self.rows.get(symbol)
+        if row is None:
+            return [], []
+        with self.lock:
+            n = min(n, self.samples, self.series_len)
+            idx = (self.head - n + np.arange(n)) % self.series_len
+            mids = self.mid_hist[row, idx]
+            spreads = self.spread_hist[row, idx]
+        keep = np.isfinite(mids) & np.isfinite(spreads)
+        return mids[keep].tolist(), spreads[keep].tolist()
+
+    def mid_series(self, symbol: str, n: int = 30) -> List[float]:
+        """最近 n 个采样点的中间价（旧 → 新，跳过盘口过期的采样点）"""
+        return self.series(symbol, n)[0]
+
+    def spread_series(self, symbol: str, n: int = 30) -> List[float]:
+        """最近 n 个采样点的买卖价差（基点），与 mid_series 逐项对应"""
+        return self.series(symbol, n)[1]
+
+    def stats(self) -> Dict[str, Any]:
+        fresh = (time.time() - self.updated) < self.stale_seconds
+        return {
+            'symbols': len(self.symbols),
+            'fresh': int(fresh.sum()),
+            'updates': self.updates,
+            'samples': self.samples,
+            'sample_seconds': self.sample_seconds,
+        }
@@ -0,0 +1,148 @@
+"""
+列式持仓簿
+所有账户的持仓按槽位存成若干 NumPy 列（方向、数量、开仓价、杠杆、保证金、清算价、现价、未实现盈亏），
+每个 tick 用少量向量运算完成全部持仓的估值与清算判定，再用 bincount 按账户汇总未实现盈亏与保证金，
+替代 update_positions 中按 positions[trader_id][symbol] 逐个计算的 Python 循环。
+
+持仓字典（LeverageEngine.positions）仍是对外接口与非数值字段（止盈止损、置信度等）的载体：
+数值列是估值的真实来源，字典中的 current_price / unrealized_pnl 在读取该账户持仓时按需回写。
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+SIDES = {'long': 1, 'short': -1}  # 方向编码；0 表示空槽
+# 每个槽位的数值列
+_FLOAT_FIELDS = ('quantity', 'entry_price', 'leverage', 'margin', 'liquidation_price', 'current_price', 'unrealized_pnl')
+
+
+class PositionBook:
+    """按 (trader_id, symbol) 分配槽位的列式持仓；平仓的槽位回收复用"""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.trader = np.zeros(capacity, dtype=np.int32)  # 账户序号（trader_ids 的下标）
+        self.symbol = np.zeros(capacity, dtype=np.int32)  # 币种序号（symbols 的下标）
+        self.side = np.zeros(capacity, dtype=np.int8)
+        for name in _FLOAT_FIELDS:
+            setattr(self, name, np.zeros(capacity))
+        self.size = 0  # 使用过的最高槽位 + 1
+        self._keys: List[Optional[Tuple[Any, str]]] = [None] * capacity
+        self._slots: Dict[Tuple[Any, str], int] = {}
+        self._free: List[int] = []
+        self.trader_ids: List[Any] = []
+        self._trader_index: Dict[Any, int] = {}
+        self.symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self.generation = 0  # mark 次数
+        self._synced: Dict[Any, int] = {}  # {trader_id: 上次回写字典时的 generation}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # -------- 登记与槽位 --------
+    def add_trader(self, trader_id) -> int:
+        """登记账户（无持仓的账户也参与汇总，结果为 0）"""
+        index = self._trader_index.get(trader_id)
+        if index is None:
+            index = self._trader_index[trader_id] = len(self.trader_ids)
+            self.trader_ids.append(trader_id)
+        return index
+
+    def _symbol(self, symbol: str) -> int:
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            index = self._symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return index
+
+    def _grow(self) -> None:
+        """容量翻倍（与 KlineBuffer 一样预分配，避免逐个追加）"""
+        old, self.capacity = self.capacity, self.capacity * 2
+        for name in ('trader', 'symbol', 'side') + _FLOAT_FIELDS:
+            column = getattr(self, name)
+            grown = np.zeros(self.capacity, dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        self._keys.extend([None] * old)
+
+    def add(self, trader_id, symbol: str, position: Dict[str, Any]) -> int:
+        """写入（或覆盖同一账户同一币种的）持仓，返回槽位"""
+        key = (trader_id, symbol)
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self.size == self.capacity:
+                    self._grow()
+                slot = self.size
+                self.size += 1
+            self._slots[key] = slot
+            self._keys[slot] = key
+        self.trader[slot] = self.add_trader(trader_id)
+        self.symbol[slot] = self._symbol(symbol)
+        self.side[slot] = SIDES.get(position['side'], -1)
+        for name in _FLOAT_FIELDS:
+            getattr(self, name)[slot] = position.get(name, 0) or 0
+        return slot
+
+    def remove(self, trader_id, symbol: str) -> bool:
+        slot = self._slots.pop((trader_id, symbol), None)
+        if slot is None:
+            return False
+        self.side[slot] = 0
+        self._keys[slot] = None
+        self._free.append(slot)
+        return True
+
+    def key(self, slot: int) -> Optional[Tuple[Any, str]]:
+        return self._keys[slot]
+
+    # -------- 估值 --------
+    def mark(self, prices: Dict[str, float]):
+        """
+        按最新价对所有持仓估值。有价格的持仓更新现价与未实现盈亏；触及清算价的持仓不计入汇总（由调用方平仓）。
+        返回 (各账户未实现盈亏, 各账户保证金, [(trader_id, symbol, 价格)] 待清算)，前两项按 trader_ids 顺序。
+        """
+        n = self.size
+        by_symbol = np.full(len(self.symbols), np.nan)
+        for symbol, index in self._symbol_index.items():
+            price = prices.get(symbol)
+            if price is not None:
+                by_symbol[index] = price
+        side = self.side[:n]
+        price = by_symbol[self.symbol[:n]] if n else np.empty(0)
+        live = (side != 0) & ~np.isnan(price)
+
+        pnl = side * (price - self.entry_price[:n]) * self.quantity[:n]
+        self.current_price[:n][live] = price[live]
+        self.unrealized_pnl[:n][live] = pnl[live]
+
+        liq = self.liquidation_price[:n]
+        with np.errstate(invalid='ignore'):
+            breached = live & (((side == 1) & (price <= liq)) | ((side == -1) & (price >= liq)))
+        keep = live & ~breached
+        accounts = self.trader[:n][keep]
+        unrealized = np.bincount(accounts, weights=pnl[keep], minlength=len(self.trader_ids))
+        margin = np.bincount(accounts, weights=self.margin[:n][keep], minlength=len(self.trader_ids))
+        liquidations = [self._keys[slot] + (float(price[slot]),) for slot in np.flatnonzero(breached).tolist()]
+        self.generation += 1
+        return unrealized, margin, liquidations
+
+    def sync(self, trader_id, positions: Dict[str, Dict[str, Any]]) -> None:
+        """把该账户最新的现价与未实现盈亏回写到持仓字典（自上次回写后未估值过则跳过）"""
+        if self._synced.get(trader_id) == self.generation:
+            return
+        for symbol, pos in positions.items():
+            slot = self._slots.get((trader_id, symbol))
+            if slot is not None:
+                pos['current_price'] = float(self.current_price[slot])
+                pos['unrealized_pnl'] = float(self.unrealized_pnl[slot])
+        self._synced[trader_id] = self.generation
+
+    def stats(self) -> Dict[str, Any]:
+        return {'positions': len(self._slots), 'capacity': self.capacity, 'traders': len(self.trader_ids),
+                'symbols': len(self.symbols), 'marks': self.generation,
+                'nbytes': sum(getattr(self, name).nbytes for name in ('trader', 'symbol', 'side') + _FLOAT_FIELDS)}
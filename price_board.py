@@ -0,0 +1,117 @@
+"""
+价格看板模块
+由单个后台线程独占调用 MarketData.get_all_prices() 刷新价格快照，
+HTTP 接口直接读取最新快照（附 as_of 与过期标记），页面延迟不再取决于上游行情延迟。
+"""
+
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from config import (
+    PRICE_BOARD_REFRESH_SECONDS,
+    PRICE_BOARD_MAX_STALENESS,
+    PRICE_BOARD_INITIAL_WAIT,
+)
+
+
+class PriceBoard:
+    """stale-while-revalidate 价格看板：读取永不访问网络"""
+
+    def __init__(self, market_data, refresh_seconds: float = PRICE_BOARD_REFRESH_SECONDS,
+                 max_staleness: float = PRICE_BOARD_MAX_STALENESS):
+        self.market_data = market_data
+        self.refresh_seconds = refresh_seconds
+        self.max_staleness = max_staleness
+        # (prices, changes, as_of)：每次刷新整体替换，读取方拿到的字典不会再被修改
+        self._snapshot: tuple = ({}, {}, None)
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._ready = threading.Event()
+        self._wakeup = threading.Event()
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='price-board', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        self._wakeup.set()
+
+    # -------- 刷新（仅后台线程） --------
+    def _run(self) -> None:
+        while self.running:
+            self.refresh()
+            self._wakeup.wait(self.refresh_seconds)
+            self._wakeup.clear()
+
+    def refresh(self) -> bool:
+        try:
+            prices = dict(self.market_data.get_all_prices())
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"⚠ 价格看板刷新失败，继续提供旧快照: {e}", flush=True)
+            return False
+        md = self.market_data
+        changes = {sym: md.get_price_change(sym) for sym in prices}
+        # as_of 取快照中最旧一个价格的获取时间（价格可能来自 MarketData 的缓存）
+        stamps = [md.last_update[sym] for sym in prices if sym in md.last_update]
+        self._snapshot = (prices, changes, min(stamps) if stamps else time.time())
+        self.refreshes += 1
+        self._ready.set()
+        return True
+
+    # -------- 读取（任意线程，不阻塞在网络上） --------
+    def _wait_first(self) -> None:
+        # 仅在启动后尚无任何快照时短暂等待首次刷新，之后永远直接返回
+        if not self._ready.is_set():
+            self._ready.wait(PRICE_BOARD_INITIAL_WAIT)
+
+    def age(self) -> Optional[float]:
+        as_of = self._snapshot[2]
+        return time.time() - as_of if as_of is not None else None
+
+    def is_stale(self) -> bool:
+        age = self.age()
+        return age is None or age > self.max_staleness
+
+    def get_prices(self) -> Dict[str, float]:
+        """最新价格快照（超过 max_staleness 时仍返回旧值并唤醒后台刷新）"""
+        self._wait_first()
+        if self.is_stale():
+            self._wakeup.set()
+        return self._snapshot[0]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{'prices', 'changes', 'as_of', 'age', 'stale'}"""
+        self._wait_first()
+        prices, changes, as_of = self._snapshot
+        age = time.time() - as_of if as_of is not None else None
+        stale = age is None or age > self.max_staleness
+        if stale:
+            self._wakeup.set()
+        return {
+            'prices': prices,
+            'changes': changes,
+            'as_of': as_of,
+            'age': round(age, 3) if age is not None else None,
+            'stale': stale,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'age': round(age, 3) if age is not None else None,
+            'stale': self.is_stale(),
+            'max_staleness': self.max_staleness,
+        }
@@ -0,0 +1,215 @@
+"""
+限流模块
+所有行情与新闻请求共享的令牌桶限流器：按交易所权重计费、读取服务器返回的已用权重头，
+按优先级分配余量（价格/K线优先于持仓量历史和新闻），接近上限时排队而不是失败。
+"""
+
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import (
+    BINANCE_BASE_URLS,
+    BINANCE_FAPI_BASE_URLS,
+    RATE_LIMITS,
+    RATE_LIMIT_SAFETY,
+    RATE_LIMIT_MAX_WAIT,
+)
+
+# 优先级：数值越小越优先
+PRIORITY_HIGH = 0    # 价格、K线
+PRIORITY_NORMAL = 1  # 持仓量、资金费率、元数据
+PRIORITY_LOW = 2     # 持仓量历史、新闻
+
+# 各优先级可使用的配额比例：低优先级在余量不足时先排队，把剩余额度留给价格/K线
+PRIORITY_SHARE = {PRIORITY_HIGH: 1.0, PRIORITY_NORMAL: 0.85, PRIORITY_LOW: 0.6}
+
+# 服务器返回的已用权重头
+WEIGHT_HEADERS = {
+    'binance_spot': 'X-MBX-USED-WEIGHT-1M',
+    'binance_fapi': 'X-MBX-USED-WEIGHT-1M',
+}
+
+# 交易所限流响应（418 为多次 429 后的封禁）
+RATE_LIMITED_STATUS = (418, 429)
+
+NEWS_HOSTS = ('min-api.cryptocompare.com', 'data.messari.io', 'cryptopanic.com')
+
+
+class RateLimitExceeded(RuntimeError):
+    """排队超过最长等待时间仍未获得配额"""
+
+
+class TokenBucket:
+    """按窗口匀速回填的令牌桶"""
+
+    def __init__(self, name: str, capacity: float, window: float):
+        self.name = name
+        self.capacity = capacity * RATE_LIMIT_SAFETY
+        self.refill_rate = self.capacity / window
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.paused_until = 0.0
+        self.server_used: Optional[int] = None
+        self.granted = 0
+        self.waited = 0
+        self.throttled = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def try_take(self, weight: float, priority: int, now: float) -> float:
+        """成功返回0，否则返回建议等待秒数"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        # 该优先级必须保留给更高优先级的余量
+        floor = self.capacity * (1 - PRIORITY_SHARE.get(priority, 1.0))
+        if self.tokens - weight >= floor:
+            self.tokens -= weight
+            self.granted += 1
+            return 0.0
+        return max(0.05, (weight + floor - self.tokens) / self.refill_rate)
+
+
+class RateGovernor:
+    """按数据源划分令牌桶的共享限流器"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = RATE_LIMITS):
+        self.buckets = {name: TokenBucket(name, cap, window) for name, (cap, window) in limits.items()}
+        self.lock = threading.Lock()
+
+    # -------- 请求分类 --------
+    def classify(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Tuple[str, float, int]]:
+        """URL -> (数据源, 权重, 优先级)；不受限流管理的请求返回 None"""
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        path = parts.path
+        params = params or {}
+        if host == 'finnhub.io':
+            return 'finnhub', 1, PRIORITY_HIGH
+        if host == 'api.coingecko.com':
+            return 'coingecko', 1, PRIORITY_HIGH if '/simple/' in path else PRIORITY_LOW
+        if host in NEWS_HOSTS:
+            return 'news', 1, PRIORITY_LOW
+        # Binance 优先按路径识别（镜像、代理或现货/合约共用同一地址的模拟交易所同样适用）
+        is_fapi = path.startswith(('/fapi/', '/futures/data/'))
+        is_spot = path.startswith('/api/v3/')
+        if is_fapi or (not is_spot and any(url.startswith(b) for b in BINANCE_FAPI_BASE_URLS)):
+            return 'binance_fapi', self._fapi_weight(path, params), self._binance_priority(path)
+        if is_spot or any(url.startswith(b) for b in BINANCE_BASE_URLS):
+            return 'binance_spot', self._spot_weight(path, params), self._binance_priority(path)
+        return None
+
+    @staticmethod
+    def _binance_priority(path: str) -> int:
+        if path.endswith('/ticker/24hr') or path.endswith('/klines') or path.endswith('/bookTicker'):
+            return PRIORITY_HIGH
+        if path.startswith('/futures/data/'):
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    @staticmethod
+    def _spot_weight(path: str, params: Dict[str, Any]) -> float:
+        # 权重参照 Binance 现货 REST 文档
+        if path == '/api/v3/ticker/24hr':
+            if 'symbol' in params:
+                return 2
+            if 'symbols' in params:
+                n = str(params['symbols']).count(',') + 1
+                return 2 if n <= 20 else (40 if n <= 100 else 80)
+            return 80
+        if path == '/api/v3/klines':
+            return 2
+        if path == '/api/v3/ticker/price':
+            return 2 if 'symbol' in params else 4
+        if path == '/api/v3/exchangeInfo':
+            return 20
+        return 1
+
+    @staticmethod
+    def _fapi_weight(path: str, params: Dict[str, Any]) -> float:
+        # 权重参照 Binance U本位合约 REST 文档
+        if path == '/fapi/v1/ticker/24hr':
+            return 1 if 'symbol' in params else 40
+        if path == '/fapi/v1/klines':
+            limit = int(params.get('limit', 500))
+            return 1 if limit < 100 else (2 if limit < 500 else (5 if limit <= 1000 else 10))
+        return 1
+
+    # -------- 配额 --------
+    def try_acquire(self, provider: str, weight: float, priority: int) -> float:
+        """非阻塞申请：成功返回0，否则返回建议等待秒数"""
+        bucket = self.buckets.get(provider)
+        if bucket is None:
+            return 0.0
+        with self.lock:
+            return bucket.try_take(weight, priority, time.time())
+
+    def acquire(self, provider: str, weight: float = 1, priority: int = PRIORITY_HIGH,
+                max_wait: float = RATE_LIMIT_MAX_WAIT) -> None:
+        """阻塞申请配额：接近上限时排队等待，超过 max_wait 抛出 RateLimitExceeded"""
+        deadline = time.time() + max_wait
+        waited = False
+        while True:
+            wait = self.try_acquire(provider, weight, priority)
+            if wait <= 0:
+                if waited:
+                    self.buckets[provider].waited += 1
+                return
+            if time.time() + wait > deadline:
+                self.buckets[provider].throttled += 1
+                raise RateLimitExceeded(f"{provider} 配额不足（权重{weight}，优先级{priority}）")
+            waited = True
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, provider: str, status_code: int, headers) -> None:
+        """根据响应头同步服务器侧已用权重；429/418 时按 Retry-After 暂停该数据源"""
+        bucket = self.buckets.get(provider)
+        if bucket is None:
+            return
+        now = time.time()
+        with self.lock:
+            header = WEIGHT_HEADERS.get(provider)
+            used = headers.get(header) if header else None
+            if used is not None:
+                try:
+                    bucket.server_used = int(used)
+                    bucket._refill(now)
+                    bucket.tokens = min(bucket.tokens, bucket.capacity - bucket.server_used)
+                except ValueError:
+                    pass
+            if status_code in RATE_LIMITED_STATUS:
+                retry_after = headers.get('Retry-After')
+                try:
+                    pause = float(retry_after) if retry_after is not None else 60.0
+                except ValueError:
+                    pause = 60.0
+                bucket.paused_until = max(bucket.paused_until, now + pause)
+                bucket.tokens = 0
+                print(f"⛔ {provider} 触发限流（HTTP {status_code}），暂停 {pause:.0f} 秒", flush=True)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各数据源的配额使用情况"""
+        now = time.time()
+        with self.lock:
+            result = {}
+            for name, b in self.buckets.items():
+                b._refill(now)
+                result[name] = {
+                    'capacity': round(b.capacity, 1),
+                    'available': round(b.tokens, 1),
+                    'used_pct': round((1 - b.tokens / b.capacity) * 100, 1) if b.capacity else 0.0,
+                    'server_used_weight': b.server_used,
+                    'paused_for': round(max(0.0, b.paused_until - now), 1),
+                    'granted': b.granted,
+                    'queued': b.waited,
+                    'throttled': b.throttled,
+                }
+            return result
+
+
+# 进程内共享
+rate_governor = RateGovernor()
@@ -324,15 +324,6 @@ class AlphaArena {
         // 保存旧价格用于比较
         if (!this.lastPrices) this.lastPrices = {};
         
-        // 使用真实的CoinMarketCap图标
-        const icons = { 
-            BTC: '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/1.png" width="24" height="24" style="border-radius:50%">',
-            ETH: '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/1027.png" width="24" height="24" style="border-radius:50%">',
-            SOL: '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/5426.png" width="24" height="24" style="border-radius:50%">',
-            BNB: '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/1839.png" width="24" height="24" style="border-radius:50%">',
-            DOGE: '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/74.png" width="24" height="24" style="border-radius:50%">',
-            XRP: '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/52.png" width="24" height="24" style="border-radius:50%">'
-        };
         
         let h = '';
         for (const [sym, price] of Object.entries(prices)) {
@@ -353,7 +344,7 @@ class AlphaArena {
             
             h += `
                 <div class="ticker-item">
-                    <span class="ticker-icon">${icons[sym] || '⚪'}</span>
+                    <span class="ticker-icon">${this.getCoinIcon(sym, 24)}</span>
                     <div class="ticker-info">
                         <div class="ticker-label">${sym}</div>
                         <div class="ticker-price ${animClass}" data-symbol="${sym}">$${this.fp(price)}</div>
@@ -1246,16 +1237,15 @@ class AlphaArena {
         }, 100);
     }
 
-    getCoinIcon(symbol) {
-        const icons = {
-            'BTC': '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/1.png" width="20" height="20" style="border-radius:50%">',
-            'ETH': '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/1027.png" width="20" height="20" style="border-radius:50%">',
-            'SOL': '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/5426.png" width="20" height="20" style="border-radius:50%">',
-            'BNB': '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/1839.png" width="20" height="20" style="border-radius:50%">',
-            'DOGE': '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/74.png" width="20" height="20" style="border-radius:50%">',
-            'XRP': '<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/52.png" width="20" height="20" style="border-radius:50%">'
-        };
-        return icons[symbol] || '⚪';
+    getCoinIcon(symbol, size = 20) {
+        // 已知币种用 CoinMarketCap 图标；币种池动态加入的其余币种显示首字母徽标
+        const cmcIds = { BTC: 1, ETH: 1027, SOL: 5426, BNB: 1839, DOGE: 74, XRP: 52 };
+        const id = cmcIds[symbol];
+        if (id) {
+            return `<img src="https://s2.coinmarketcap.com/static/img/coins/64x64/${id}.png" width="${size}" height="${size}" style="border-radius:50%">`;
+        }
+        const label = this.escapeHtml(String(symbol || '?').slice(0, 3));
+        return `<span style="display:inline-flex;align-items:center;justify-content:center;width:${size}px;height:${size}px;border-radius:50%;background:#333;color:#fff;font-size:${Math.round(size * 0.32)}px;font-weight:700;">${label}</span>`;
     }
 
     getAILogo(name) {
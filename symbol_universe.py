@@ -0,0 +1,93 @@
+"""
+交易币种池模块
+从合约元数据加载可交易的 USDT 永续合约，按24h成交额选取前 N 个，
+就地更新 config 中的币种表，使所有按 CRYPTO_SYMBOLS 遍历的模块自动覆盖新币种。
+"""
+
+import threading
+from typing import Dict, Any, List, Optional
+
+from config import SUPPORTED_CRYPTOS, CRYPTO_SYMBOLS, COINGECKO_IDS
+from endpoint_manager import spot_endpoints, fapi_endpoints
+
+
+class SymbolUniverse:
+    """可交易合约列表与前 N 成交额选择"""
+
+    def __init__(self):
+        # 启动时配置的币种：始终保留（基准、前端图标与 CoinGecko 兜底都依赖它们）
+        self.core = dict(CRYPTO_SYMBOLS)
+        self.core_coingecko = dict(COINGECKO_IDS)
+        self.perpetuals: Dict[str, str] = {}  # {base: pair}
+        self.volumes: Dict[str, float] = {}  # {base: 24h quoteVolume}
+        self.lock = threading.Lock()
+
+    def load_perpetuals(self) -> Dict[str, str]:
+        """/fapi/v1/exchangeInfo 中状态为 TRADING 的 USDT 永续，且现货存在同名交易对（行情与K线走现货接口）"""
+        info = fapi_endpoints.request('/fapi/v1/exchangeInfo', {})
+        spot_pairs = {item['symbol'] for item in spot_endpoints.request('/api/v3/ticker/price', {})}
+        perps = {}
+        for item in info.get('symbols', []):
+            if (item.get('contractType') == 'PERPETUAL' and item.get('quoteAsset') == 'USDT'
+                    and item.get('status') == 'TRADING' and item['symbol'] in spot_pairs):
+                perps[item['baseAsset']] = item['symbol']
+        self.perpetuals = perps
+        return perps
+
+    def load_volumes(self) -> Dict[str, float]:
+        """一次请求获取全部合约的 24h 成交额"""
+        pair_to_base = {pair: base for base, pair in self.perpetuals.items()}
+        volumes = {}
+        for item in fapi_endpoints.request('/fapi/v1/ticker/24hr', {}):
+            base = pair_to_base.get(item.get('symbol'))
+            if base is not None:
+                volumes[base] = float(item.get('quoteVolume') or 0)
+        self.volumes = volumes
+        return volumes
+
+    def select_top(self, n: int) -> Dict[str, str]:
+        """核心币种 + 成交额最高的其余合约，共 n 个（n 小于核心币种数时只返回核心币种）"""
+        if not self.perpetuals:
+            self.load_perpetuals()
+        if not self.volumes:
+            self.load_volumes()
+        selected = dict(self.core)
+        ranked = sorted(self.volumes.items(), key=lambda kv: kv[1], reverse=True)
+        for base, _ in ranked:
+            if len(selected) >= n:
+                break
+            selected.setdefault(base, self.perpetuals[base])
+        return selected
+
+    def apply(self, selection: Dict[str, str]) -> None:
+        """就地更新 config 中的币种表（其他模块持有的是同一对象）"""
+        with self.lock:
+            CRYPTO_SYMBOLS.clear()
+            CRYPTO_SYMBOLS.update(selection)
+            SUPPORTED_CRYPTOS[:] = list(selection.keys())
+            COINGECKO_IDS.clear()
+            COINGECKO_IDS.update({s: cid for s, cid in self.core_coingecko.items() if s in selection})
+
+    def refresh(self, n: int) -> Dict[str, str]:
+        """重新加载合约列表与成交额并应用前 n 个；失败时保持当前币种表"""
+        try:
+            self.load_perpetuals()
+            self.load_volumes()
+            selection = self.select_top(n)
+        except Exception as e:
+            print(f"⚠ 币种池加载失败，沿用当前 {len(CRYPTO_SYMBOLS)} 个币种: {e}", flush=True)
+            return dict(CRYPTO_SYMBOLS)
+        self.apply(selection)
+        print(f"✓ 币种池: {len(selection)} 个（合约 {len(self.perpetuals)} 个，按24h成交额选取）", flush=True)
+        return selection
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'active': len(CRYPTO_SYMBOLS),
+            'perpetuals': len(self.perpetuals),
+            'symbols': list(CRYPTO_SYMBOLS.keys()),
+        }
+
+
+# 进程内共享
+symbol_universe = SymbolUniverse()
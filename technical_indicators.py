@@ -1,145 +1,146 @@
 """
 技术指标计算模块
-实现 EMA、MACD、RSI、ATR 等指标
+实现 EMA、MACD、RSI、ATR 等指标（NumPy 向量化）
+
+所有 *_series 函数单次 O(n)：递推型指标（EMA、Wilder 平滑）按块用累积和求解，不再逐元素循环；
+*_batch 变体对二维数组（币种 × 时间）沿时间轴一次算完所有币种。
+输入可以是列表或 NumPy 数组，序列结果返回 NumPy 数组；标量接口保持原签名。
 """
 
+import numpy as np
+
+# 递推分块时允许的最大衰减倍数（e^300 ≈ 1e130，远低于 float64 上限）
+_MAX_LOG_SCALE = 300.0
+
+
+def _as_2d(values):
+    arr = np.asarray(values, dtype=float)
+    return arr[None, :] if arr.ndim == 1 else arr
+
+
+def _recursive(x, alpha, seed):
+    """
+    沿最后一维求 y[0] = seed、y[t] = (1-α)·y[t-1] + α·x[t]（x 形状 (m, n)，x[:, 0] 不参与）。
+    块内用 y[t] = d^t·(seed + α·Σ x[k]·d^-k) 的累积和闭式解，块长保证 d^-k 不溢出；块间传递末值。
+    """
+    m, n = x.shape
+    out = np.empty((m, n))
+    if n == 0:
+        return out
+    out[:, 0] = seed
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:, 1:] = x[:, 1:]
+        return out
+    block = max(1, int(_MAX_LOG_SCALE / -np.log(decay)))
+    carry = out[:, 0]
+    t = 1
+    while t < n:
+        end = min(n, t + block)
+        scale = decay ** np.arange(1, end - t + 1)
+        acc = np.cumsum(x[:, t:end] / scale, axis=1)
+        out[:, t:end] = scale * (carry[:, None] + alpha * acc)
+        carry = out[:, end - 1]
+        t = end
+    return out
+
+
+def _last(series):
+    return float(series[-1]) if len(series) else None
+
+
 class TechnicalIndicators:
     """技术指标计算类"""
-    
+
+    # -------- 批量（二维：币种 × 时间） --------
     @staticmethod
-    def ema(prices, period):
-        """计算指数移动平均线"""
-        if len(prices) < period:
-            return None
-        
-        multiplier = 2 / (period + 1)
-        ema_values = [sum(prices[:period]) / period]  # 初始SMA
-        
-        for price in prices[period:]:
-            ema = (price * multiplier) + (ema_values[-1] * (1 - multiplier))
-            ema_values.append(ema)
-        
-        return ema_values[-1]
-    
+    def ema_batch(matrix, period):
+        """每行的 EMA 序列（首值为前 period 个的 SMA），形状 (m, n - period + 1)"""
+        x = _as_2d(matrix)
+        if x.shape[1] < period:
+            return np.empty((x.shape[0], 0))
+        seed = x[:, :period].mean(axis=1)
+        return _recursive(x[:, period - 1:], 2 / (period + 1), seed)
+
+    @staticmethod
+    def macd_batch(matrix, fast=12, slow=26, signal=9):
+        """每行的 (MACD线, 信号线, 柱状图)；MACD线长 n - slow + 1，信号线/柱状图再短 signal - 1"""
+        x = _as_2d(matrix)
+        empty = np.empty((x.shape[0], 0))
+        if x.shape[1] < slow:
+            return empty, empty, empty
+        # 快线从第 slow-fast 个值起与慢线对齐
+        macd_line = TechnicalIndicators.ema_batch(x, fast)[:, slow - fast:] - TechnicalIndicators.ema_batch(x, slow)
+        if macd_line.shape[1] < signal:
+            return macd_line, empty, empty
+        signal_line = TechnicalIndicators.ema_batch(macd_line, signal)
+        return macd_line, signal_line, macd_line[:, signal - 1:] - signal_line
+
+    @staticmethod
+    def rsi_batch(matrix, period=14):
+        """每行的 Wilder RSI 序列，形状 (m, n - period)；平均跌幅为 0 时取 100"""
+        x = _as_2d(matrix)
+        if x.shape[1] < period + 1:
+            return np.empty((x.shape[0], 0))
+        delta = np.diff(x, axis=1)
+        gains = np.clip(delta, 0, None)
+        losses = np.clip(-delta, 0, None)
+        alpha = 1 / period
+        avg_gain = _recursive(gains[:, period - 1:], alpha, gains[:, :period].mean(axis=1))
+        avg_loss = _recursive(losses[:, period - 1:], alpha, losses[:, :period].mean(axis=1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+        return np.where(avg_loss == 0, 100.0, rsi)
+
+    @staticmethod
+    def atr_batch(highs, lows, closes, period=14):
+        """每行的 Wilder ATR 序列，形状 (m, n - period)"""
+        h, l, c = _as_2d(highs), _as_2d(lows), _as_2d(closes)
+        if c.shape[1] < period + 1:
+            return np.empty((c.shape[0], 0))
+        prev = c[:, :-1]
+        tr = np.maximum(h[:, 1:] - l[:, 1:], np.maximum(np.abs(h[:, 1:] - prev), np.abs(l[:, 1:] - prev)))
+        return _recursive(tr[:, period - 1:], 1 / period, tr[:, :period].mean(axis=1))
+
+    # -------- 单序列 --------
     @staticmethod
     def ema_series(prices, period):
         """计算EMA序列"""
-        if len(prices) < period:
-            return []
-        
-        multiplier = 2 / (period + 1)
-        ema_values = [sum(prices[:period]) / period]
-        
-        for price in prices[period:]:
-            ema = (price * multiplier) + (ema_values[-1] * (1 - multiplier))
-            ema_values.append(ema)
-        
-        return ema_values
-    
+        return TechnicalIndicators.ema_batch(prices, period)[0]
+
+    @staticmethod
+    def macd_series(prices, fast=12, slow=26, signal=9):
+        """计算MACD序列：(MACD线, 信号线, 柱状图)"""
+        return tuple(s[0] for s in TechnicalIndicators.macd_batch(prices, fast, slow, signal))
+
+    @staticmethod
+    def rsi_series(prices, period=14):
+        """计算RSI序列"""
+        return TechnicalIndicators.rsi_batch(prices, period)[0]
+
+    @staticmethod
+    def atr_series(highs, lows, closes, period=14):
+        """计算ATR序列"""
+        return TechnicalIndicators.atr_batch(highs, lows, closes, period)[0]
+
+    # -------- 标量（最新值） --------
+    @staticmethod
+    def ema(prices, period):
+        """计算指数移动平均线"""
+        return _last(TechnicalIndicators.ema_series(prices, period))
+
     @staticmethod
     def macd(prices, fast=12, slow=26, signal=9):
         """计算MACD指标"""
-        if len(prices) < slow:
-            return None, None, None
-        
-        ema_fast = TechnicalIndicators.ema_series(prices, fast)
-        ema_slow = TechnicalIndicators.ema_series(prices, slow)
-        
-        # MACD线 = 快线 - 慢线
-        macd_line = []
-        start_idx = slow - fast
-        for i in range(len(ema_slow)):
-            macd_line.append(ema_fast[i + start_idx] - ema_slow[i])
-        
-        # 信号线
-        if len(macd_line) < signal:
-            return macd_line[-1] if macd_line else None, None, None
-        
-        signal_line = TechnicalIndicators.ema_series(macd_line, signal)
-        
-        # 柱状图
-        histogram = []
-        start_idx = len(macd_line) - len(signal_line)
-        for i in range(len(signal_line)):
-            histogram.append(macd_line[i + start_idx] - signal_line[i])
-        
-        return (macd_line[-1], 
-                signal_line[-1] if signal_line else None,
-                histogram[-1] if histogram else None)
-    
+        macd_line, signal_line, histogram = TechnicalIndicators.macd_series(prices, fast, slow, signal)
+        return _last(macd_line), _last(signal_line), _last(histogram)
+
     @staticmethod
     def rsi(prices, period=14):
         """计算RSI指标"""
-        if len(prices) < period + 1:
-            return None
-        
-        gains = []
-        losses = []
-        
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i-1]
-            gains.append(change if change > 0 else 0)
-            losses.append(abs(change) if change < 0 else 0)
-        
-        if len(gains) < period:
-            return None
-        
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-        
-        # 平滑处理后续值
-        for i in range(period, len(gains)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        
-        if avg_loss == 0:
-            return 100
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
-    
-    @staticmethod
-    def rsi_series(prices, period=14):
-        """计算RSI序列"""
-        if len(prices) < period + 1:
-            return []
-        
-        rsi_values = []
-        
-        for i in range(period, len(prices)):
-            rsi_val = TechnicalIndicators.rsi(prices[:i+1], period)
-            if rsi_val is not None:
-                rsi_values.append(rsi_val)
-        
-        return rsi_values
-    
+        return _last(TechnicalIndicators.rsi_series(prices, period))
+
     @staticmethod
     def atr(highs, lows, closes, period=14):
         """计算平均真实波幅"""
-        if len(closes) < period + 1:
-            return None
-        
-        true_ranges = []
-        for i in range(1, len(closes)):
-            high_low = highs[i] - lows[i]
-            high_close = abs(highs[i] - closes[i-1])
-            low_close = abs(lows[i] - closes[i-1])
-            tr = max(high_low, high_close, low_close)
-            true_ranges.append(tr)
-        
-        if len(true_ranges) < period:
-            return None
-        
-        # 初始ATR
-        atr_val = sum(true_ranges[:period]) / period
-        
-        # 平滑
-        for i in range(period, len(true_ranges)):
-            atr_val = (atr_val * (period - 1) + true_ranges[i]) / period
-        
-        return atr_val
-
-
-
+        return _last(TechnicalIndicators.atr_series(highs, lows, closes, period))
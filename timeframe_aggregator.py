@@ -0,0 +1,178 @@
+"""
+多周期K线聚合模块
+随 1m K线写入增量维护 3m / 15m / 1h / 4h 聚合K线及其指标状态（UTC 对齐，与 Binance 原生周期一致），
+prompt 构建直接读取现成的序列，不再每次对 1500 根 1m K线做 resample 再整体重算指标。
+
+聚合规则与 pandas resample 相同：open 取首根、high/low 取极值、close 取末根、volume 求和。
+与增量指标引擎一样，最后一根 1m K线视为待定：同一时间戳的重复更新从已确认部分重新合成当前周期K线。
+"""
+
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Union
+
+import numpy as np
+
+from config import KLINE_INTERVAL, MULTI_TIMEFRAMES, TIMEFRAME_HISTORY_BARS, TIMEFRAME_MIN_BARS, INDICATORS
+from kline_buffer import KlineBuffer, COLUMNS
+from kline_store import interval_ms
+from indicator_engine import IndicatorEngine
+from indicator_registry import IndicatorSet
+
+Bar = Tuple[float, float, float, float, float]  # (open, high, low, close, volume)
+
+
+def _combine(base: Optional[Bar], candle: Dict[str, Any]) -> Bar:
+    """已确认部分 + 一根 1m K线 -> 当前周期K线"""
+    o, h, l, c, v = (float(candle[k]) for k in COLUMNS)
+    if base is None:
+        return o, h, l, c, v
+    return base[0], max(base[1], h), min(base[2], l), c, base[4] + v
+
+
+def aggregate(ts: np.ndarray, values: np.ndarray, step: int) -> Tuple[np.ndarray, np.ndarray]:
+    """向量化聚合：ts (n,) 毫秒时间戳、values (5, n) OHLCV -> (周期起点, (5, m) 聚合值)"""
+    if len(ts) == 0:
+        return ts[:0], values[:, :0]
+    buckets = ts // step * step
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+    bars = np.vstack([
+        values[0, starts],
+        np.maximum.reduceat(values[1], starts),
+        np.minimum.reduceat(values[2], starts),
+        values[3, ends],
+        np.add.reduceat(values[4], starts),
+    ])
+    return buckets[starts], bars
+
+
+class _Series:
+    """单个币种单个周期：聚合K线缓冲 + 当前周期的已确认部分 + 待定 1m K线"""
+
+    __slots__ = ('bars', 'bucket', 'base', 'pending_ts', 'pending_base')
+
+    def __init__(self, capacity: int):
+        self.bars = KlineBuffer(capacity)
+        self.bucket: Optional[int] = None  # 当前周期起点
+        self.base: Optional[Bar] = None  # 当前周期内已确认 1m K线的聚合
+        self.pending_ts: Optional[int] = None
+        self.pending_base: Optional[Bar] = None  # 待定 1m K线与 base 合成后的结果
+
+
+class TimeframeAggregator:
+    """所有币种的多周期聚合；每根 1m K线（或其更新）对每个周期是 O(1) 的标量更新"""
+
+    def __init__(self, timeframes=MULTI_TIMEFRAMES, base_interval: str = KLINE_INTERVAL,
+                 capacity: int = TIMEFRAME_HISTORY_BARS, min_bars: Dict[str, int] = TIMEFRAME_MIN_BARS,
+                 indicators: Union[IndicatorSet, Iterable[str]] = INDICATORS):
+        base_ms = interval_ms(base_interval)
+        # 只保留基础周期整数倍的周期
+        self.steps = {tf: interval_ms(tf) for tf in timeframes
+                      if interval_ms(tf) > base_ms and interval_ms(tf) % base_ms == 0}
+        self.capacity = capacity
+        self.min_bars = min_bars
+        self.engines = {tf: IndicatorEngine(indicators=indicators) for tf in self.steps}
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self.native = set()  # 已用原生K线播种的周期
+        self.lock = threading.Lock()
+
+    @property
+    def timeframes(self) -> List[str]:
+        return list(self.steps)
+
+    # -------- 写入 --------
+    def rebuild(self, symbol: str, ts: np.ndarray, values: np.ndarray) -> None:
+        """
+        用一段 1m 历史（ts (n,)、values (5, n)）重建某币种的全部周期。
+        除最后一根外向量化聚合为已确认状态，最后一根按待定K线走增量路径。
+        """
+        with self.lock:
+            for tf, step in self.steps.items():
+                series = _Series(self.capacity)
+                starts, bars = aggregate(ts[:-1], values[:, :-1], step)
+                rows = [dict(zip(('timestamp',) + COLUMNS, (int(t), *bar))) for t, bar in zip(
+                    starts[-self.capacity:].tolist(), bars[:, -self.capacity:].T.tolist())]
+                series.bars.extend(rows)
+                if rows:
+                    series.bucket = rows[-1]['timestamp']
+                    series.base = tuple(rows[-1][k] for k in COLUMNS)
+                self.engines[tf].rebuild(symbol, rows)
+                self._series[(symbol, tf)] = series
+            if len(ts):
+                last = dict(zip(('timestamp',) + COLUMNS, (int(ts[-1]), *values[:, -1].tolist())))
+                self._update_locked(symbol, last)
+
+    def seed_native(self, symbol: str, tf: str, candles: List[Dict[str, Any]]) -> None:
+        """
+        用交易所原生周期的已收盘K线替换该周期聚合出的历史（1m 回溯通常不够 4h 所需的根数）；
+        晚于最后一根原生K线的周期（形成中）仍由 1m K线增量合成。
+        """
+        if tf not in self.steps or not candles:
+            return
+        last_native = int(candles[-1]['timestamp'])
+        with self.lock:
+            old = self._series.get((symbol, tf))
+            newer = [r for r in old.bars.to_candles() if r['timestamp'] > last_native] if old is not None else []
+            rows = (list(candles) + newer)[-self.capacity:]
+            series = _Series(self.capacity)
+            series.bars.extend(rows)
+            if old is not None:
+                series.bucket, series.base = old.bucket, old.base
+                series.pending_ts, series.pending_base = old.pending_ts, old.pending_base
+            self.engines[tf].rebuild(symbol, rows)
+            self._series[(symbol, tf)] = series
+            self.native.add(tf)
+
+    def update(self, symbol: str, candle: Dict[str, Any]) -> None:
+        """一根新的或更新中的 1m K线（早于待定K线的忽略）"""
+        with self.lock:
+            self._update_locked(symbol, candle)
+
+    def _update_locked(self, symbol: str, candle: Dict[str, Any]) -> None:
+        ts = int(candle['timestamp'])
+        for tf, step in self.steps.items():
+            series = self._series.get((symbol, tf))
+            if series is None:
+                series = self._series[(symbol, tf)] = _Series(self.capacity)
+            if series.pending_ts is not None:
+                if ts < series.pending_ts:
+                    continue
+                if ts > series.pending_ts:
+                    series.base = series.pending_base  # 确认上一根 1m
+            bucket = ts // step * step
+            if bucket != series.bucket:
+                series.bucket, series.base = bucket, None
+            bar = _combine(series.base, candle)
+            series.pending_ts, series.pending_base = ts, bar
+            row = dict(zip(('timestamp',) + COLUMNS, (bucket, *bar)))
+            series.bars.merge(row)
+            self.engines[tf].update(symbol, row)
+
+    # -------- 读取 --------
+    def bar_count(self, symbol: str, tf: str) -> int:
+        series = self._series.get((symbol, tf))
+        return len(series.bars) if series is not None else 0
+
+    def snapshot(self, symbol: str, tf: str) -> Optional[Dict[str, Any]]:
+        """
+        某周期的当前指标与序列（格式同 calculate_indicators，另含 bars / volume_avg_20）；
+        聚合K线不足该周期的最少根数时返回 None。
+        """
+        with self.lock:
+            series = self._series.get((symbol, tf))
+            bars = len(series.bars) if series is not None else 0
+            if bars < self.min_bars.get(tf, 0):
+                return None
+            indicators = self.engines[tf].snapshot(symbol)
+            if indicators is None:
+                return None
+            indicators['bars'] = bars
+            indicators['volume_avg_20'] = float(series.bars.column('volume', 20).mean())
+        return indicators
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counts: Dict[str, Dict[str, int]] = {}
+            for (symbol, tf), series in self._series.items():
+                counts.setdefault(tf, {})[symbol] = len(series.bars)
+        return {'timeframes': self.timeframes, 'native': sorted(self.native), 'bars': counts}